@@ -0,0 +1,89 @@
+"""Import-time benchmark for the CLI startup path.
+
+Each scenario runs in a fresh interpreter so that module caches don't carry
+over. The "eager" scenario reproduces the previous behaviour of building all
+agents and the config at import time, the other scenarios measure the lazy
+paths.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+CREW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "crew")
+
+SPEC = {
+    "project_name": "Benchmark App",
+    "project_description": "A small benchmark project",
+    "features": "login, dashboard",
+    "technology_stack": "Streamlit, Python",
+    "project_type": "custom"
+}
+
+SCENARIOS = {
+    "import agents": "import agents",
+    "import main": "import main",
+    "eager agents + config (old import cost)": "import agents, config; config.get_config(); agents.get_agents()",
+}
+
+
+def _environment():
+    """Return the environment that makes the crew modules importable."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [CREW_DIR, env.get("PYTHONPATH")]))
+    return env
+
+
+def _time_command(args, runs, workdir):
+    """Return the wall times in milliseconds of running a command several times."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(args, cwd=workdir, env=_environment(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _imports_crewai(code, workdir):
+    """Check whether running a snippet imports crewai, None if the snippet fails."""
+    probe = f"{code}\nimport sys\nprint('crewai' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=workdir, env=_environment(),
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip().splitlines()[-1] == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="runs per scenario")
+    args = parser.parse_args()
+
+    main_script = os.path.join(CREW_DIR, "main.py")
+    # Run from a scratch directory so log files don't end up in the source tree
+    with tempfile.TemporaryDirectory() as workdir:
+        spec_path = os.path.join(workdir, "spec.json")
+        with open(spec_path, "w") as f:
+            json.dump(SPEC, f)
+        commands = {name: [sys.executable, "-c", code] for name, code in SCENARIOS.items()}
+        commands["main.py --help"] = [sys.executable, main_script, "--help"]
+        commands["main.py --dry-run"] = [sys.executable, main_script, "--dry-run", "--spec", spec_path]
+
+        print(f"{'scenario':<42} {'median ms':>10} {'min ms':>10}  crewai imported")
+        for name, command in commands.items():
+            timings = _time_command(command, args.runs, workdir)
+            code = SCENARIOS.get(name)
+            crewai = _imports_crewai(code, workdir) if code else None
+            crewai_label = {True: "yes", False: "no", None: "n/a"}[crewai]
+            print(f"{name:<42} {statistics.median(timings):>10.1f} {min(timings):>10.1f}  {crewai_label}")
+
+if __name__ == "__main__":
+    main()
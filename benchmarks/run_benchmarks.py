@@ -0,0 +1,333 @@
+"""Offline benchmark suite for the orchestration framework.
+
+All LLM calls are served by ReplayLLM from a synthetic transcript, so the
+suite needs no network access or API keys. It measures:
+
+* end-to-end generate_project() runtime and peak memory
+* per-task orchestration overhead (task wall time minus LLM and tool time)
+* write_file throughput for thousands of files
+* write_file throughput with synchronous logging, the queue logging pipeline and quiet mode
+* writing a project and delivering it as a zip, from disk storage and from in-memory storage
+* LLM request latency and connection reuse of the pooled HTTP clients against a local mock
+  provider, compared to opening a connection per request
+
+Usage:
+    python benchmarks/run_benchmarks.py [--runs N] [--latency SECONDS] [--files N]
+        [--http-calls N] [--handshake SECONDS] [--json PATH]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import tempfile
+import statistics
+import threading
+import tracemalloc
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "crew"))
+
+SPEC = {
+    "project_name": "Benchmark App",
+    "project_description": "A todo application used to benchmark the crew",
+    "features": "add tasks, tag tasks, filter by tag",
+    "technology_stack": "Streamlit, Python",
+    "project_type": "custom"
+}
+
+
+@contextlib.contextmanager
+def _in_directory(path):
+    """Temporarily change the working directory."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _task_overheads(spans):
+    """Return the orchestration overhead of each task: wall time not spent in LLM or tool calls."""
+    busy = {}
+    walls = {}
+    for span in spans:
+        task = span["args"].get("task")
+        if span["cat"] == "task":
+            walls[task] = walls.get(task, 0.0) + span["duration"]
+        elif span["cat"] in ("llm", "tool"):
+            busy[task] = busy.get(task, 0.0) + span["duration"]
+    return {task: max(0.0, wall - busy.get(task, 0.0)) for task, wall in walls.items()}
+
+
+def bench_end_to_end(runs, latency, files_per_agent):
+    """Run generate_project() against the replay LLM and measure runtime, overhead and memory."""
+    import llm
+    from main import generate_project
+    from replay import synthetic_transcript, replay_llm_factory
+    from tracing import tracer
+
+    transcript = synthetic_transcript(files_per_agent=files_per_agent)
+    durations, peaks = [], []
+    overheads = {}
+    for _ in range(runs):
+        llm.set_llm_factory(replay_llm_factory(transcript, latency=latency))
+        with tempfile.TemporaryDirectory() as workdir, _in_directory(workdir), \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            tracemalloc.start()
+            started = time.perf_counter()
+            summary = generate_project(dict(SPEC), os.path.join(workdir, "project"))
+            durations.append(time.perf_counter() - started)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        for task, overhead in _task_overheads(tracer.spans(summary["run_id"])).items():
+            overheads.setdefault(task, []).append(overhead)
+        tracer.reset(summary["run_id"])
+    llm.set_llm_factory(None)
+
+    return {
+        "runs": runs,
+        "latency_seconds": latency,
+        "median_seconds": statistics.median(durations),
+        "min_seconds": min(durations),
+        "peak_memory_bytes": max(peaks),
+        "task_overhead_seconds": {task: statistics.median(values) for task, values in overheads.items()},
+    }
+
+
+def bench_write_file(file_count, file_size):
+    """Measure save_file throughput for many files, including identical-content rewrites."""
+    from file_writer import created_files, save_file
+
+    content = ("x = 1  # benchmark line\n" * max(1, file_size // 24))
+    created_files.clear()
+    with tempfile.TemporaryDirectory() as workdir, _in_directory(workdir), \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        started = time.perf_counter()
+        for i in range(file_count):
+            save_file(f"pkg_{i % 50}/module_{i}.py", content)
+        write_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(file_count):
+            save_file(f"pkg_{i % 50}/module_{i}.py", content)
+        identical_seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    created_files.clear()
+
+    return {
+        "files": file_count,
+        "file_size": len(content),
+        "files_per_second": file_count / write_seconds,
+        "mb_per_second": file_count * len(content) / write_seconds / 1e6,
+        "identical_rewrites_per_second": file_count / identical_seconds,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_storage(file_count, file_size):
+    """Write a project and archive it as a zip, with the files on disk and with the files in memory."""
+    from file_writer import FileRegistry, save_file, set_workspace, current_workspace
+    from storage import create_storage, write_archive
+
+    content = ("x = 1  # benchmark line\n" * max(1, file_size // 24))
+    results = {}
+    for kind in ("disk", "memory"):
+        with tempfile.TemporaryDirectory() as workdir, \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            root = os.path.join(workdir, "project")
+            storage = create_storage(kind, root)
+            token = set_workspace(root, FileRegistry(), storage)
+            tracemalloc.start()
+            started = time.perf_counter()
+            for i in range(file_count):
+                save_file(f"pkg_{i % 50}/module_{i}.py", content)
+            archive = write_archive(storage, os.path.join(workdir, "project.zip"))
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            current_workspace.reset(token)
+            storage.close()
+        results[kind] = {"files_per_second": file_count / seconds, "archive_bytes": archive["archive_bytes"],
+                         "peak_memory_bytes": peak}
+    results.update({"files": file_count, "file_size": len(content)})
+    return results
+
+
+def bench_logging(file_count, file_size):
+    """Measure save_file throughput under synchronous logging, the queue pipeline and quiet mode."""
+    from file_writer import created_files, save_file
+    from log_pipeline import configure_logging, stop_logging, set_quiet
+
+    content = ("x = 1  # benchmark line\n" * max(1, file_size // 24))
+    root = logging.getLogger()
+    previous_level = root.level
+    results = {}
+    for mode in ("sync", "queue", "queue_quiet"):
+        created_files.clear()
+        with tempfile.TemporaryDirectory() as workdir, _in_directory(workdir), \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+                contextlib.redirect_stderr(devnull):
+            log_path = os.path.join(workdir, "bench.log")
+            if mode == "sync":
+                # The handlers main.py used to install at import time
+                handlers = [logging.FileHandler(log_path), logging.StreamHandler()]
+                for handler in handlers:
+                    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+                root.handlers[:] = handlers
+                root.setLevel(logging.INFO)
+            else:
+                configure_logging(level=logging.INFO, log_file=log_path, quiet=mode == "queue_quiet")
+            started = time.perf_counter()
+            for i in range(file_count):
+                # Non-Python files, so validation doesn't add to the measured time
+                save_file(f"pkg_{i % 50}/data_{i}.txt", content)
+            seconds = time.perf_counter() - started
+            if mode == "sync":
+                for handler in root.handlers:
+                    handler.close()
+                root.handlers[:] = []
+            else:
+                stop_logging()
+                set_quiet(False)
+            log_bytes = os.path.getsize(log_path)
+        results[mode] = {"files_per_second": file_count / seconds, "log_bytes": log_bytes}
+    created_files.clear()
+    root.setLevel(previous_level)
+    return {"files": file_count, **results}
+
+
+class _MockProviderHandler(BaseHTTPRequestHandler):
+    """Chat completion endpoint that charges a handshake delay once per connection."""
+    protocol_version = "HTTP/1.1"
+    handshake = 0.0
+    latency = 0.0
+
+    def setup(self):
+        # Stands in for the TCP and TLS handshake of a real provider
+        time.sleep(self.handshake)
+        super().setup()
+        # Headers and body are written separately, don't let Nagle delay the body on kept-alive connections
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        time.sleep(self.latency)
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_http_pool(calls, concurrency, handshake, latency):
+    """Send chat requests to a local mock provider with pooled and with per-request connections."""
+    from http_pool import HttpClientPool
+
+    handler = type("Handler", (_MockProviderHandler,), {"handshake": handshake, "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    payload = {"model": "gpt-4o", "messages": [{"role": "user", "content": "ping"}]}
+
+    results = {}
+    try:
+        # An expiry of 0 closes every connection after its request, like a client per call
+        for mode, keepalive_expiry in (("pooled", 60.0), ("per_request", 0.0)):
+            pool = HttpClientPool({}, pool_size=concurrency, keepalive_expiry=keepalive_expiry)
+            client = pool.http_client("openai")
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for response in executor.map(lambda _: client.post(url, json=payload), range(calls)):
+                    response.raise_for_status()
+            seconds = time.perf_counter() - started
+            stats = pool.metrics()["openai"]
+            pool.close()
+            results[mode] = {
+                "requests_per_second": calls / seconds,
+                "new_connections": stats["new_connections"],
+                "reuse_ratio": stats["reuse_ratio"],
+                "latency_ms": stats["latency_ms"],
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+    results.update({"calls": calls, "concurrency": concurrency, "handshake_seconds": handshake})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="end-to-end runs")
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial seconds of latency per LLM call")
+    parser.add_argument("--files-per-agent", type=int, default=5, help="files written per agent in the transcript")
+    parser.add_argument("--files", type=int, default=5000, help="files written in the write_file benchmark")
+    parser.add_argument("--file-size", type=int, default=2000, help="bytes per file in the write_file benchmark")
+    parser.add_argument("--http-calls", type=int, default=200, help="requests sent in the HTTP pool benchmark")
+    parser.add_argument("--http-concurrency", type=int, default=8, help="concurrent requests in the HTTP pool benchmark")
+    parser.add_argument("--handshake", type=float, default=0.03,
+                        help="simulated connection handshake seconds of the mock provider")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # Every run must do the full work instead of reusing the previous run's architecture,
+    # and measure only the generation, not installing and running the generated tests
+    os.environ.setdefault("SPEC_INDEX_ENABLED", "false")
+    os.environ.setdefault("TEST_RUNNER_ENABLED", "false")
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {
+        "write_file": bench_write_file(args.files, args.file_size),
+        "logging": bench_logging(args.files, args.file_size),
+        "storage": bench_storage(args.files, args.file_size),
+        "http_pool": bench_http_pool(args.http_calls, args.http_concurrency, args.handshake, args.latency),
+        "end_to_end": bench_end_to_end(args.runs, args.latency, args.files_per_agent),
+    }
+
+    write = results["write_file"]
+    print(f"write_file: {write['files']} files of {write['file_size']} bytes")
+    print(f"  {write['files_per_second']:.0f} files/s, {write['mb_per_second']:.1f} MB/s, "
+          f"{write['identical_rewrites_per_second']:.0f} identical rewrites/s, "
+          f"peak {write['peak_memory_bytes'] / 1e6:.1f} MB")
+    log = results["logging"]
+    print(f"logging: {log['files']} write_file calls")
+    for mode in ("sync", "queue", "queue_quiet"):
+        print(f"  {mode:<12} {log[mode]['files_per_second']:.0f} files/s")
+    storage = results["storage"]
+    print(f"storage: {storage['files']} files written and archived as zip")
+    for kind in ("disk", "memory"):
+        print(f"  {kind:<12} {storage[kind]['files_per_second']:.0f} files/s, "
+              f"peak {storage[kind]['peak_memory_bytes'] / 1e6:.1f} MB")
+    http = results["http_pool"]
+    print(f"http_pool: {http['calls']} requests, {http['concurrency']} concurrent, "
+          f"{http['handshake_seconds']}s handshake")
+    for mode in ("pooled", "per_request"):
+        stats = http[mode]
+        print(f"  {mode:<12} {stats['requests_per_second']:.0f} req/s, {stats['new_connections']} connections, "
+              f"p50 {stats['latency_ms']['p50']} ms, p95 {stats['latency_ms']['p95']} ms")
+    e2e = results["end_to_end"]
+    print(f"end-to-end: {e2e['runs']} runs, {e2e['latency_seconds']}s latency per LLM call")
+    print(f"  median {e2e['median_seconds']:.3f}s, min {e2e['min_seconds']:.3f}s, "
+          f"peak {e2e['peak_memory_bytes'] / 1e6:.1f} MB")
+    for task, overhead in e2e["task_overhead_seconds"].items():
+        print(f"  {task:<16} overhead {overhead * 1000:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,141 @@
-from crewai import Agent
-from file_writer import write_file
-
-# Architect Agent
-Architect_agent = Agent(
-    role="Software Architect",
-    goal=(
-        "Design comprehensive, production-ready architecture for the project and CREATE ACTUAL FILES. "
-        "Define folder structure, component interactions, and implementation guidelines. "
-        "Design a modern, responsive UI using appropriate frontend technologies based on project requirements. "
-        "YOU MUST CREATE FILES using the file_writer tool for ALL components you design. "
-        "DO NOT just describe files - actually create them using file_writer."
-    ),
-    backstory=(
-        "You are an experienced software architect with expertise across multiple technology stacks. "
-        "You excel at designing beautiful, user-friendly interfaces with modern frameworks. "
-        "You understand responsive design, accessibility, and modern UI/UX principles. "
-        "You adapt your approach to the specific needs of each project without relying on templates. "
-        "You always create actual files using the file_writer tool, never just describing what should be created."
-    ),
-    verbose=True,
-    allow_delegation=True,
-    llm="gpt-4o",
-    tools=[write_file],
-    temperature=0.3
-)
-
-# Developer Agent
-Developer_agent = Agent(
-    role="Senior Developer",
-    goal=(
-        "Implement high-quality, functional code by CREATING ACTUAL FILES. "
-        "Write clean, maintainable code in the appropriate languages based on project requirements. "
-        "Create beautiful, responsive UIs using suitable frontend technologies for the project. "
-        "YOU MUST USE file_writer tool to create ALL code files - DO NOT just describe what should be implemented."
-    ),
-    backstory=(
-        "You are an elite developer with expertise in multiple programming languages and frameworks. "
-        "You're adaptable and choose the right tools for each specific project. "
-        "You create stunning, modern UIs without relying on pre-made templates. "
-        "You understand responsive design, state management, and performance optimization. "
-        "You always create actual code files using the file_writer tool, never just describing implementation."
-    ),
-    verbose=True,
-    allow_delegation=True,
-    llm="o3-mini",
-    tools=[write_file],
-    temperature=0.2
-)
-
-# Tester Agent
-Tester_agent = Agent(
-    role="QA Engineer",
-    goal=(
-        "Develop comprehensive tests by CREATING ACTUAL TEST FILES. "
-        "Create unit tests, integration tests, and end-to-end tests as appropriate for the project. "
-        "Ensure high code coverage and verify all requirements are properly implemented. "
-        "YOU MUST USE file_writer tool to create ALL test files - DO NOT just describe what should be tested."
-    ),
-    backstory=(
-        "You are a meticulous QA engineer with expertise in test automation and quality processes. "
-        "You adapt your testing approach to match the specific technologies used in each project. "
-        "You excel at finding edge cases and ensuring systems behave correctly in all scenarios. "
-        "You always create actual test files using the file_writer tool, never just describing test cases."
-    ),
-    verbose=True,
-    allow_delegation=True,
-    llm="gpt-4o",
-    tools=[write_file],
-    temperature=0.2
-)
\ No newline at end of file
+import threading
+from typing import Any, Dict
+
+# Declarative agent specs. Agents are built on first use, so importing this
+# module doesn't import crewai or create any LLM clients.
+AGENT_SPECS = {
+    "architect": {
+        "role": "Software Architect",
+        "goal": (
+            "Design comprehensive, production-ready architecture for the project and CREATE ACTUAL FILES. "
+            "Define folder structure, component interactions, and implementation guidelines. "
+            "Design a modern, responsive UI using appropriate frontend technologies based on project requirements. "
+            "YOU MUST CREATE FILES using the file_writer tool for ALL components you design. "
+            "DO NOT just describe files - actually create them using file_writer."
+        ),
+        "backstory": (
+            "You are an experienced software architect with expertise across multiple technology stacks. "
+            "You excel at designing beautiful, user-friendly interfaces with modern frameworks. "
+            "You understand responsive design, accessibility, and modern UI/UX principles. "
+            "You adapt your approach to the specific needs of each project without relying on templates. "
+            "You always create actual files using the file_writer tool, never just describing what should be created."
+        ),
+        "model": "gpt-4o",
+        "temperature": 0.3,
+        "allow_delegation": True,
+        "tools": ["write_file", "write_files", "edit_file", "write_file_chunk", "read_file"]
+    },
+    "developer": {
+        "role": "Senior Developer",
+        "goal": (
+            "Implement high-quality, functional code by CREATING ACTUAL FILES. "
+            "Write clean, maintainable code in the appropriate languages based on project requirements. "
+            "Create beautiful, responsive UIs using suitable frontend technologies for the project. "
+            "YOU MUST USE file_writer tool to create ALL code files - DO NOT just describe what should be implemented."
+        ),
+        "backstory": (
+            "You are an elite developer with expertise in multiple programming languages and frameworks. "
+            "You're adaptable and choose the right tools for each specific project. "
+            "You create stunning, modern UIs without relying on pre-made templates. "
+            "You understand responsive design, state management, and performance optimization. "
+            "You always create actual code files using the file_writer tool, never just describing implementation."
+        ),
+        "model": "o3-mini",
+        "temperature": 0.2,
+        "allow_delegation": True,
+        "tools": ["write_file", "write_files", "edit_file", "write_file_chunk", "read_file"]
+    },
+    "tester": {
+        "role": "QA Engineer",
+        "goal": (
+            "Develop comprehensive tests by CREATING ACTUAL TEST FILES. "
+            "Create unit tests, integration tests, and end-to-end tests as appropriate for the project. "
+            "Ensure high code coverage and verify all requirements are properly implemented. "
+            "YOU MUST USE file_writer tool to create ALL test files - DO NOT just describe what should be tested."
+        ),
+        "backstory": (
+            "You are a meticulous QA engineer with expertise in test automation and quality processes. "
+            "You adapt your testing approach to match the specific technologies used in each project. "
+            "You excel at finding edge cases and ensuring systems behave correctly in all scenarios. "
+            "You always create actual test files using the file_writer tool, never just describing test cases."
+        ),
+        "model": "gpt-4o",
+        "temperature": 0.2,
+        "allow_delegation": True,
+        "tools": ["write_file", "write_files", "edit_file", "write_file_chunk", "read_file"]
+    }
+}
+
+# Module attribute names the agents were historically exported under
+_LEGACY_NAMES = {
+    "Architect_agent": "architect",
+    "Developer_agent": "developer",
+    "Tester_agent": "tester"
+}
+
+_agents = {}
+_lock = threading.Lock()
+
+
+def _resolve_tools(names):
+    """Return the tool objects for the tool names of an agent spec."""
+    import file_writer
+    return [getattr(file_writer, name) for name in names]
+
+
+def build_agent(name: str, **overrides) -> Any:
+    """
+    Build a new agent instance from its spec.
+
+    Args:
+        name: Agent name from AGENT_SPECS
+        **overrides: Spec values to override for this instance
+
+    Returns:
+        A new crewai Agent
+    """
+    from crewai import Agent
+    from llm import create_llm
+
+    if name not in AGENT_SPECS:
+        raise KeyError(f"Unknown agent: {name}")
+    spec = {**AGENT_SPECS[name], **overrides}
+    return Agent(
+        role=spec["role"],
+        goal=spec["goal"],
+        backstory=spec["backstory"],
+        verbose=True,
+        allow_delegation=spec["allow_delegation"],
+        llm=create_llm(spec["model"], namespace=name, temperature=spec["temperature"]),
+        tools=_resolve_tools(spec["tools"]),
+        temperature=spec["temperature"]
+    )
+
+
+def get_agent(name: str) -> Any:
+    """Return the shared agent instance for a name, building it on first use."""
+    agent = _agents.get(name)
+    if agent is None:
+        with _lock:
+            agent = _agents.get(name)
+            if agent is None:
+                agent = _agents[name] = build_agent(name)
+    return agent
+
+
+def reset_agents() -> None:
+    """Drop the shared agent instances so the next access rebuilds them from their specs."""
+    with _lock:
+        _agents.clear()
+
+
+def get_agents() -> Dict[str, Any]:
+    """Return all shared agent instances keyed by name."""
+    return {name: get_agent(name) for name in AGENT_SPECS}
+
+
+def __getattr__(name):
+    # Keep `agents.Architect_agent` and friends working, built lazily on access
+    if name in _LEGACY_NAMES:
+        return get_agent(_LEGACY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
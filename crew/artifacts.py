@@ -0,0 +1,156 @@
+import os
+import ast
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from storage import DiskStorage
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of symbols / headings listed per file
+MAX_ENTRIES_PER_FILE = 40
+# Characters of a task's final answer kept in the downstream context
+MAX_ANSWER_CHARS = 1500
+
+
+def _signature(node: ast.AST) -> str:
+    """Return the signature of a function definition."""
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def python_symbols(source: str) -> List[str]:
+    """
+    Extract the top-level classes, functions and method signatures of Python source.
+
+    Args:
+        source: Python source code
+
+    Returns:
+        One line per symbol, methods indented below their class
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return [f"<syntax error line {e.lineno}: {e.msg}>"]
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(f"L{node.lineno} {_signature(node)}")
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            symbols.append(f"L{node.lineno} class {node.name}" + (f"({bases})" if bases else ""))
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    symbols.append(f"  L{item.lineno} {_signature(item)}")
+    return symbols
+
+
+def markdown_headings(source: str) -> List[str]:
+    """Return the headings of a markdown document with their line numbers."""
+    headings = []
+    in_code = False
+    for number, line in enumerate(source.splitlines(), 1):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        elif not in_code and line.startswith("#"):
+            headings.append(f"L{number} {line.strip()}")
+    return headings
+
+
+def index_file(path: str, root: str = ".", storage=None) -> Dict[str, Any]:
+    """
+    Build the index entry of a single file.
+
+    Args:
+        path: Path relative to root
+        root: Project root directory
+        storage: Storage backend holding the file, the disk below root if omitted
+
+    Returns:
+        Dictionary with path, size, line count and extracted symbols or headings
+    """
+    storage = storage or DiskStorage(root)
+    entry = {"path": path, "size": storage.stat(path)[0], "lines": 0, "outline": []}
+    try:
+        source = storage.read(path).decode("utf-8")
+    except (OSError, UnicodeDecodeError):
+        return entry
+    entry["lines"] = source.count("\n") + (0 if source.endswith("\n") or not source else 1)
+    if path.endswith(".py"):
+        entry["outline"] = python_symbols(source)
+    elif path.endswith((".md", ".markdown")):
+        entry["outline"] = markdown_headings(source)
+    return entry
+
+
+def build_artifact_index(paths: Iterable[str], root: str = ".", storage=None) -> List[Dict[str, Any]]:
+    """Build index entries for the given files, skipping files that no longer exist."""
+    storage = storage or DiskStorage(root)
+    entries = []
+    for path in sorted(set(paths)):
+        if storage.exists(path):
+            entries.append(index_file(path, root, storage))
+    return entries
+
+
+def format_artifact_index(entries: List[Dict[str, Any]]) -> str:
+    """Format index entries as compact text for a task prompt."""
+    if not entries:
+        return "No files have been created yet."
+    lines = []
+    for entry in entries:
+        lines.append(f"- {entry['path']} ({entry['size']} bytes, {entry['lines']} lines)")
+        outline = entry["outline"]
+        for item in outline[:MAX_ENTRIES_PER_FILE]:
+            lines.append(f"    {item}")
+        if len(outline) > MAX_ENTRIES_PER_FILE:
+            lines.append(f"    ... {len(outline) - MAX_ENTRIES_PER_FILE} more")
+    return "\n".join(lines)
+
+
+def summarize_answer(answer: Any, limit: int = MAX_ANSWER_CHARS) -> str:
+    """Shorten a task's final answer for use as downstream context."""
+    text = str(answer).strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + f"\n... [{len(text) - limit} more characters omitted]"
+
+
+class ArtifactContextBuilder:
+    """Builds the context of a task from the files its upstream tasks created.
+
+    Instead of the raw upstream outputs, downstream tasks receive a short
+    summary of each upstream answer and an index of the files created by all
+    of their ancestor tasks; file contents can be read on demand with the
+    read_file tool.
+    """
+
+    def __init__(self, registry, root: Optional[str] = None, storage=None):
+        """
+        Initialize the builder.
+
+        Args:
+            registry: FileRegistry recording which task wrote each file
+            root: Project root directory, defaults to the working directory at build time
+            storage: Storage backend holding the files, the disk below root if omitted
+        """
+        self.registry = registry
+        self.root = root
+        self.storage = storage
+
+    def __call__(self, task_id: str, ancestors: List[str], dependencies: List[str], results: Dict[str, Any]) -> str:
+        """Return the context text for a task."""
+        upstream = set(ancestors)
+        paths = [record.path for record in self.registry.records() if record.task in upstream]
+        entries = build_artifact_index(paths, self.root or os.getcwd(), self.storage)
+        sections = [
+            f"RESULT OF {dep.upper()} TASK:\n{summarize_answer(results[dep])}" for dep in dependencies
+        ]
+        sections.append(
+            "FILES CREATED SO FAR (use the \"Read lines of a file\" tool to look at specific lines):\n"
+            + format_artifact_index(entries)
+        )
+        logger.info(f"Context for {task_id}: {len(entries)} indexed files from {', '.join(ancestors) or 'no tasks'}")
+        return "\n\n".join(sections)
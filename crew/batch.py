@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("project_name", "project_description")
+
+
+def apply_spec_defaults(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check the required fields of a project spec and fill in the optional ones.
+
+    Args:
+        spec: project_info dictionary, updated in place
+
+    Returns:
+        The same dictionary
+
+    Raises:
+        ValueError: If the spec is not an object or a required field is missing
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("spec must be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS if not spec.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    spec.setdefault("features", "")
+    spec.setdefault("technology_stack", "")
+    spec.setdefault("project_type", "custom")
+    return spec
+
+
+def load_specs(spec_file: str) -> List[Dict[str, Any]]:
+    """
+    Load project specs from a JSONL file.
+
+    Each line holds a project_info dictionary as written to project_config/project_info.json.
+    Blank lines and lines starting with '#' are ignored.
+
+    Args:
+        spec_file: Path to the JSONL file
+
+    Returns:
+        List of project_info dictionaries with defaults applied
+    """
+    specs = []
+    with open(spec_file, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                spec = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{spec_file}:{line_number}: invalid JSON: {e}") from e
+            try:
+                specs.append(apply_spec_defaults(spec))
+            except ValueError as e:
+                raise ValueError(f"{spec_file}:{line_number}: {e}") from e
+    return specs
+
+
+def assign_output_dirs(specs: List[Dict[str, Any]], output_root: str) -> List[str]:
+    """Give every spec its own output directory, even if project names collide."""
+    from main import project_dir_name
+
+    output_dirs = []
+    used = set()
+    for index, spec in enumerate(specs):
+        base = name = project_dir_name(spec["project_name"])
+        # A suffixed name can itself be the name of a later project, e.g. "shop_project_1"
+        suffix = index
+        while name in used:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        used.add(name)
+        output_dirs.append(os.path.join(os.path.abspath(output_root), name))
+    return output_dirs
+
+
+def _run_spec(index: int, project_info: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """Generate a single project in a worker process and return its summary record."""
+    started = time.time()
+    os.makedirs(os.path.join(output_dir, "project_config"), exist_ok=True)
+    log_path = os.path.join(output_dir, "project_config", "run.log")
+    record = {"index": index, "project_name": project_info["project_name"], "output_dir": output_dir}
+
+    # Keep the verbose crew output of each project in its own log instead of interleaving it
+    stderr = sys.stderr
+    with open(log_path, "a", encoding="utf-8") as log_file, \
+            contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+        try:
+            from config import get_config
+            from main import generate_project
+            # Log of the project next to its console output, JSON lines with LOG_FORMAT=json
+            config = get_config()
+            log_name = "crew_log.jsonl" if config.log_format == "json" else "crew.log"
+            config.configure_logging(os.path.join(output_dir, "project_config", log_name))
+            record.update(generate_project(project_info, output_dir))
+            record["status"] = "succeeded"
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Project {project_info['project_name']} failed: {e}", exc_info=True)
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            # The console log handler was bound to the redirected stderr, which is closed below
+            from log_pipeline import set_console_stream
+            set_console_stream(stderr)
+    record["duration_seconds"] = round(time.time() - started, 2)
+    return record
+
+
+def run_batch(spec_file: str, output_root: str, workers: int, summary_file: str) -> List[Dict[str, Any]]:
+    """
+    Generate every project in a spec file using a pool of worker processes.
+
+    Args:
+        spec_file: JSONL file with one project spec per line
+        output_root: Directory the project output directories are created in
+        workers: Number of projects generated concurrently
+        summary_file: JSONL file receiving one summary record per project
+
+    Returns:
+        List of summary records in completion order
+    """
+    specs = load_specs(spec_file)
+    output_dirs = assign_output_dirs(specs, output_root)
+    logger.info(f"Generating {len(specs)} projects from {spec_file} with {workers} workers")
+
+    records = []
+    # A fresh process per project keeps its redirected console output and the crewai state isolated
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1) as executor, \
+            open(summary_file, "a", encoding="utf-8") as summary:
+        futures = {
+            executor.submit(_run_spec, index, spec, output_dir): index
+            for index, (spec, output_dir) in enumerate(zip(specs, output_dirs))
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process itself died
+                record = {
+                    "index": index,
+                    "project_name": specs[index]["project_name"],
+                    "output_dir": output_dirs[index],
+                    "status": "failed",
+                    "error": f"{type(e).__name__}: {e}"
+                }
+            summary.write(json.dumps(record) + "\n")
+            summary.flush()
+            records.append(record)
+            status = "✅" if record["status"] == "succeeded" else "❌"
+            print(f"{status} [{len(records)}/{len(specs)}] {record['project_name']} -> {record['output_dir']}")
+    return records
+
+
+def main():
+    from config import config
+
+    parser = argparse.ArgumentParser(description="Generate many projects from a JSONL spec file.")
+    parser.add_argument("spec_file", help="JSONL file with one project_info object per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of projects generated concurrently")
+    parser.add_argument("--output-root", default=config.output_base_dir,
+                        help="directory the project directories are created in")
+    parser.add_argument("--summary", default="batch_summary.jsonl",
+                        help="JSONL file receiving one summary record per project")
+    args = parser.parse_args()
+
+    config.configure_logging()
+    try:
+        records = run_batch(args.spec_file, args.output_root, max(1, args.workers), args.summary)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    failed = sum(1 for record in records if record["status"] != "succeeded")
+    print(f"\n📦 Generated {len(records) - failed}/{len(records)} projects, summary written to {args.summary}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint file below the project root, rewritten after every finished task
+CHECKPOINT_FILE = "project_config/checkpoint.json"
+
+
+def inputs_digest(project_info: Dict[str, Any]) -> str:
+    """Return a digest of the project inputs a checkpoint is only valid for."""
+    return hashlib.sha256(json.dumps(project_info, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _stored_digest(storage, relpath: str) -> Optional[str]:
+    """Return the SHA-256 hex digest of a stored file, None if it doesn't exist."""
+    if not storage.exists(relpath) or storage.is_dir(relpath):
+        return None
+    digest = hashlib.sha256()
+    with storage.open(relpath) as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """Persists the output and written files of every finished task of a run.
+
+    The checkpoint is a single JSON file in the project's storage, so a run
+    that failed or was interrupted can be resumed from its first incomplete
+    task. A task only counts as complete on resume if every file it wrote is
+    still present with the digest it was written with, and only if the
+    project inputs are unchanged.
+    """
+
+    def __init__(self, storage, registry, project_info: Dict[str, Any], path: str = CHECKPOINT_FILE):
+        """
+        Initialize the store.
+
+        Args:
+            storage: Storage backend of the project
+            registry: FileRegistry of the run, telling which task wrote each file
+            project_info: Inputs of the run
+            path: Checkpoint file relative to the project root
+        """
+        self.storage = storage
+        self.registry = registry
+        self.path = path
+        self.inputs_digest = inputs_digest(project_info)
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def record(self, task_id: str, output: Any, dependencies: Optional[List[str]] = None) -> None:
+        """
+        Persist a finished task with the files it has written.
+
+        Args:
+            task_id: ID of the finished task
+            output: Output of the task, stored as text
+            dependencies: Tasks the task ran after, needed to restore tasks added during a run
+        """
+        files = [asdict(record) for record in self.registry.records() if record.task == task_id]
+        with self._lock:
+            self._tasks[task_id] = {"output": str(output), "files": files, "completed_at": time.time()}
+            if dependencies is not None:
+                self._tasks[task_id]["dependencies"] = list(dependencies)
+            self._save()
+        logger.info(f"Checkpointed task {task_id} with {len(files)} files")
+
+    def _save(self) -> None:
+        """Write the checkpoint file, replacing the previous one atomically."""
+        data = {"inputs_digest": self.inputs_digest, "tasks": self._tasks}
+        self.storage.write(self.path, json.dumps(data, indent=2).encode("utf-8"))
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Return the tasks of the stored checkpoint, empty if there is none or the inputs changed."""
+        if not self.storage.exists(self.path):
+            return {}
+        try:
+            data = json.loads(self.storage.read(self.path).decode("utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return {}
+        if data.get("inputs_digest") != self.inputs_digest:
+            logger.info("Project inputs changed since the checkpoint, starting over")
+            return {}
+        return data.get("tasks", {})
+
+    def resume(self, order: List[str], dependencies: Optional[Dict[str, List[str]]] = None,
+               on_restored: Optional[Callable[[Any, bytes], None]] = None) -> Dict[str, str]:
+        """
+        Restore the completed tasks of the stored checkpoint.
+
+        A task is restored if its checkpoint is complete and all of its dependencies
+        were restored, so the run restarts from the first incomplete task and
+        everything downstream of it. Dependencies recorded in a checkpoint take
+        precedence, which also restores tasks added during the run. The files of
+        restored tasks are registered in the registry again, and the checkpoint is
+        rewritten with the restored tasks only, so the checkpoints of tasks that
+        will run again can never be mistaken for complete ones.
+
+        Args:
+            order: Task IDs in execution order
+            dependencies: Mapping of task ID to the task IDs it depends on; without
+                it every task depends on all tasks before it
+            on_restored: Callable(record, content) called with the FileRecord and
+                content of every restored file, e.g. to validate it again
+
+        Returns:
+            Mapping of restored task ID to its output
+        """
+        stored = self.load()
+        # A file written by several tasks must have the content of the latest write
+        latest = {}
+        for checkpoint in stored.values():
+            for entry in checkpoint["files"]:
+                if entry["path"] not in latest or entry["mtime"] >= latest[entry["path"]]["mtime"]:
+                    latest[entry["path"]] = entry
+        expected = {relpath: entry["digest"] for relpath, entry in latest.items()}
+
+        restored = []
+        rejected = set()
+        candidates = list(order) + [task_id for task_id in stored if task_id not in order]
+        progress = True
+        while progress:
+            progress = False
+            for position, task_id in enumerate(candidates):
+                checkpoint = stored.get(task_id)
+                if checkpoint is None or task_id in restored or task_id in rejected:
+                    continue
+                deps = checkpoint.get("dependencies")
+                if deps is None:
+                    deps = candidates[:position] if dependencies is None else dependencies.get(task_id, [])
+                if any(dep not in restored for dep in deps):
+                    continue
+                changed = [entry["path"] for entry in checkpoint["files"]
+                           if _stored_digest(self.storage, entry["path"]) != expected[entry["path"]]]
+                if changed:
+                    logger.info(f"Task {task_id} must run again, its files changed: {', '.join(changed[:5])}")
+                    rejected.add(task_id)
+                    continue
+                restored.append(task_id)
+                progress = True
+
+        outputs = {}
+        with self._lock:
+            self._tasks = {task_id: stored[task_id] for task_id in restored}
+            self._save()
+        # Register each restored file once, for the last restored task that wrote it
+        files = {}
+        for task_id in restored:
+            for entry in stored[task_id]["files"]:
+                files[entry["path"]] = (task_id, entry)
+            outputs[task_id] = stored[task_id]["output"]
+        for relpath, (task_id, entry) in sorted(files.items()):
+            size, mtime = self.storage.stat(relpath)
+            record = self.registry.record(relpath, digest=expected[relpath], size=size, mtime=mtime,
+                                          agent=entry.get("agent"), task=task_id)
+            if on_restored is not None:
+                on_restored(record, self.storage.read(relpath))
+        if restored:
+            logger.info(f"Resuming after completed tasks: {', '.join(restored)}")
+        return outputs
@@ -1,8 +1,11 @@
 # config.py
 import os
 import logging
-from dotenv import load_dotenv
-from typing import Dict, Any, Optional
+import threading
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+
+if TYPE_CHECKING:
+    from http_pool import HttpClientPool
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -13,6 +16,7 @@ class Config:
     def __init__(self, env_file: str = ".env"):
         """Initialize configuration from environment variables."""
         # Load environment variables
+        from dotenv import load_dotenv
         load_dotenv(env_file)
         
         # API keys and providers
@@ -21,6 +25,18 @@ class Config:
         self.azure_openai_api_key = os.getenv("AZURE_OPENAI_API_KEY")
         self.azure_openai_api_base = os.getenv("AZURE_OPENAI_API_BASE")
         self.azure_openai_api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+        self.openai_api_base = os.getenv("OPENAI_API_BASE")
+        self.anthropic_api_base = os.getenv("ANTHROPIC_API_BASE")
+        
+        # Pooled HTTP clients shared by all LLM calls to a provider
+        self.http_pool_enabled = os.getenv("HTTP_POOL_ENABLED", "true").lower() == "true"
+        self.http_pool_size = int(os.getenv("HTTP_POOL_SIZE", "20"))
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+        self.http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+        self.http_read_timeout = float(os.getenv("HTTP_READ_TIMEOUT", "600"))
+        self.http2_enabled = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+        self._http_clients = None
+        self._http_clients_lock = threading.Lock()
         
         # Default LLM settings
         self.default_llm_provider = os.getenv("DEFAULT_LLM_PROVIDER", "openai")
@@ -28,9 +44,98 @@ class Config:
         
         # System settings
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        self.log_file = os.getenv("LOG_FILE", "crewai_execution.log")
+        # Plain text by default, "json" writes one JSON object per record for log shippers
+        self.log_format = os.getenv("LOG_FORMAT", "text").lower()
+        self.log_max_mb = int(os.getenv("LOG_MAX_MB", "50"))
+        self.log_backup_count = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+        self.log_compress = os.getenv("LOG_COMPRESS", "true").lower() == "true"
+        self.log_quiet = os.getenv("LOG_QUIET", "false").lower() == "true"
         self.output_base_dir = os.getenv("OUTPUT_BASE_DIR", "./generated_projects")
-        self.max_rpm = int(os.getenv("MAX_RPM", "10"))
+        # Client-side rate limits per provider/model, 0 for no limit
+        self.max_rpm = int(os.getenv("MAX_RPM", "0"))
+        self.max_tpm = int(os.getenv("MAX_TPM", "0"))
+        # Completion tokens reserved per request under MAX_TPM when the model sets no max_tokens
+        self.rate_limit_completion_tokens = int(os.getenv("RATE_LIMIT_COMPLETION_TOKENS", "1024"))
+        self.rate_limit_backend = os.getenv("RATE_LIMIT_BACKEND", "thread").lower()
+        self.rate_limit_state_dir = os.getenv("RATE_LIMIT_STATE_DIR", ".crew_cache/rate_limits")
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.max_parallel_tasks = int(os.getenv("MAX_PARALLEL_TASKS", "2"))
+        # Split the implementation into per-module subtasks planned from architecture.md; opt-in,
+        # every subtask runs on its own Developer agent and adds LLM calls
+        self.implementation_fanout = os.getenv("IMPLEMENTATION_FANOUT", "false").lower() == "true"
+        self.implementation_max_modules = int(os.getenv("IMPLEMENTATION_MAX_MODULES", "6"))
+        # Module subtasks run at the same time, on workers besides MAX_PARALLEL_TASKS
+        self.implementation_workers = int(os.getenv("IMPLEMENTATION_WORKERS", "4"))
         self.test_mode = os.getenv("TEST_MODE", "false").lower() == "true"
+        self.trace_file = os.getenv("TRACE_FILE", "project_config/trace.json")
+        self.checkpoint_file = os.getenv("CHECKPOINT_FILE", "project_config/checkpoint.json")
+        self.transcript_record_file = os.getenv("TRANSCRIPT_RECORD_FILE")
+        
+        # Delegation limits per task, MAX_HOPS=0 disables delegation
+        self.delegation_max_depth = int(os.getenv("DELEGATION_MAX_DEPTH", "2"))
+        self.delegation_max_hops = int(os.getenv("DELEGATION_MAX_HOPS", "6"))
+        self.delegation_max_cycles = int(os.getenv("DELEGATION_MAX_CYCLES", "2"))
+        
+        # Storage of the generated files and archive delivery
+        self.storage_backend = os.getenv("STORAGE_BACKEND", "disk").lower()
+        self.storage_spill_kb = int(os.getenv("STORAGE_SPILL_KB", "1024"))
+        self.storage_memory_mb = int(os.getenv("STORAGE_MEMORY_MB", "256"))
+        self.storage_spill_dir = os.getenv("STORAGE_SPILL_DIR") or None
+        self.archive_format = os.getenv("ARCHIVE_FORMAT", "zip").lower()
+        self.archive_path = os.getenv("ARCHIVE_PATH") or None
+        
+        # Job server settings
+        self.server_host = os.getenv("SERVER_HOST", "127.0.0.1")
+        self.server_port = int(os.getenv("SERVER_PORT", "8000"))
+        self.server_workers = int(os.getenv("SERVER_WORKERS", "2"))
+        self.server_max_queue = int(os.getenv("SERVER_MAX_QUEUE", "100"))
+        # API tokens as "tenant:token" entries separated by commas; a random token is printed if empty
+        self.server_tokens = os.getenv("SERVER_TOKENS", "")
+        
+        # History of runs, tasks and written files
+        self.run_store_enabled = os.getenv("RUN_STORE_ENABLED", "true").lower() == "true"
+        self.run_store_path = os.getenv("RUN_STORE_PATH", ".crew_cache/runs.sqlite")
+        
+        # Near-duplicate spec detection settings
+        self.spec_index_enabled = os.getenv("SPEC_INDEX_ENABLED", "false").lower() == "true"
+        self.spec_index_path = os.getenv("SPEC_INDEX_PATH", ".crew_cache/spec_index.sqlite")
+        self.spec_similarity_threshold = float(os.getenv("SPEC_SIMILARITY_THRESHOLD", "0.6"))
+        # Skipping the architecture task for near-identical specs is opt-in, it changes the output
+        self.spec_reuse_enabled = os.getenv("SPEC_REUSE_ENABLED", "false").lower() == "true"
+        self.spec_reuse_threshold = float(os.getenv("SPEC_REUSE_THRESHOLD", "0.9"))
+        
+        # Validation of written files
+        self.validation_enabled = os.getenv("VALIDATION_ENABLED", "true").lower() == "true"
+        self.validation_workers = int(os.getenv("VALIDATION_WORKERS", "2"))
+        self.validation_timeout = float(os.getenv("VALIDATION_TIMEOUT", "5"))
+        self.validation_report_file = os.getenv("VALIDATION_REPORT_FILE", "project_config/validation.json")
+        
+        # Sandboxed test runs of the generated test suites
+        self.test_runner_enabled = os.getenv("TEST_RUNNER_ENABLED", "false").lower() == "true"
+        self.test_env_dir = os.getenv("TEST_ENV_DIR", ".crew_cache/venvs")
+        self.test_cache_path = os.getenv("TEST_CACHE_PATH", ".crew_cache/test_results.sqlite")
+        self.test_workers = int(os.getenv("TEST_WORKERS", "0"))
+        self.test_timeout = float(os.getenv("TEST_TIMEOUT", "60"))
+        self.test_file_timeout = float(os.getenv("TEST_FILE_TIMEOUT", "600"))
+        self.test_install_timeout = float(os.getenv("TEST_INSTALL_TIMEOUT", "900"))
+        self.test_report_file = os.getenv("TEST_REPORT_FILE", "project_config/test_results.json")
+        
+        # Model router settings
+        self.router_enabled = os.getenv("ROUTER_ENABLED", "false").lower() == "true"
+        self.router_policy = os.getenv("ROUTER_POLICY", "balanced").lower()
+        self.router_timeout = float(os.getenv("ROUTER_TIMEOUT", "120"))
+        self.router_hedge = os.getenv("ROUTER_HEDGE", "false").lower() == "true"
+        self.router_log_file = os.getenv("ROUTER_LOG_FILE", "project_config/routing.json")
+        self.router_openai_models = os.getenv("ROUTER_OPENAI_MODELS", "gpt-4o,o3-mini")
+        self.router_anthropic_models = os.getenv("ROUTER_ANTHROPIC_MODELS", "claude-3-opus-20240229")
+        self.router_azure_models = os.getenv("ROUTER_AZURE_MODELS", "")
+        
+        # LLM response cache settings
+        self.llm_cache_dir = os.getenv("LLM_CACHE_DIR", ".crew_cache")
+        self.llm_cache_max_mb = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+        self.llm_cache_ttl = float(os.getenv("LLM_CACHE_TTL", "0"))
+        self.llm_cache_mode = os.getenv("LLM_CACHE_MODE", "readwrite").lower()
         
         # Validate configuration
         self._validate_config()
@@ -78,20 +183,85 @@ class Config:
                 "model": self.default_llm_model
             }
     
-    def configure_logging(self) -> None:
-        """Configure the logging system based on settings."""
+    def get_model_candidates(self) -> List[Dict[str, Any]]:
+        """Get the models of every provider with credentials, for the model router."""
+        candidates = []
+        providers = [
+            ("openai", self.openai_api_key, self.router_openai_models, self.openai_api_base, None),
+            ("anthropic", self.anthropic_api_key, self.router_anthropic_models, self.anthropic_api_base, None),
+            ("azure", self.azure_openai_api_key, self.router_azure_models,
+             self.azure_openai_api_base, self.azure_openai_api_version),
+        ]
+        for provider, api_key, models, api_base, api_version in providers:
+            if not api_key:
+                continue
+            for model in filter(None, (name.strip() for name in models.split(","))):
+                candidates.append({
+                    "provider": provider,
+                    "model": model,
+                    "api_key": api_key,
+                    "base_url": api_base,
+                    "api_version": api_version
+                })
+        return candidates
+    
+    def get_http_clients(self) -> Optional["HttpClientPool"]:
+        """Return the pooled HTTP clients of the LLM providers, None if pooling is disabled."""
+        if not self.http_pool_enabled:
+            return None
+        if self._http_clients is None:
+            with self._http_clients_lock:
+                if self._http_clients is None:
+                    from http_pool import HttpClientPool
+                    self._http_clients = HttpClientPool(
+                        providers={
+                            "openai": {"api_key": self.openai_api_key, "base_url": self.openai_api_base},
+                            "anthropic": {"api_key": self.anthropic_api_key, "base_url": self.anthropic_api_base},
+                        },
+                        pool_size=self.http_pool_size,
+                        keepalive_expiry=self.http_keepalive_expiry,
+                        connect_timeout=self.http_connect_timeout,
+                        read_timeout=self.http_read_timeout,
+                        http2=self.http2_enabled
+                    )
+        return self._http_clients
+    
+    def configure_logging(self, log_file: Optional[str] = None) -> None:
+        """Configure the logging system based on settings.
+        
+        Args:
+            log_file: Log file to use instead of the configured LOG_FILE
+        """
         numeric_level = getattr(logging, self.log_level.upper(), None)
         if not isinstance(numeric_level, int):
             numeric_level = logging.INFO
         
-        logging.basicConfig(
+        # Log records are written by a listener thread, never by the agent threads
+        from log_pipeline import configure_logging
+        configure_logging(
             level=numeric_level,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler("crewai_execution.log"),
-                logging.StreamHandler()
-            ]
+            log_file=log_file or self.log_file,
+            json_format=self.log_format == "json",
+            max_bytes=self.log_max_mb * 1024 * 1024,
+            backup_count=self.log_backup_count,
+            compress=self.log_compress,
+            quiet=self.log_quiet
         )
 
-# Create a global config instance
-config = Config()
\ No newline at end of file
+_config = None
+_config_lock = threading.Lock()
+
+def get_config() -> Config:
+    """Return the global config instance, loading it on first use."""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = Config()
+    return _config
+
+def __getattr__(name):
+    # The global `config` instance is created lazily on first access
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,221 @@
+import logging
+import threading
+import contextvars
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tracing import tracer, current_task, current_agent, current_delegation
+
+logger = logging.getLogger(__name__)
+
+# Delegation budget of the task currently executing
+current_budget = contextvars.ContextVar("current_budget", default=None)
+
+
+class DelegationBudgetExceeded(Exception):
+    """Raised when a task exceeds its delegation limits or keeps delegating in a loop."""
+
+
+@dataclass
+class DelegationLimits:
+    """Delegation limits applied to every task separately."""
+    # Longest chain of nested delegations, 1 allows coworkers but no further delegation by them
+    max_depth: int = 2
+    # Delegations and questions to coworkers per task, 0 disables delegation
+    max_hops: int = 6
+    # Round trips or repeated requests between the same two agents per task
+    max_cycles: int = 2
+
+
+class DelegationBudget:
+    """Delegation hops of one task, checked against its limits.
+
+    A cycle is counted when work between two agents changes direction
+    (A delegates to B, then B to A) or when an agent sends the same request
+    to the same coworker again. Once a limit is exceeded the budget stays
+    exhausted, and the task stops at its next LLM call.
+    """
+
+    def __init__(self, task_id: str, limits: Optional[DelegationLimits] = None):
+        """
+        Initialize the budget.
+
+        Args:
+            task_id: ID of the task the delegations originate from
+            limits: Limits of the task, None to only count the delegations
+        """
+        self.task_id = task_id
+        self.limits = limits
+        self.hops = 0
+        self.cycles = {}
+        self.exceeded = None
+        self._directions = {}
+        self._requests = set()
+        self._lock = threading.Lock()
+
+    def enter(self, source: str, target: str, request: str, depth: int) -> None:
+        """
+        Count a delegation against the budget.
+
+        Args:
+            source: Role of the delegating agent
+            target: Role of the coworker
+            request: Task or question sent to the coworker
+            depth: Nesting depth of the delegation, 1 for a delegation by the task's agent
+
+        Raises:
+            DelegationBudgetExceeded: If the delegation exceeds a limit
+        """
+        with self._lock:
+            if self.exceeded is not None:
+                raise DelegationBudgetExceeded(self.exceeded)
+            pair = tuple(sorted((source, target)))
+            key = (source, target, " ".join(request.lower().split()))
+            cycles = self.cycles.get(pair, 0)
+            if self._directions.get(pair, source) != source or key in self._requests:
+                cycles += 1
+
+            reason = None
+            limits = self.limits
+            if limits is not None:
+                if depth > limits.max_depth:
+                    reason = f"delegation depth {depth} exceeds the limit of {limits.max_depth}"
+                elif self.hops + 1 > limits.max_hops:
+                    reason = f"more than {limits.max_hops} delegations"
+                elif cycles > limits.max_cycles:
+                    reason = (f"work went back and forth or was requested again between "
+                              f"{source} and {target} {cycles} times")
+            if reason is None:
+                self.hops += 1
+                self.cycles[pair] = cycles
+                self._directions[pair] = source
+                self._requests.add(key)
+                return
+            self.exceeded = f"Delegation budget of task '{self.task_id}' exceeded: {reason}"
+            raise DelegationBudgetExceeded(self.exceeded)
+
+    def check(self) -> None:
+        """Raise DelegationBudgetExceeded if the budget is exhausted."""
+        if self.exceeded is not None:
+            raise DelegationBudgetExceeded(self.exceeded)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the delegations counted so far."""
+        with self._lock:
+            return {
+                "hops": self.hops,
+                "cycles": {" <-> ".join(pair): count for pair, count in self.cycles.items() if count},
+                "exceeded": self.exceeded
+            }
+
+
+def raise_if_over_budget() -> None:
+    """Stop the current task at this point if its delegation budget is exhausted."""
+    budget = current_budget.get()
+    if budget is not None:
+        budget.check()
+
+
+def _resolve_role(name: str, roles: List[str]) -> str:
+    """Return the coworker role matching the name an agent used, the name itself if none matches."""
+    wanted = " ".join(str(name).lower().replace('"', "").split())
+    for role in roles:
+        if role.lower() == wanted:
+            return role
+    return str(name)
+
+
+def _delegate(execute, kind: str, source: str, target: str, agent_name: str, request: str,
+              context: Optional[str]) -> str:
+    """Run a delegation tool call within the budget of the current task."""
+    chain: Tuple[str, ...] = current_delegation.get() or (source,)
+    depth = len(chain)
+    budget = current_budget.get()
+    with tracer.span(f"{kind}:{target}", "delegation", source=source, target=target,
+                     kind=kind, depth=depth) as span:
+        if budget is not None:
+            try:
+                budget.enter(source, target, request, depth)
+            except DelegationBudgetExceeded as e:
+                logger.warning(str(e))
+                span["rejected"] = True
+                return f"Error: {e}. The task is stopped."
+        logger.info(f"{source} -> {target} ({kind}) in task {current_task.get()}, depth {depth}")
+        chain_token = current_delegation.set(chain + (target,))
+        agent_token = current_agent.set(target)
+        try:
+            return execute(agent_name, request, context)
+        finally:
+            current_agent.reset(agent_token)
+            current_delegation.reset(chain_token)
+
+
+def _coworker_execute(tool: Any, tools_for: Callable[[Any], List[Any]]):
+    """
+    Return a replacement for a delegation tool's _execute that gives the coworker its own tools.
+
+    crewai runs the coworker with only the tools of its agent, so a coworker
+    could never delegate further. Here it also gets the tools returned by
+    tools_for, including its own budgeted delegation tools.
+    """
+    from crewai import Task
+    from crewai.utilities.i18n import I18N_DEFAULT
+
+    execute = tool._execute
+
+    def run(agent_name, request, context=None):
+        wanted = tool.sanitize_agent_name(agent_name or "")
+        coworker = next((agent for agent in tool.agents if tool.sanitize_agent_name(agent.role) == wanted), None)
+        if coworker is None:
+            # crewai answers with the list of available coworkers
+            return execute(agent_name, request, context)
+        task = Task(description=request, agent=coworker, expected_output=I18N_DEFAULT.slice("manager_request"))
+        try:
+            return coworker.execute_task(task, context, tools=tools_for(coworker))
+        except Exception as e:
+            # Like crewai, report the failure to the delegating agent; an exhausted budget
+            # stops the task at that agent's next LLM call
+            return I18N_DEFAULT.errors("agent_tool_execution_error").format(
+                agent_role=tool.sanitize_agent_name(coworker.role), error=str(e))
+
+    return run
+
+
+def guard_delegation_tools(tools: List[Any], source: str, roles: List[str],
+                           tools_for: Optional[Callable[[Any], List[Any]]] = None) -> List[Any]:
+    """
+    Count every call of crewai delegation tools against the current task's budget.
+
+    The tools' _execute method, shared by "Delegate work to coworker" and
+    "Ask question to coworker", is replaced on the tool instances. LLM calls
+    and files written by the coworker are attributed to the delegating task.
+
+    Args:
+        tools: Delegation tools created by crewai's AgentTools
+        source: Role of the agent the tools are given to
+        roles: Roles of the coworkers
+        tools_for: Callable(agent) returning the tools a coworker works with, e.g. its
+            own guarded delegation tools; None to run coworkers with their agent's tools
+
+    Returns:
+        The same tools
+    """
+    for tool in tools:
+        kind = "ask" if "question" in tool.name.lower() else "delegate"
+        execute = tool._execute if tools_for is None else _coworker_execute(tool, tools_for)
+
+        def guarded(agent_name, task, context=None, _execute=execute, _kind=kind):
+            target = _resolve_role(agent_name, roles)
+            return _delegate(_execute, _kind, source, target, agent_name, task, context)
+
+        # crewai tools are pydantic models, bypass their attribute validation
+        object.__setattr__(tool, "_execute", guarded)
+    return tools
+
+
+def start_budget(task_id: str, limits: Optional[DelegationLimits]) -> DelegationBudget:
+    """Create the delegation budget of a task and bind it to the current context."""
+    budget = DelegationBudget(task_id, limits)
+    current_budget.set(budget)
+    current_delegation.set(None)
+    return budget
@@ -1,72 +1,709 @@
+import io
 import os
+import json
+import time
+import hashlib
 import logging
+import weakref
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
 from crewai.tools import tool
 
+from tracing import tracer, current_task, current_agent
+from log_pipeline import echo
+from storage import DiskStorage
+from patcher import apply_patch, PatchError
+from prompts import count_tokens
+from validation import get_validator, validator_kind, format_report
+
 logger = logging.getLogger(__name__)
 
-# Track files that have been created
-created_files = {}
+def set_current_agent(agent_name: Optional[str]) -> contextvars.Token:
+    """Record the agent that subsequent writes in this context belong to."""
+    return current_agent.set(agent_name)
 
-@tool("Create a file with specific content")
-def write_file(filepath: str, content: str) -> bool:
+
+def content_digest(content: str) -> str:
+    """Return the SHA-256 hex digest of file content."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class FileRecord:
+    """Compact record of a generated file."""
+    path: str
+    digest: str
+    size: int
+    mtime: float
+    agent: Optional[str] = None
+    task: Optional[str] = None
+
+
+class FileRegistry:
+    """Thread-safe registry of generated files, indexed by path.
+
+    Only a digest and metadata are kept per file, never the content itself.
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def __contains__(self, filepath: str) -> bool:
+        return filepath in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, filepath: str) -> Optional[FileRecord]:
+        """Return the record of a file, if it has been written."""
+        return self._records.get(filepath)
+
+    def is_identical(self, filepath: str, digest: str) -> bool:
+        """Check whether a file was already written with content of the given digest."""
+        record = self._records.get(filepath)
+        return record is not None and record.digest == digest
+
+    def record(self, filepath: str, digest: str, size: int, mtime: float, agent: Optional[str] = None,
+               task: Optional[str] = None) -> FileRecord:
+        """Register a written file, replacing any previous record for the path."""
+        record = FileRecord(path=filepath, digest=digest, size=size, mtime=mtime, agent=agent,
+                            task=task or current_task.get())
+        with self._lock:
+            self._records[filepath] = record
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                logger.error(f"File listener failed for {filepath}: {e}")
+        return record
+
+    def add_listener(self, listener) -> None:
+        """Call listener(record) after every recorded write, in the writing thread."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        """Stop calling a listener added with add_listener."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def records(self) -> List[FileRecord]:
+        """Return all records sorted by path."""
+        with self._lock:
+            return sorted(self._records.values(), key=lambda record: record.path)
+
+    def clear(self) -> None:
+        """Forget all registered files."""
+        with self._lock:
+            self._records.clear()
+
+    def manifest(self) -> Dict[str, Any]:
+        """Return the registry as a JSON-serializable manifest."""
+        records = self.records()
+        return {
+            "generated_at": time.time(),
+            "file_count": len(records),
+            "total_bytes": sum(record.size for record in records),
+            "files": [asdict(record) for record in records]
+        }
+
+
+# Track files that have been created outside of a workspace
+created_files = FileRegistry()
+
+
+@dataclass
+class Workspace:
+    """Output root, file registry and storage backend of one project generation."""
+    root: str
+    registry: FileRegistry
+    storage: Any = None
+
+
+# Workspace of the generation running in this context; None means the working directory
+current_workspace = contextvars.ContextVar("current_workspace", default=None)
+
+
+def set_workspace(root: str, registry: Optional[FileRegistry] = None, storage=None) -> contextvars.Token:
+    """
+    Direct the file tools of this context to a project root with its own registry.
+
+    Args:
+        root: Project root directory
+        registry: Registry of the files written below root, a new one if omitted
+        storage: Storage backend holding the files, a DiskStorage of root if omitted
+
+    Returns:
+        Token for current_workspace.reset()
+    """
+    root = os.path.abspath(root)
+    # An empty registry is falsy, so compare with None
+    return current_workspace.set(Workspace(root=root, registry=registry if registry is not None else FileRegistry(),
+                                           storage=storage or DiskStorage(root)))
+
+
+def project_root() -> str:
+    """Return the root directory files are written to in this context."""
+    workspace = current_workspace.get()
+    return workspace.root if workspace else os.getcwd()
+
+
+def file_registry() -> FileRegistry:
+    """Return the registry of the files written in this context."""
+    workspace = current_workspace.get()
+    return workspace.registry if workspace else created_files
+
+
+def file_storage():
+    """Return the storage backend files are written to in this context."""
+    workspace = current_workspace.get()
+    return workspace.storage if workspace else DiskStorage(os.getcwd())
+
+
+def _clean_path(filepath: str) -> str:
+    """Return a file path relative to the project root."""
+    # Clean filepath if it starts with /
+    if filepath.startswith('/'):
+        filepath = filepath.lstrip('/')
+    return filepath
+
+
+def _resolve_path(filepath: str):
+    """
+    Return the cleaned relative path and the absolute path of a file.
+
+    Raises:
+        ValueError: If the path leads outside the project root
+    """
+    filepath = _clean_path(filepath)
+    return filepath, file_storage().path(filepath)
+
+
+def save_file(filepath: str, content: str) -> bool:
     """
     Write content to a file, creating directories as needed.
-    
+
     Args:
         filepath: Path to the file (relative to current directory)
         content: Content to write to the file
-    
+
     Returns:
         True if successful, False otherwise
     """
+    with tracer.span("write_file", "tool", path=filepath, agent=current_agent.get(), bytes=0) as span:
+        span["success"] = _save_file(filepath, content, span)
+        return span["success"]
+
+
+def _save_file(filepath: str, content: str, span: Dict[str, Any], edit: bool = False) -> bool:
+    """Write a file and record the number of bytes written in the trace span."""
     try:
-        # Clean filepath if it starts with /
-        if filepath.startswith('/'):
-            filepath = filepath.lstrip('/')
-            
-        # Create the full path
-        full_path = os.path.join(os.getcwd(), filepath)
-        
+        filepath, full_path = _resolve_path(filepath)
+
         # Don't allow empty content or overwriting with empty content
         if not content.strip():
             logger.warning(f"Attempted to create file with empty content: {filepath}")
-            print(f"⚠️ Warning: Attempted to create file with empty content: {filepath}")
+            echo(f"⚠️ Warning: Attempted to create file with empty content: {filepath}")
             return False
-        
-        # Track if this would overwrite a file
-        if filepath in created_files:
-            # Don't allow overwriting with empty content
-            if not content.strip():
-                logger.warning(f"Attempted to overwrite file with empty content: {filepath}")
-                print(f"⚠️ Warning: Attempted to overwrite file with empty content: {filepath}")
-                return False
-            
-            # If it has the same content, don't rewrite
-            if created_files[filepath] == content:
-                logger.info(f"File content identical, not rewriting: {filepath}")
-                print(f"ℹ️ File content identical, not rewriting: {filepath}")
-                return True
-                
-            logger.info(f"Overwriting existing file: {filepath}")
-            print(f"🔄 Overwriting existing file: {filepath}")
-        
-        # Create directory if it doesn't exist
-        directory = os.path.dirname(full_path)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory, exist_ok=True)
-            logger.info(f"Created directory: {directory}")
-        
-        # Write content to the file
-        with open(full_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        # Track this file and its content    
-        created_files[filepath] = content
-            
-        logger.info(f"Created file: {full_path}")
-        print(f"✅ Created file: {filepath}")
+
+        digest = content_digest(content)
+        registry = file_registry()
+
+        # An edit checks the registered digest before writing, so no other write may land in between
+        with _file_lock(filepath):
+            # Track if this would overwrite a file
+            if filepath in registry and not edit:
+                # If it has the same content, don't rewrite
+                if registry.is_identical(filepath, digest):
+                    logger.info(f"File content identical, not rewriting: {filepath}")
+                    echo(f"ℹ️ File content identical, not rewriting: {filepath}")
+                    return True
+
+                logger.info(f"Overwriting existing file: {filepath}")
+                echo(f"🔄 Overwriting existing file: {filepath}")
+
+            # Write content to the file, creating directories as needed
+            data = content.encode('utf-8')
+            mtime = file_storage().write(filepath, data)
+
+            # Track this file by its digest
+            size = len(data)
+            span["bytes"] = size
+            registry.record(
+                filepath,
+                digest=digest,
+                size=size,
+                mtime=mtime,
+                agent=current_agent.get()
+            )
+
+        _submit_validation(filepath, digest, content)
+
+        if edit:
+            logger.info(f"Edited file: {full_path}")
+            echo(f"✏️ Edited file: {filepath}")
+        else:
+            logger.info(f"Created file: {full_path}")
+            echo(f"✅ Created file: {filepath}")
         return True
     except Exception as e:
         logger.error(f"Error creating file {filepath}: {e}")
-        print(f"❌ Error creating file {filepath}: {e}")
-        return False
\ No newline at end of file
+        echo(f"❌ Error creating file {filepath}: {e}")
+        return False
+
+
+# Length of the content hash prefix agents see and pass back for conflict checks
+SHORT_HASH = 12
+
+
+class _FileLock:
+    """Lock serializing the writes of one file, dropped once no writer holds it.
+
+    Reentrant, as an edit holds the lock while it writes the patched file.
+    """
+
+    __slots__ = ("_lock", "__weakref__")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+# Only files currently being edited or streamed keep an entry
+_file_locks = weakref.WeakValueDictionary()
+_file_locks_lock = threading.Lock()
+
+
+def short_hash(filepath: str) -> Optional[str]:
+    """Return the short content hash of a file tracked in this context's registry."""
+    record = file_registry().get(_clean_path(filepath))
+    return record.digest[:SHORT_HASH] if record else None
+
+
+def _file_lock(filepath: str) -> _FileLock:
+    """Return the lock serializing writes, edits and chunked writes of a file in this context's project."""
+    key = (project_root(), filepath)
+    with _file_locks_lock:
+        lock = _file_locks.get(key)
+        if lock is None:
+            lock = _file_locks[key] = _FileLock()
+        return lock
+
+
+def edit_file_content(filepath: str, patch: str, base_hash: str = "", fallback_content: str = "") -> Dict[str, Any]:
+    """
+    Apply a patch to a file tracked in the file registry.
+
+    The patch is applied to the current content only if the content still
+    has the digest it was registered with and, if given, the hash the agent
+    last saw. If the patch does not apply, fallback_content is written as
+    the whole file instead.
+
+    Args:
+        filepath: Path to the file (relative to current directory)
+        patch: Search/replace edit blocks or a unified diff, see patcher.apply_patch()
+        base_hash: Hash prefix of the content the patch was made against, "" to skip the check
+        fallback_content: Whole new content written if the patch does not apply
+
+    Returns:
+        Result with filepath, status ("edited", "unchanged", "fallback", "conflict",
+        "failed" or "untracked"), message and the hash of the resulting content
+    """
+    with tracer.span("edit_file", "tool", path=filepath, agent=current_agent.get(), bytes=0,
+                     patch_tokens=count_tokens(patch)) as span:
+        result = _edit_file(filepath, patch, base_hash, fallback_content, span)
+        span["status"] = result["status"]
+        return result
+
+
+def _edit_file(filepath: str, patch: str, base_hash: str, fallback_content: str,
+               span: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a patch and record the output tokens it saved in the trace span."""
+    filepath = _clean_path(filepath)
+    registry = file_registry()
+    record = registry.get(filepath)
+    if record is None:
+        return {"filepath": filepath, "status": "untracked", "hash": None,
+                "message": f"{filepath} has not been created yet, create it with write_file"}
+
+    with _file_lock(filepath):
+        storage = file_storage()
+        current = storage.read(filepath).decode('utf-8', errors='replace') if storage.exists(filepath) else ""
+        digest = content_digest(current)
+        base_hash = base_hash.strip().lower()
+        if digest != record.digest or (base_hash and not digest.startswith(base_hash)):
+            logger.warning(f"Edit conflict on {filepath}: content changed since it was read")
+            return {"filepath": filepath, "status": "conflict", "hash": digest[:SHORT_HASH],
+                    "message": f"{filepath} changed since you read it, read it again and resend the edit"}
+
+        try:
+            patched = apply_patch(current, patch)
+            status = "edited"
+        except PatchError as e:
+            if not fallback_content.strip():
+                logger.info(f"Patch for {filepath} does not apply: {e}")
+                return {"filepath": filepath, "status": "failed", "hash": digest[:SHORT_HASH],
+                        "message": f"Patch does not apply: {e}. Read the lines again and send a corrected "
+                                   f"patch, or rewrite the file with write_file"}
+            logger.info(f"Patch for {filepath} does not apply ({e}), writing the fallback content")
+            patched = fallback_content
+            status = "fallback"
+
+        full_tokens = count_tokens(patched)
+        sent_tokens = span["patch_tokens"] + (count_tokens(fallback_content) if status == "fallback" else 0)
+        # Output tokens a full rewrite would have cost minus the tokens actually sent
+        span["saved_tokens"] = full_tokens - sent_tokens
+        if patched == current:
+            return {"filepath": filepath, "status": "unchanged", "hash": digest[:SHORT_HASH],
+                    "message": "Unchanged by the patch"}
+        if not _save_file(filepath, patched, span, edit=True):
+            return {"filepath": filepath, "status": "failed", "hash": digest[:SHORT_HASH],
+                    "message": f"Could not write {filepath}, make sure the result is not empty"}
+        return {"filepath": filepath, "status": status, "hash": content_digest(patched)[:SHORT_HASH],
+                "message": "Edited" if status == "edited" else "Patch did not apply, wrote the fallback content"}
+
+
+def _stream_paths(filepath: str):
+    """Return the staging data and state paths of a chunked write."""
+    name = hashlib.sha1(filepath.encode('utf-8')).hexdigest()
+    staging_dir = file_storage().staging_dir()
+    return os.path.join(staging_dir, f"{name}.part"), os.path.join(staging_dir, f"{name}.json")
+
+
+def _file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_chunk(filepath: str, chunk_index: int, content: str, is_last: bool = False) -> str:
+    """
+    Append one chunk of a large file, flushing it to a staging file on disk.
+
+    Chunks must be sent in order starting at 0. Resending an already written
+    chunk is ignored, so an interrupted write can resume from the next chunk.
+    The file only appears at its final path once the last chunk is written.
+
+    Args:
+        filepath: Path to the file (relative to current directory)
+        chunk_index: Index of this chunk, starting at 0
+        content: Content of the chunk
+        is_last: True for the final chunk, which completes the file
+
+    Returns:
+        Status message including the next expected chunk index
+    """
+    with tracer.span("write_file_chunk", "tool", path=filepath, agent=current_agent.get(), bytes=0) as span:
+        try:
+            filepath, _ = _resolve_path(filepath)
+            # Parallel agents streaming the same file take turns chunk by chunk
+            with _file_lock(filepath):
+                part_path, state_path = _stream_paths(filepath)
+                state = {"filepath": filepath, "next_chunk": 0, "size": 0}
+                if os.path.exists(state_path):
+                    with open(state_path, encoding='utf-8') as f:
+                        state = json.load(f)
+
+                if chunk_index < state["next_chunk"]:
+                    return f"Chunk {chunk_index} of {filepath} was already written, send chunk {state['next_chunk']} next"
+                if chunk_index > state["next_chunk"]:
+                    return f"Error: expected chunk {state['next_chunk']} of {filepath}, got chunk {chunk_index}"
+                # Whitespace-only chunks are kept, e.g. the blank lines between two functions,
+                # but a chunk must add something and the completed file must not be blank
+                has_text = state.get("has_text", state["size"] > 0) or bool(content.strip())
+                if not content and not is_last or is_last and not has_text:
+                    logger.warning(f"Attempted to write empty chunk {chunk_index} of {filepath}")
+                    echo(f"⚠️ Warning: Attempted to write empty chunk {chunk_index} of {filepath}")
+                    return f"Error: chunk {chunk_index} of {filepath} is empty"
+
+                os.makedirs(os.path.dirname(part_path), exist_ok=True)
+                data = content.encode('utf-8')
+                with open(part_path, 'ab') as f:
+                    # Drop bytes of a chunk whose state update was lost in a crash
+                    f.truncate(state["size"])
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                state["next_chunk"] = chunk_index + 1
+                state["size"] += len(data)
+                state["has_text"] = has_text
+                span["bytes"] = len(data)
+
+                if not is_last:
+                    with open(state_path + ".tmp", 'w', encoding='utf-8') as f:
+                        json.dump(state, f)
+                    os.replace(state_path + ".tmp", state_path)
+                    return f"Wrote chunk {chunk_index} of {filepath}, send chunk {state['next_chunk']} next"
+
+                return _finish_stream(filepath, part_path, state_path, state["size"])
+        except Exception as e:
+            logger.error(f"Error writing chunk {chunk_index} of {filepath}: {e}")
+            echo(f"❌ Error writing chunk {chunk_index} of {filepath}: {e}")
+            return f"Error: {e}"
+
+
+def _finish_stream(filepath: str, part_path: str, state_path: str, size: int) -> str:
+    """Move a completed staging file into the storage and register it."""
+    digest = _file_digest(part_path)
+    registry = file_registry()
+    if registry.is_identical(filepath, digest):
+        os.remove(part_path)
+        message = f"File content identical, not rewriting: {filepath}"
+    else:
+        storage = file_storage()
+        mtime = storage.write_from(filepath, part_path)
+        registry.record(filepath, digest=digest, size=size, mtime=mtime, agent=current_agent.get())
+        if validator_kind(filepath):
+            _submit_validation(filepath, digest, storage.read(filepath).decode('utf-8', errors='replace'))
+        message = f"Created file: {filepath}"
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    logger.info(message)
+    echo(f"✅ {message}")
+    return "\n".join(filter(None, [message, validation_feedback([filepath])]))
+
+
+def _submit_validation(filepath: str, digest: str, content: str) -> None:
+    """Queue a written file for background validation, if validation is enabled."""
+    validator = get_validator()
+    if validator is not None:
+        validator.submit(filepath, digest, content, root=project_root())
+
+
+def validation_feedback(filepaths: List[str]) -> str:
+    """
+    Return the validation results of written files for a tool result.
+
+    Also includes results of earlier writes that were still running when
+    their own tool call returned.
+
+    Args:
+        filepaths: Paths of the files written by the tool call
+
+    Returns:
+        Validation messages, empty if validation is disabled
+    """
+    validator = get_validator()
+    if validator is None:
+        return ""
+    filepaths = [_clean_path(filepath) for filepath in filepaths]
+    root = project_root()
+    messages = [format_report(filepath, validator.report(filepath, root)) for filepath in filepaths]
+    for filepath, report in validator.late_reports(root).items():
+        if filepath not in filepaths and (report["errors"] or report["warnings"]):
+            messages.append(format_report(filepath, report))
+    return "\n".join(filter(None, messages))
+
+
+def save_files(files: List[Dict[str, Any]], max_workers: int = 8) -> List[Dict[str, Any]]:
+    """
+    Validate a manifest of files and write them in parallel.
+
+    Args:
+        files: List of {"filepath": ..., "content": ...} entries
+        max_workers: Maximum number of files written at the same time
+
+    Returns:
+        One result per entry with filepath, status ("written", "unchanged",
+        "rejected" or "failed") and a message
+    """
+    results = [None] * len(files)
+    valid = []
+    seen = set()
+    for index, entry in enumerate(files):
+        filepath = entry.get("filepath") if isinstance(entry, dict) else None
+        content = entry.get("content") if isinstance(entry, dict) else None
+        if not isinstance(filepath, str) or not filepath.strip() or not isinstance(content, str):
+            results[index] = {"filepath": filepath, "status": "rejected",
+                              "message": "each entry needs a string filepath and content"}
+        elif _clean_path(filepath) in seen:
+            results[index] = {"filepath": filepath, "status": "rejected",
+                              "message": "duplicate filepath in manifest"}
+        elif not content.strip():
+            logger.warning(f"Attempted to create file with empty content: {filepath}")
+            results[index] = {"filepath": filepath, "status": "rejected", "message": "empty content"}
+        else:
+            seen.add(_clean_path(filepath))
+            valid.append((index, filepath, content))
+
+    def write(filepath: str, content: str) -> Dict[str, Any]:
+        if file_registry().is_identical(_clean_path(filepath), content_digest(content)):
+            return {"filepath": filepath, "status": "unchanged", "message": "identical content, not rewritten"}
+        if save_file(filepath, content):
+            return {"filepath": filepath, "status": "written", "message": "ok"}
+        return {"filepath": filepath, "status": "failed", "message": "write failed, see logs"}
+
+    if valid:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(valid)))) as executor:
+            # Copy the caller's context so writes are attributed to the running agent and task
+            futures = {
+                index: executor.submit(contextvars.copy_context().run, write, filepath, content)
+                for index, filepath, content in valid
+            }
+            for index, future in futures.items():
+                results[index] = future.result()
+    return results
+
+
+# Maximum number of lines returned by one read_file call
+MAX_READ_LINES = 400
+
+
+def read_lines(filepath: str, start_line: int = 1, end_line: Optional[int] = None) -> str:
+    """
+    Return a range of lines of a project file, prefixed with their line numbers.
+
+    Args:
+        filepath: Path to the file (relative to current directory)
+        start_line: First line to return, starting at 1
+        end_line: Last line to return (inclusive), defaults to MAX_READ_LINES lines after start_line
+
+    Returns:
+        The numbered lines, or an error message
+    """
+    filepath = _clean_path(filepath)
+    storage = file_storage()
+    if not storage.contains(filepath):
+        return f"Error: {filepath} is outside the project"
+    if not storage.exists(filepath):
+        return f"Error: {filepath} does not exist"
+    start_line = max(1, start_line)
+    last_line = start_line + MAX_READ_LINES - 1
+    end_line = min(end_line, last_line) if end_line else last_line
+    lines = []
+    total = 0
+    with io.TextIOWrapper(storage.open(filepath), encoding='utf-8', errors='replace') as f:
+        for number, line in enumerate(f, 1):
+            total = number
+            if start_line <= number <= end_line:
+                lines.append(f"{number:>5} | {line.rstrip()}")
+    if not lines:
+        return f"{filepath} has {total} lines, nothing in range {start_line}-{end_line}"
+    header = f"{filepath} lines {start_line}-{min(end_line, total)} of {total}"
+    content_hash = short_hash(filepath)
+    header += f" (hash {content_hash}):" if content_hash else ":"
+    return "\n".join([header] + lines)
+
+
+@tool("Create a file with specific content")
+def write_file(filepath: str, content: str) -> str:
+    """
+    Write content to a file, creating directories as needed. Python, JSON,
+    TOML and YAML files are checked after writing; fix any reported problem
+    by writing the file again.
+
+    Args:
+        filepath: Path to the file (relative to current directory)
+        content: Content to write to the file
+
+    Returns:
+        Status message with the validation results of the file
+    """
+    if not save_file(filepath, content):
+        return f"Error: could not create {filepath}, make sure the content is not empty"
+    return "\n".join(filter(None, [f"Created file: {filepath} (hash {short_hash(filepath)})",
+                                    validation_feedback([filepath])]))
+
+
+@tool("Edit a file")
+def edit_file(filepath: str, patch: str, base_hash: str = "", fallback_content: str = "") -> str:
+    """
+    Change part of a file that was already created by sending only the change,
+    instead of rewriting the whole file with write_file. The patch is either one
+    or more search/replace blocks, each search text copied exactly from the file:
+
+    <<<<<<< SEARCH
+    lines to replace
+    =======
+    new lines
+    >>>>>>> REPLACE
+
+    or a unified diff with @@ hunks.
+
+    Args:
+        filepath: Path to the file (relative to the project root)
+        patch: Search/replace blocks or unified diff
+        base_hash: Hash of the file shown by "Read lines of a file" or write_file, to
+            detect changes made since you read it
+        fallback_content: Optional complete new content, written if the patch does not apply
+
+    Returns:
+        Status message with the new hash of the file and its validation results
+    """
+    result = edit_file_content(filepath, patch, base_hash, fallback_content)
+    if result["status"] in ("conflict", "failed", "untracked"):
+        return f"Error: {result['message']}" + (f" (current hash {result['hash']})" if result["hash"] else "")
+    return "\n".join(filter(None, [f"{result['message']}: {result['filepath']} (hash {result['hash']})",
+                                    validation_feedback([result["filepath"]])]))
+
+
+@tool("Write a large file in chunks")
+def write_file_chunk(filepath: str, chunk_index: int, content: str, is_last: bool = False) -> str:
+    """
+    Write a large file in several chunks instead of one huge write_file call.
+
+    Send chunks in order starting at chunk_index 0 and set is_last to true on
+    the final chunk. The file only appears once the last chunk is written. If a
+    call fails, resend from the chunk index given in the last status message.
+
+    Args:
+        filepath: Path to the file (relative to current directory)
+        chunk_index: Index of this chunk, starting at 0
+        content: Content of the chunk
+        is_last: True for the final chunk
+
+    Returns:
+        Status message including the next expected chunk index
+    """
+    return save_chunk(filepath, chunk_index, content, is_last)
+
+
+@tool("Create many files at once")
+def write_files(files: List[Dict[str, str]]) -> str:
+    """
+    Create or update many files in one call instead of one write_file call per file.
+
+    Args:
+        files: List of objects with "filepath" (relative to the project root) and "content"
+
+    Returns:
+        JSON summary with the status of every file and the validation results
+    """
+    results = save_files(files)
+    written = sum(1 for result in results if result["status"] in ("written", "unchanged"))
+    filepaths = [result["filepath"] for result in results if result["status"] in ("written", "unchanged")]
+    return json.dumps({"written": written, "total": len(results), "results": results,
+                       "validation": validation_feedback(filepaths)})
+
+
+@tool("Read lines of a file")
+def read_file(filepath: str, start_line: int = 1, end_line: int = 0) -> str:
+    """
+    Read a range of lines of a file that was already created, to look at details
+    listed in the artifact index without rewriting the file.
+
+    Args:
+        filepath: Path to the file (relative to the project root)
+        start_line: First line to read, starting at 1
+        end_line: Last line to read (inclusive), 0 to read up to 400 lines
+
+    Returns:
+        The requested lines prefixed with their line numbers
+    """
+    return read_lines(filepath, start_line, end_line or None)
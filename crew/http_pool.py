@@ -0,0 +1,236 @@
+import time
+import logging
+import threading
+import statistics
+import importlib.util
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per provider for the percentiles
+LATENCY_WINDOW = 1000
+
+
+def http2_available() -> bool:
+    """Check whether the h2 package that httpx needs for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class PoolStats:
+    """Thread-safe connection reuse and latency counters per provider."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, new_connection: bool, http_version: Optional[str],
+               connect_seconds: float, latency: float, error: bool = False) -> None:
+        """
+        Record a finished request.
+
+        Args:
+            provider: Provider the request was sent to
+            new_connection: Whether a connection was opened for the request
+            http_version: Protocol of the response, e.g. "HTTP/2"
+            connect_seconds: Time spent opening the connection and the TLS handshake
+            latency: Seconds from sending the request to reading the whole response
+            error: Whether the request failed without a response
+        """
+        with self._lock:
+            stats = self._providers.setdefault(provider, {
+                "requests": 0, "new_connections": 0, "reused_connections": 0, "errors": 0,
+                "connect_seconds": 0.0, "http_versions": {}, "latencies": deque(maxlen=self.window)
+            })
+            stats["requests"] += 1
+            stats["new_connections" if new_connection else "reused_connections"] += 1
+            stats["connect_seconds"] += connect_seconds
+            if error:
+                stats["errors"] += 1
+            else:
+                stats["http_versions"][http_version] = stats["http_versions"].get(http_version, 0) + 1
+                stats["latencies"].append(latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the counters and latency percentiles per provider."""
+        with self._lock:
+            providers = {name: {**stats, "http_versions": dict(stats["http_versions"]),
+                                "latencies": sorted(stats["latencies"])}
+                         for name, stats in self._providers.items()}
+        result = {}
+        for name, stats in providers.items():
+            latencies = stats.pop("latencies")
+            stats["reuse_ratio"] = round(stats["reused_connections"] / stats["requests"], 3) if stats["requests"] else 0.0
+            stats["connect_seconds"] = round(stats["connect_seconds"], 3)
+            stats["latency_ms"] = {
+                "mean": round(statistics.fmean(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            } if latencies else None
+            result[name] = stats
+        return result
+
+
+def _instrumented_transport(provider: str, stats: PoolStats, **kwargs):
+    """
+    Create an httpx transport that records connection reuse and latency of every request.
+
+    Reuse is detected through the httpcore trace extension: a request that
+    opens a TCP connection did not reuse one from the pool.
+    """
+    import httpx
+
+    class _TimedStream(httpx.SyncByteStream):
+        """Response body that records the request once it has been read and closed."""
+
+        def __init__(self, stream, on_close):
+            self._stream = stream
+            self._on_close = on_close
+
+        def __iter__(self):
+            yield from self._stream
+
+        def close(self) -> None:
+            try:
+                self._stream.close()
+            finally:
+                self._on_close()
+
+    class _InstrumentedTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            connect = {"new": False, "started": None, "seconds": 0.0}
+            previous_trace = request.extensions.get("trace")
+
+            def trace(event_name, info):
+                if event_name == "connection.connect_tcp.started":
+                    connect["new"] = True
+                    connect["started"] = time.perf_counter()
+                elif event_name in ("connection.start_tls.complete", "connection.connect_tcp.complete") \
+                        and connect["started"] is not None:
+                    connect["seconds"] = time.perf_counter() - connect["started"]
+                if previous_trace is not None:
+                    previous_trace(event_name, info)
+
+            request.extensions["trace"] = trace
+            started = time.perf_counter()
+            try:
+                response = super().handle_request(request)
+            except Exception:
+                stats.record(provider, connect["new"], None, connect["seconds"],
+                             time.perf_counter() - started, error=True)
+                raise
+            http_version = response.extensions.get("http_version", b"").decode("ascii", "replace") or None
+            response.stream = _TimedStream(response.stream, lambda: stats.record(
+                provider, connect["new"], http_version, connect["seconds"], time.perf_counter() - started
+            ))
+            return response
+
+    return _InstrumentedTransport(**kwargs)
+
+
+class HttpClientPool:
+    """One long-lived, connection-pooled HTTP client per LLM provider.
+
+    Every agent and the model router send their requests through these
+    clients, so connections and TLS sessions are kept alive and reused
+    across calls, agents and concurrent runs instead of being opened per
+    request. HTTP/2 is used when the h2 package is installed.
+    """
+
+    def __init__(self, providers: Dict[str, Dict[str, Any]], pool_size: int = 20,
+                 keepalive_expiry: float = 60.0, connect_timeout: float = 10.0,
+                 read_timeout: float = 600.0, http2: bool = True):
+        """
+        Initialize the pool. Clients are created on first use.
+
+        Args:
+            providers: Credentials per provider: api_key and base_url
+            pool_size: Maximum open connections per provider
+            keepalive_expiry: Seconds an idle connection is kept open
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait for a response
+            http2: Negotiate HTTP/2 when the h2 package is installed
+        """
+        self.providers = providers
+        self.pool_size = pool_size
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2 and http2_available()
+        self.stats = PoolStats()
+        self._clients = {}
+        self._llm_clients = {}
+        self._lock = threading.Lock()
+
+    def http_client(self, provider: str):
+        """Return the pooled httpx client of a provider, creating it on first use."""
+        import httpx
+
+        with self._lock:
+            client = self._clients.get(provider)
+            if client is None:
+                transport = _instrumented_transport(
+                    provider, self.stats,
+                    http2=self.http2,
+                    limits=httpx.Limits(max_connections=self.pool_size,
+                                        max_keepalive_connections=self.pool_size,
+                                        keepalive_expiry=self.keepalive_expiry)
+                )
+                client = self._clients[provider] = httpx.Client(
+                    transport=transport,
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+                )
+                logger.info(f"Opened pooled HTTP client for {provider} "
+                            f"({self.pool_size} connections, HTTP/2 {'on' if self.http2 else 'off'})")
+        return client
+
+    def llm_client(self, provider: str) -> Optional[Any]:
+        """
+        Return the SDK client crewai's native provider LLMs send their requests with.
+
+        Args:
+            provider: Provider name of a crewai LLM, e.g. "openai"
+
+        Returns:
+            An OpenAI SDK client for OpenAI, an Anthropic SDK client for Anthropic,
+            or None if the provider has no credentials or is not pooled
+        """
+        with self._lock:
+            if provider in self._llm_clients:
+                return self._llm_clients[provider]
+        settings = self.providers.get(provider) or {}
+        client = None
+        if settings.get("api_key"):
+            try:
+                client = self._create_llm_client(provider, settings)
+            except ImportError as e:
+                logger.warning(f"No pooled HTTP client for {provider}: {e}")
+        with self._lock:
+            return self._llm_clients.setdefault(provider, client)
+
+    def _create_llm_client(self, provider: str, settings: Dict[str, Any]) -> Optional[Any]:
+        """Wrap the pooled httpx client of a provider in the SDK client of the provider."""
+        if provider == "openai":
+            import openai
+            return openai.OpenAI(api_key=settings["api_key"], base_url=settings.get("base_url") or None,
+                                 http_client=self.http_client(provider))
+        if provider == "anthropic":
+            import anthropic
+            return anthropic.Anthropic(api_key=settings["api_key"], base_url=settings.get("base_url") or None,
+                                       http_client=self.http_client(provider))
+        # crewai's native Azure LLM uses the azure-ai-inference client, which cannot take an httpx client
+        return None
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Return the connection reuse and latency stats per provider."""
+        return self.stats.snapshot()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._llm_clients.clear()
+        for client in clients:
+            client.close()
@@ -0,0 +1,247 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM, call_stop_override
+from pydantic import PrivateAttr
+
+from config import config
+from llm_cache import ResponseCache, make_cache_key, normalize_messages
+from model_router import ModelRouter, ModelCandidate
+from prompts import count_tokens
+from tracing import tracer, estimate_cost, raise_if_cancelled
+from delegation import raise_if_over_budget
+from rate_limiter import (
+    RateLimiter, ThreadBackend, FileLockBackend,
+    provider_key, is_rate_limit_error, retry_after_seconds
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared response cache used by all agents
+response_cache = ResponseCache(
+    cache_dir=config.llm_cache_dir,
+    max_bytes=config.llm_cache_max_mb * 1024 * 1024,
+    ttl=config.llm_cache_ttl,
+    mode=config.llm_cache_mode
+)
+
+# Shared limiter enforcing MAX_RPM / MAX_TPM across all agents
+rate_limiter = RateLimiter(
+    max_rpm=config.max_rpm,
+    max_tpm=config.max_tpm,
+    backend=FileLockBackend(config.rate_limit_state_dir) if config.rate_limit_backend == "file" else ThreadBackend()
+)
+
+# Long-lived connection pools per provider, shared by every agent and the router
+http_clients = config.get_http_clients()
+
+
+def use_pooled_client(provider_llm: Any) -> None:
+    """Send the requests of a crewai provider LLM over the pooled client of its provider, if there is one."""
+    if http_clients is None or not hasattr(provider_llm, "_client"):
+        return
+    client = http_clients.llm_client(provider_llm.provider)
+    if client is not None:
+        # Native provider LLMs send every request through the SDK client in _client
+        provider_llm._client = client
+
+
+# Optional router choosing the model of every request by latency and cost
+model_router = None
+if config.router_enabled:
+    router_candidates = [ModelCandidate(**candidate) for candidate in config.get_model_candidates()]
+    if http_clients is not None:
+        for candidate in router_candidates:
+            candidate.client = http_clients.llm_client(candidate.provider)
+    model_router = ModelRouter(
+        candidates=router_candidates,
+        policy=config.router_policy,
+        timeout=config.router_timeout,
+        hedge=config.router_hedge
+    )
+
+# Set by replay.enable_transcript_recording() to record every response
+transcript_recorder = None
+
+
+class CrewLLM(BaseLLM):
+    """crewai LLM that serves repeated requests from the persistent response cache
+    and sends all other requests through the shared rate limiter.
+
+    crewai's LLM() constructor returns a provider class such as OpenAICompletion
+    instead of an instance of a subclass, so the concrete provider LLM is
+    wrapped rather than subclassed. It is created on first use.
+
+    The cached value is the raw completion text, so tool actions contained in a
+    cached response are still parsed and executed by the agent executor.
+    """
+
+    # Name of the agent owning this LLM, part of the cache key
+    namespace: str = ""
+
+    _cache: Any = PrivateAttr(default=None)
+    _limiter: Any = PrivateAttr(default=None)
+    _max_retries: int = PrivateAttr(default=0)
+    _llm_kwargs: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _provider_llm: Any = PrivateAttr(default=None)
+    _provider_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, model: str, namespace: str = "", cache: Optional[ResponseCache] = None,
+                 limiter: Optional[RateLimiter] = None, max_retries: Optional[int] = None, **kwargs):
+        """
+        Initialize the LLM.
+
+        Args:
+            model: Model name passed to crewai
+            namespace: Name of the agent owning this LLM, part of the cache key
+            cache: Response cache, defaults to the shared cache
+            limiter: Rate limiter, defaults to the shared limiter
+            max_retries: Retries after provider rate limit errors
+            **kwargs: Additional crewai LLM parameters (temperature, ...)
+        """
+        super().__init__(model=model, namespace=namespace, temperature=kwargs.pop("temperature", None))
+        self._cache = cache if cache is not None else response_cache
+        self._limiter = limiter if limiter is not None else rate_limiter
+        self._max_retries = config.llm_max_retries if max_retries is None else max_retries
+        self._llm_kwargs = kwargs
+
+    @property
+    def provider_llm(self) -> BaseLLM:
+        """The crewai provider LLM sending the requests, created on first use."""
+        with self._provider_lock:
+            if self._provider_llm is None:
+                self._provider_llm = LLM(model=self.model, temperature=self.temperature, **self._llm_kwargs)
+                use_pooled_client(self._provider_llm)
+            return self._provider_llm
+
+    def supports_function_calling(self) -> bool:
+        """Whether the provider LLM supports native tool calls."""
+        return self.provider_llm.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        """Whether the provider LLM supports stop words."""
+        return self.provider_llm.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        """Context window of the provider LLM in tokens."""
+        return self.provider_llm.get_context_window_size()
+
+    def supports_multimodal(self) -> bool:
+        """Whether the provider LLM accepts images and files."""
+        return self.provider_llm.supports_multimodal()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None) -> Any:
+        """Return the cached response for the request or call the model and cache the result."""
+        # A cancelled run, or a task over its delegation budget, stops at its agents' next model call
+        raise_if_cancelled()
+        raise_if_over_budget()
+        kwargs = {"callbacks": callbacks, "available_functions": available_functions, "from_task": from_task,
+                  "from_agent": from_agent, "response_model": response_model}
+        prompt_tokens = sum(count_tokens(message["content"]) for message in normalize_messages(messages))
+        with tracer.span(f"llm:{self.namespace}", "llm", model=self.model, agent=self.namespace,
+                         prompt_tokens=prompt_tokens, cache_hit=False) as span:
+            if not self._cache.enabled:
+                response = self._call_limited(span, messages, tools, **kwargs)
+            else:
+                tool_names = [_tool_name(tool) for tool in tools or []]
+                key = make_cache_key(self.namespace, self.model, self.temperature, tool_names, messages)
+                response = self._cache.get(key)
+                if response is not None:
+                    logger.info(f"LLM cache hit for {self.namespace} ({self.model})")
+                    span["cache_hit"] = True
+                else:
+                    response = self._call_limited(span, messages, tools, **kwargs)
+                    if isinstance(response, str):
+                        self._cache.put(key, response)
+
+            if isinstance(response, str):
+                span["completion_tokens"] = count_tokens(response)
+                if transcript_recorder is not None:
+                    transcript_recorder.record(self.namespace, response)
+            if not span["cache_hit"]:
+                span["cost_usd"] = estimate_cost(self.model, prompt_tokens, span.get("completion_tokens", 0))
+            return response
+
+    # Provider 429s are retried by _call_limited in step with the shared limiter, keep
+    # BaseLLM from wrapping call() in a second retry loop of its own
+    call._crewai_rate_limit_wrapped = True
+
+    def _call_limited(self, span, messages, tools=None, **kwargs) -> Any:
+        """Call the model once the rate limiter allows it, backing off on provider 429s."""
+        limiter_key = provider_key(self.model)
+        span["queue_seconds"] = 0.0
+        span["retries"] = 0
+        # Reserve the completion as well, the response is reconciled once its size is known
+        completion_tokens = self._llm_kwargs.get("max_tokens") or config.rate_limit_completion_tokens
+        reserved = span["prompt_tokens"] + int(completion_tokens)
+        for attempt in range(self._max_retries + 1):
+            span["queue_seconds"] += self._limiter.acquire(limiter_key, reserved)
+            try:
+                response = self._provider_call(messages, tools, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self._max_retries:
+                    raise
+                # A rejected request generated no completion
+                self._limiter.reconcile(limiter_key, reserved, span["prompt_tokens"])
+                self._limiter.report_rate_limited(limiter_key, retry_after_seconds(e))
+                span["retries"] += 1
+                continue
+            if isinstance(response, str):
+                self._limiter.reconcile(limiter_key, reserved, span["prompt_tokens"] + count_tokens(response))
+            self._limiter.report_success(limiter_key)
+            return response
+
+    def _provider_call(self, messages, tools=None, **kwargs) -> Any:
+        """Send the request to the model provider, through the model router if it is enabled."""
+        # The agent executor sets its stop words on this LLM for the duration of the call
+        if model_router is not None:
+            return model_router.complete(messages, tools, preferred_model=self.model,
+                                         stop=self.stop_sequences, **kwargs)
+        provider_llm = self.provider_llm
+        with call_stop_override(provider_llm, self.stop_sequences):
+            return provider_llm.call(messages, tools=tools, **kwargs)
+
+
+def _tool_name(tool: Any) -> str:
+    """Return a stable name for a tool passed to the LLM."""
+    if isinstance(tool, dict):
+        return tool.get("function", {}).get("name") or tool.get("name") or str(sorted(tool))
+    return getattr(tool, "name", str(tool))
+
+
+# Optional replacement for create_llm, e.g. a replay LLM for offline benchmarks
+_llm_factory = None
+
+
+def set_llm_factory(factory: Optional[Callable[..., BaseLLM]]) -> None:
+    """
+    Replace the LLM created for agents built after this call.
+
+    Args:
+        factory: Callable with the signature of create_llm, or None to restore the default
+    """
+    global _llm_factory
+    _llm_factory = factory
+
+
+def create_llm(model: str, namespace: str, temperature: Optional[float] = None) -> BaseLLM:
+    """
+    Create the LLM used by an agent.
+
+    Args:
+        model: Model name
+        namespace: Name of the agent using the LLM
+        temperature: Sampling temperature
+
+    Returns:
+        CrewLLM instance sharing the global response cache and rate limiter
+    """
+    if _llm_factory is not None:
+        return _llm_factory(model, namespace=namespace, temperature=temperature)
+    # Reasoning models reject a sampling temperature
+    if model.startswith(("o1", "o3")):
+        temperature = None
+    return CrewLLM(model=model, namespace=namespace, temperature=temperature)
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Cache modes
+MODE_OFF = "off"
+MODE_READ_ONLY = "readonly"
+MODE_READ_WRITE = "readwrite"
+
+
+def normalize_messages(messages: Union[str, List[Dict[str, Any]]]) -> List[Dict[str, str]]:
+    """
+    Normalize a message history so that insignificant differences don't change the cache key.
+
+    Line endings are unified and trailing whitespace is stripped from every line.
+
+    Args:
+        messages: A prompt string or a list of chat messages
+
+    Returns:
+        List of messages containing only role and normalized content
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True)
+        lines = content.replace("\r\n", "\n").split("\n")
+        normalized.append({
+            "role": message.get("role", "user"),
+            "content": "\n".join(line.rstrip() for line in lines).strip()
+        })
+    return normalized
+
+
+def make_cache_key(namespace: str, model: str, temperature: Optional[float],
+                   tools: Optional[List[str]], messages: Union[str, List[Dict[str, Any]]]) -> str:
+    """
+    Build the content address of an LLM request.
+
+    Args:
+        namespace: Name of the agent issuing the request
+        model: Model name
+        temperature: Sampling temperature
+        tools: Names of the tools offered to the model
+        messages: Prompt string or chat message history
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    payload = {
+        "namespace": namespace,
+        "model": model,
+        "temperature": temperature,
+        "tools": sorted(tools or []),
+        "messages": normalize_messages(messages),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Persistent, size-bounded LRU cache of LLM responses stored in SQLite."""
+
+    def __init__(self, cache_dir: str = ".crew_cache", max_bytes: int = 256 * 1024 * 1024,
+                 ttl: float = 0, mode: str = MODE_READ_WRITE):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Maximum total size of cached responses before LRU eviction
+            ttl: Seconds after which an entry expires, 0 to never expire
+            mode: One of "readwrite", "readonly" (e.g. for CI) or "off"
+        """
+        if mode not in (MODE_OFF, MODE_READ_ONLY, MODE_READ_WRITE):
+            raise ValueError(f"Unknown cache mode: {mode}")
+        # Resolve now so that a later os.chdir() into a project doesn't move the cache
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache is consulted at all."""
+        return self.mode != MODE_OFF
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the cache database on first use."""
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, "llm_responses.sqlite")
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            The cached response, or None on a miss or expired entry
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row and self.ttl and now - row[1] > self.ttl:
+                if self.mode == MODE_READ_WRITE:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            if self.mode == MODE_READ_WRITE:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Store a response, evicting least recently used entries if the cache is full.
+
+        Args:
+            key: Cache key from make_cache_key
+            response: Response text to store
+        """
+        if self.mode != MODE_READ_WRITE or not response:
+            return
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.debug(f"Response of {size} bytes exceeds cache size, not caching")
+            return
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            self.stores += 1
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
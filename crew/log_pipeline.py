@@ -0,0 +1,178 @@
+import os
+import sys
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Optional
+
+from tracing import current_run, current_task, current_agent
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Whether console echoes that duplicate log lines are suppressed
+_quiet = False
+_listener = None
+_queue_handler = None
+_console_handler = None
+
+
+def set_quiet(quiet: bool) -> None:
+    """Suppress the console echoes of file writes and other events that are also logged."""
+    global _quiet
+    _quiet = quiet
+
+
+def echo(message: str) -> None:
+    """Print a progress message for the user, unless quiet mode is on."""
+    if not _quiet:
+        print(message)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that stamps records with the run, task and agent of the emitting thread.
+
+    The stamping happens here, in the thread that logs, because the listener
+    thread has no access to the caller's context variables. The exception
+    text is kept apart from the message for the JSON formatter.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The root logger has no other handlers, so the record can be updated in place
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.run_id = current_run.get()
+        record.task = current_task.get()
+        record.agent = current_agent.get()
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "task": getattr(record, "task", None),
+            "agent": getattr(record, "agent", None),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """Compress a rotated log file."""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = "crewai_execution.log",
+                      json_format: bool = False, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5,
+                      compress: bool = True, console: bool = True, quiet: bool = False) -> None:
+    """
+    Route all logging through a queue to a listener thread.
+
+    Logging calls only put the record on a queue; formatting, disk and
+    terminal I/O happen on the listener thread. Calling this again replaces
+    the previous configuration.
+
+    Args:
+        level: Root log level
+        log_file: Log file path, None to log only to the console
+        json_format: Write structured JSON lines to the log file instead of text
+        max_bytes: Size at which the log file is rotated, 0 to never rotate
+        backup_count: Number of rotated log files kept
+        compress: Gzip the rotated log files
+        console: Also log to stderr, in text format
+        quiet: Suppress console echoes that duplicate log lines
+    """
+    global _listener, _queue_handler, _console_handler
+    stop_logging()
+    set_quiet(quiet)
+
+    handlers = []
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        if compress:
+            file_handler.namer = _gzip_namer
+            file_handler.rotator = _gzip_rotator
+        file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+    if console:
+        _console_handler = logging.StreamHandler(sys.stderr)
+        _console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(_console_handler)
+
+    _queue_handler = _QueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def set_console_stream(stream) -> None:
+    """
+    Send the console log output to another stream.
+
+    The console handler keeps the stderr of the time configure_logging() was
+    called, so it has to be moved before a redirected stderr is closed.
+
+    Args:
+        stream: New console stream, e.g. the original sys.stderr
+    """
+    if _console_handler is None:
+        return
+    if _listener is not None:
+        # Write the records queued so far to the old stream first
+        _listener.stop()
+        _console_handler.setStream(stream)
+        _listener.start()
+    else:
+        _console_handler.setStream(stream)
+
+
+def stop_logging() -> None:
+    """Flush the queued records and stop the listener thread."""
+    global _listener, _queue_handler, _console_handler
+    _console_handler = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
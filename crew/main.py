@@ -2,111 +2,445 @@ import os
 import sys
 import logging
 import json
+import time
+import uuid
+import argparse
+import threading
 from datetime import datetime
-from crewai import Crew, Process
+from typing import Any, Callable, Dict, Optional
 
 import agents
-from file_writer import write_file
+from config import get_config
 from task_factory import TaskFactory
+from tracing import tracer, format_summary, current_run, RunCancelled
+from log_pipeline import echo
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("crewai_execution.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-def main():
+def project_dir_name(project_name: str) -> str:
+    """Return the output directory name used for a project."""
+    return f"{project_name.lower().replace(' ', '_')}_project"
+
+def _finish_run(run_store, run_id: str, status: str, manifest: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+    """Record the tasks and outcome of a run and wait for the run store to commit them."""
+    metrics = tracer.summary(run_id)
+    run_store.record_tasks(run_id, tracer.spans(run_id), metrics)
+    run_store.finish_run(
+        run_id, status, metrics,
+        file_count=manifest["file_count"] if manifest else 0,
+        total_bytes=manifest["total_bytes"] if manifest else 0,
+        error=error
+    )
+    run_store.close()
+
+def _write_json(storage, relpath: str, data: Any, indent: Optional[int] = 2) -> None:
+    """Write a JSON report into the project's storage."""
+    storage.write(relpath, json.dumps(data, indent=indent).encode("utf-8"))
+
+def generate_project(project_info: Dict[str, Any], output_dir: Optional[str] = None,
+                     on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     cancel_event: Optional[threading.Event] = None, storage_backend: Optional[str] = None,
+                     archive: Optional[Any] = None, archive_format: Optional[str] = None,
+                     resume: bool = False) -> Dict[str, Any]:
+    """
+    Generate a project from its project info without any user interaction.
+    
+    The working directory is never changed: files are written below output_dir
+    through a workspace bound to the calling context, so several projects can
+    be generated concurrently in one process, each from its own context.
+    
+    Args:
+        project_info: Dictionary with project_name, project_description, features,
+            technology_stack and project_type
+        output_dir: Directory to generate the project in, derived from the project name if omitted
+        on_progress: Callable receiving an event dictionary whenever a task starts,
+            finishes or fails and whenever a file is written
+        cancel_event: Event that cancels the generation when set, raising tracing.RunCancelled
+        storage_backend: "disk" or "memory", defaults to STORAGE_BACKEND. A project
+            kept in memory is never written below output_dir, only archived
+        archive: Archive path, "-" for stdout or a binary stream to deliver the project
+            as an archive; defaults to ARCHIVE_PATH, and to output_dir plus the format's
+            extension for the memory backend
+        archive_format: "zip" or "tar.gz", defaults to ARCHIVE_FORMAT
+        resume: Skip the tasks a previous run in output_dir completed, if the project
+            inputs are unchanged and the files those tasks wrote were not modified since
+    
+    Returns:
+        Summary of the generated project
+    """
+    from storage import create_storage, write_archive
+    from validation import get_validator
+    
+    config = get_config()
+    output_dir = os.path.abspath(output_dir or project_dir_name(project_info["project_name"]))
+    storage = create_storage(
+        storage_backend or config.storage_backend, output_dir,
+        spill_threshold=config.storage_spill_kb * 1024,
+        memory_limit=config.storage_memory_mb * 1024 * 1024,
+        spill_dir=config.storage_spill_dir
+    )
+    archive_format = archive_format or config.archive_format
+    archive = archive or config.archive_path
+    if archive is None and storage.kind == "memory":
+        archive = f"{output_dir}.{archive_format}"
+    try:
+        summary = _generate_project(project_info, output_dir, storage, on_progress, cancel_event, resume)
+        # Stream the files straight from the storage into the archive
+        summary["archive"] = write_archive(storage, archive, archive_format) if archive else None
+        return summary
+    finally:
+        validator = get_validator()
+        if validator is not None:
+            validator.reset(output_dir)
+        # Releases the memory and spill files of an in-memory project, also after a failure
+        storage.close()
+
+def _generate_project(project_info: Dict[str, Any], output_dir: str, storage,
+                      on_progress: Optional[Callable[[Dict[str, Any]], None]],
+                      cancel_event: Optional[threading.Event], resume: bool = False) -> Dict[str, Any]:
+    """Run the crew for a project whose files go to the given storage, see generate_project()."""
+    # crewai and the LLM clients are only imported once a project is actually generated
+    from file_writer import FileRegistry, save_file, set_workspace
+    from checkpoint import CheckpointStore
+    from llm import response_cache, rate_limiter, model_router, http_clients
+    from scheduler import TaskScheduler
+    from delegation import DelegationLimits
+    from artifacts import ArtifactContextBuilder
+    from spec_index import SpecIndex, prepare_prior_architecture
+    from validation import get_validator
+    from suite_runner import SuiteRunner
+    from run_store import RunStore
+    from storage import local_copy
+    
+    config = get_config()
+    # Spans, log records and file writes of this generation are tagged with its run ID
+    run_id = uuid.uuid4().hex
+    current_run.set(run_id)
+    started = time.time()
+    project_name = project_info["project_name"]
+    logger.info(f"Project: {project_name} using {project_info.get('technology_stack')}")
+    
+    logger.info(f"Generating {output_dir} in {storage.kind} storage")
+    
+    # Direct the file tools to the output directory, with a registry of this generation's files only
+    registry = FileRegistry()
+    set_workspace(output_dir, registry, storage)
+    
+    validator = get_validator()
+    if validator is not None:
+        validator.reset(output_dir, storage)
+        validator.start()
+    recorder = None
+    if config.transcript_record_file:
+        from replay import enable_transcript_recording
+        recorder = enable_transcript_recording(os.path.abspath(config.transcript_record_file))
+    
+    spec_index = SpecIndex(config.spec_index_path) if config.spec_index_enabled else None
+    run_store = RunStore(config.run_store_path) if config.run_store_enabled else None
+    # The run is recorded as finished and the stores are closed however the generation ends
+    status, error, manifest = "failed", None, None
+    try:
+        runner = None
+        if config.test_runner_enabled:
+            runner = SuiteRunner(
+                env_dir=config.test_env_dir,
+                cache_path=config.test_cache_path,
+                workers=config.test_workers,
+                test_timeout=config.test_timeout,
+                file_timeout=config.test_file_timeout,
+                install_timeout=config.test_install_timeout
+            )
+    
+        # Persist every finished task, and restore the tasks a previous run completed
+        checkpoints = CheckpointStore(storage, registry, project_info, path=config.checkpoint_file)
+        resumed = {}
+        if resume:
+            resumed = checkpoints.resume(
+                list(TaskFactory.TASK_DEPENDENCIES), TaskFactory.TASK_DEPENDENCIES,
+                on_restored=(lambda record, content: validator.submit(
+                    record.path, record.digest, content.decode("utf-8", errors="replace"), root=output_dir
+                )) if validator is not None else None
+            )
+            if resumed:
+                echo(f"\n⏩ Resuming after completed tasks: {', '.join(resumed)}")
+    
+        # Save project info for reference
+        _write_json(storage, "project_config/project_info.json", project_info)
+    
+        # Record the run and every file written during it in the run history
+        if run_store is not None:
+            run_store.start_run(project_info, output_dir, run_id=run_id)
+            registry.add_listener(lambda record: run_store.record_file(run_id, record))
+        if on_progress is not None:
+            registry.add_listener(lambda record: on_progress({
+                "event": "file_written", "filepath": record.path, "size": record.size, "agent": record.agent
+            }))
+    
+        # Offer or reuse the architecture of a near-duplicate earlier spec
+        reference, completed = None, {}
+        if spec_index is not None and not resumed:
+            reference, completed = prepare_prior_architecture(
+                spec_index, project_info,
+                offer_threshold=config.spec_similarity_threshold,
+                reuse_threshold=config.spec_reuse_threshold if config.spec_reuse_enabled else None,
+                save_file=save_file,
+                root=output_dir,
+                storage=storage
+            )
+            for task_id, output in completed.items():
+                checkpoints.record(task_id, output)
+    
+        # Build agents for this generation only, concurrent generations never share agent state
+        agent_instances = {name: agents.build_agent(name) for name in agents.AGENT_SPECS}
+    
+        # Create tasks based on project info
+        task_factory = TaskFactory(
+            agents=agent_instances,
+            project_info=project_info,
+            reference=reference,
+            # Every implementation subtask gets its own Developer, focused on its module
+            agent_factory=lambda name: agents.build_agent(name, allow_delegation=False)
+        )
+        task_factory.create_tasks()
+    
+        def expand_implementation(task_id, output):
+            """Fan the implementation out into module subtasks once the architecture is designed."""
+            if task_id != "architecture" or not config.implementation_fanout or not storage.exists("architecture.md"):
+                return None
+            return task_factory.expand_implementation(
+                storage.read("architecture.md").decode("utf-8", errors="replace"),
+                max_modules=config.implementation_max_modules
+            )
+    
+        # Schedule the tasks by their dependencies so independent tasks run in parallel
+        echo("\nCreating development crew with Architect, Developer, and Tester agents...")
+        scheduler = TaskScheduler(
+            tasks=task_factory.tasks,
+            dependencies=task_factory.get_dependencies(),
+            max_workers=config.max_parallel_tasks,
+            agents=list(agent_instances.values()),
+            # Pass downstream tasks an index of the created files instead of full upstream outputs
+            context_builder=ArtifactContextBuilder(registry, root=output_dir, storage=storage),
+            completed={**completed, **resumed},
+            listener=(lambda event, task_id: on_progress({"event": f"task_{event}", "task": task_id}))
+            if on_progress is not None else None,
+            cancel_event=cancel_event,
+            delegation_limits=DelegationLimits(
+                max_depth=config.delegation_max_depth,
+                max_hops=config.delegation_max_hops,
+                max_cycles=config.delegation_max_cycles
+            ),
+            checkpoint=lambda task_id, output: checkpoints.record(task_id, output, scheduler.dependencies[task_id]),
+            expander=expand_implementation,
+            expansion_workers=config.implementation_workers if config.implementation_fanout else 0
+        )
+    
+        echo("\nStarting development process. This may take some time...")
+        logger.info(f"Starting crew execution with up to {config.max_parallel_tasks} parallel tasks")
+        task_outputs = scheduler.run()
+        logger.info(f"Crew execution completed: {', '.join(task_outputs)}")
+    
+        # Only projects kept on disk can offer their documents to later specs
+        if spec_index is not None and storage.kind == "disk":
+            spec_index.add(project_info, output_dir)
+    
+        # Count the files created by the agents from the file registry
+        manifest = registry.manifest()
+        _write_json(storage, "project_config/file_manifest.json", manifest)
+        file_count = manifest["file_count"]
+    
+        # Collect the validation results of all written files
+        validation = validator.summary(output_dir) if validator is not None else None
+        if validation is not None:
+            _write_json(storage, config.validation_report_file, validation)
+    
+        # Run the generated test suite in a sandbox
+        test_results = None
+        if runner is not None:
+            echo("\nRunning the generated tests...")
+            if on_progress is not None:
+                on_progress({"event": "tests_started"})
+            with tracer.span("run_tests", "tests"), local_copy(storage) as project_dir:
+                test_results = runner.run(project_dir)
+            _write_json(storage, config.test_report_file, test_results)
+    
+        # Export the timing, token and byte metrics of every task, LLM call and file write
+        _write_json(storage, config.trace_file, tracer.chrome_trace(run_id), indent=None)
+        logger.info(f"Trace written to {storage.path(config.trace_file)}")
+        if model_router is not None:
+            _write_json(storage, config.router_log_file, model_router.decisions_report())
+        if recorder:
+            recorder.save()
+            logger.info(f"Transcript recorded to {recorder.path}")
+    
+        status = "succeeded"
+        return {
+            "project_name": project_name,
+            "run_id": run_id,
+            "output_dir": output_dir,
+            "storage": storage.kind,
+            "technology_stack": project_info.get("technology_stack", ""),
+            "tasks": list(task_outputs),
+            "reused_tasks": list(completed),
+            "resumed_tasks": list(resumed),
+            "prompt_tokens": task_factory.get_prompt_stats(),
+            "file_count": file_count,
+            "total_bytes": manifest["total_bytes"],
+            "validation": validation,
+            "tests": test_results,
+            "duration_seconds": round(time.time() - started, 2),
+            "llm_cache": response_cache.stats(),
+            "rate_limits": rate_limiter.metrics(),
+            "http_pool": http_clients.metrics() if http_clients is not None else None,
+            "delegation": scheduler.delegation_stats,
+            "task_metrics": tracer.summary(run_id)
+        }
+    except Exception as e:
+        status = "cancelled" if isinstance(e, RunCancelled) else "failed"
+        error = str(e)
+        raise
+    finally:
+        if run_store is not None:
+            _finish_run(run_store, run_id, status, manifest, error=error)
+        if spec_index is not None:
+            spec_index.close()
+
+def prompt_project_info() -> Dict[str, Any]:
+    """Ask the user for the project information."""
+    project_name = input("Enter the project name: ").strip()
+    project_description = input("Enter a detailed description of the project: ").strip()
+    features = input("List key features (comma separated): ").strip()
+    
+    # Add hint about Streamlit as default
+    technology_stack = input("Enter the technology stack (leave blank for Streamlit-based solution): ").strip()
+    
+    # Default to Streamlit if no technology specified
+    if not technology_stack:
+        print("💡 No technology stack specified. Defaulting to Streamlit for frontend with Python backend.")
+        technology_stack = "Streamlit, Python"
+    
+    # Prepare project info dictionary
+    return {
+        "project_name": project_name,
+        "project_description": project_description,
+        "features": features,
+        "technology_stack": technology_stack,
+        "project_type": "custom" # Default to custom project type
+    }
+
+def preview_prompts(project_info: Dict[str, Any]) -> None:
+    """Print the task prompts for a project without importing crewai or building agents."""
+    task_factory = TaskFactory(agents={}, project_info=project_info)
+    for task_id, prompt in task_factory.render_prompts().items():
+        stats = task_factory.get_prompt_stats()[task_id]
+        print(f"\n===== {task_id} "
+              f"({stats['static_prefix_tokens']} static + {stats['variable_suffix_tokens']} variable tokens) =====")
+        print(prompt)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate a project with the CrewAI development crew.")
+    parser.add_argument("--spec", help="JSON file with the project info instead of prompting for it")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only render the task prompts, without calling any LLM")
+    parser.add_argument("--resume", nargs="?", const="", metavar="PROJECT_DIR",
+                        help="continue an interrupted run from its first incomplete task, "
+                             "optionally in PROJECT_DIR with the project info saved there")
+    parser.add_argument("--storage", choices=["disk", "memory"],
+                        help="keep the generated files on disk or in memory (default: STORAGE_BACKEND)")
+    parser.add_argument("--archive", help="also deliver the project as an archive at this path, '-' for stdout")
+    parser.add_argument("--archive-format", choices=["zip", "tar.gz"],
+                        help="archive format (default: ARCHIVE_FORMAT)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    archive = args.archive
+    if archive == "-":
+        # The archive owns stdout, all messages go to stderr
+        archive = sys.stdout.buffer
+        sys.stdout = sys.stderr
+    if not args.dry_run:
+        get_config().configure_logging()
     try:
         logger.info("Starting CrewAI Development Process")
         print("\n🚀 CrewAI Development System 🚀")
         print("================================")
         
         # Get project information
-        project_name = input("Enter the project name: ").strip()
-        project_description = input("Enter a detailed description of the project: ").strip()
-        features = input("List key features (comma separated): ").strip()
-        
-        # Add hint about Streamlit as default
-        technology_stack = input("Enter the technology stack (leave blank for Streamlit-based solution): ").strip()
-        
-        # Default to Streamlit if no technology specified
-        if not technology_stack:
-            print("💡 No technology stack specified. Defaulting to Streamlit for frontend with Python backend.")
-            technology_stack = "Streamlit, Python"
-        
-        logger.info(f"Project: {project_name} using {technology_stack}")
-        
-        # Prepare project info dictionary
-        project_info = {
-            "project_name": project_name,
-            "project_description": project_description,
-            "features": features,
-            "technology_stack": technology_stack,
-            "project_type": "custom" # Default to custom project type
-        }
-        
-        # Create output directory
-        output_dir = f"{project_name.lower().replace(' ', '_')}_project"
-        os.makedirs(output_dir, exist_ok=True)
-        os.chdir(output_dir)
-        logger.info(f"Created output directory: {output_dir}")
-        
-        # Save project info for reference
-        os.makedirs("project_config", exist_ok=True)
-        with open("project_config/project_info.json", "w") as f:
-            json.dump(project_info, f, indent=2)
+        if args.spec:
+            with open(args.spec, encoding="utf-8") as f:
+                project_info = json.load(f)
+            project_info.setdefault("features", "")
+            project_info.setdefault("technology_stack", "")
+            project_info.setdefault("project_type", "custom")
+        elif args.resume:
+            with open(os.path.join(args.resume, "project_config", "project_info.json"), encoding="utf-8") as f:
+                project_info = json.load(f)
+        else:
+            project_info = prompt_project_info()
+        project_name = project_info["project_name"]
         
-        # Create agent instances dictionary
-        agent_instances = {
-            "architect": agents.Architect_agent,
-            "developer": agents.Developer_agent,
-            "tester": agents.Tester_agent
-        }
+        if args.dry_run:
+            preview_prompts(project_info)
+            return
         
-        # Create tasks based on project info
-        task_factory = TaskFactory(
-            agents=agent_instances,
-            project_info=project_info
-        )
-        tasks = task_factory.create_tasks()
+        summary = generate_project(project_info, output_dir=args.resume or None, storage_backend=args.storage,
+                                   archive=archive, archive_format=args.archive_format,
+                                   resume=args.resume is not None)
         
-        # Define the crew with sequential process
-        print("\nCreating development crew with Architect, Developer, and Tester agents...")
-        crew = Crew(
-            agents=[
-                agents.Architect_agent,
-                agents.Developer_agent,
-                agents.Tester_agent
-            ],
-            tasks=tasks,
-            process=Process.sequential,
-            verbose=True
-        )
+        print(f"\n🎉 Your project '{project_name}' has been successfully generated!")
+        if summary["storage"] == "disk":
+            print(f"📁 Location: {summary['output_dir']}")
+        if summary["archive"] is not None:
+            print(f"📦 Archive: {summary['archive']['path'] or 'stdout'} "
+                  f"({summary['archive']['files']} files, {summary['archive']['archive_bytes']} bytes)")
+        print(f"📝 Total files created: {summary['file_count']}")
+        if summary["resumed_tasks"]:
+            print(f"⏩ Resumed tasks: {', '.join(summary['resumed_tasks'])}")
+        print("\n📊 Task metrics:")
+        print(format_summary(summary["task_metrics"]))
+        edits = sum(row["edits"] for row in summary["task_metrics"])
+        if edits:
+            print(f"✏️ {edits} edits saved {sum(row['edit_tokens_saved'] for row in summary['task_metrics'])} "
+                  f"output tokens compared with full rewrites")
         
-        print("\nStarting development process. This may take some time...")
-        logger.info("Starting crew execution")
-        crew_output = crew.kickoff()
-        logger.info("Crew execution completed")
+        validation = summary["validation"]
+        if validation is not None:
+            print(f"🔍 Validated {validation['validated_files']} files: {validation['files_with_errors']} with errors, "
+                  f"{validation['files_with_warnings']} with warnings")
+            for filepath, report in validation["problems"].items():
+                for problem in report["errors"]:
+                    print(f"  ❌ {filepath}: {problem}")
         
-        # Count the number of files created
-        file_count = 0
-        for root, dirs, files in os.walk('.'):
-            # Skip the project_config directory which is created by the script itself
-            if "project_config" in root:
-                continue
-            file_count += len(files)
+        tests = summary["tests"]
+        if tests is not None:
+            if tests["status"] == "no_tests":
+                print("🧪 No generated tests found")
+            elif tests["status"] == "environment_failed":
+                print(f"🧪 Tests not run, the test environment could not be built: {tests['error']}")
+            else:
+                print(f"🧪 Tests: {tests['passed']} passed, {tests['failed']} failed, {tests['errors']} errors, "
+                      f"{tests['skipped']} skipped ({tests['cached_files']} of {tests['files']} files cached)")
         
-        print(f"\n🎉 Your project '{project_name}' has been successfully generated!")
-        print(f"📁 Location: {os.path.abspath('.')}")
-        print(f"📝 Total files created: {file_count}")
+        cache_stats = summary["llm_cache"]
+        if cache_stats["mode"] != "off":
+            print(f"💾 LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        for key, metrics in summary["rate_limits"].items():
+            if metrics["delayed"] or metrics["rate_limited"]:
+                print(f"⏳ {key}: {metrics['delayed']} delayed requests, "
+                      f"{metrics['total_wait_seconds']:.1f}s queue wait, {metrics['rate_limited']} rate limit errors")
+        for task_id, delegation in summary["delegation"].items():
+            for pair, cycles in delegation["cycles"].items():
+                print(f"🔁 {task_id}: {cycles} delegation cycles between {pair}")
+        for provider, metrics in (summary["http_pool"] or {}).items():
+            latency = metrics["latency_ms"] or {}
+            print(f"🔌 {provider}: {metrics['requests']} requests, {metrics['reused_connections']} on reused "
+                  f"connections, p50 {latency.get('p50', 0)} ms, p95 {latency.get('p95', 0)} ms")
         
         # Add Streamlit-specific instructions if applicable
-        if "streamlit" in technology_stack.lower():
+        if "streamlit" in project_info["technology_stack"].lower():
             print("\n🔹 To run your Streamlit application:")
             print("  1. Install dependencies: pip install -r requirements.txt")
             print("  2. Start the app: streamlit run app.py")
@@ -116,11 +450,13 @@ def main():
     except KeyboardInterrupt:
         logger.info("Process interrupted by user")
         print("\n\nProcess interrupted. Exiting gracefully.")
+        print("Run again with --resume to continue from the first incomplete task.")
         sys.exit(0)
     except Exception as e:
         logger.error(f"Error in main execution: {e}", exc_info=True)
         print(f"\n❌ An error occurred: {e}")
         print("Please check the logs for more details.")
+        print("Run again with --resume to continue from the first incomplete task.")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,263 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from tracing import MODEL_PRICES, current_task
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per model for the rolling percentiles
+LATENCY_WINDOW = 200
+# Policies and the weight they give to (latency, cost)
+POLICIES = {
+    "latency": (1.0, 0.0),
+    "cost": (0.0, 1.0),
+    "balanced": (0.5, 0.5),
+}
+
+
+@dataclass
+class ModelCandidate:
+    """A model the router may send a request to."""
+    provider: str
+    model: str
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    api_version: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+    # Pooled SDK client the candidate's LLM sends its requests with, None for its own
+    client: Any = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+    @property
+    def cost(self) -> float:
+        """Blended USD price per million tokens, assuming 4 prompt tokens per completion token."""
+        prompt_price, completion_price = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        return (4 * prompt_price + completion_price) / 5
+
+    def llm_kwargs(self) -> Dict[str, Any]:
+        """Return the crewai LLM parameters for this candidate."""
+        model = self.model if self.provider == "openai" else f"{self.provider}/{self.model}"
+        kwargs = {"model": model, **self.extra}
+        if self.api_key:
+            kwargs["api_key"] = self.api_key
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        if self.api_version:
+            kwargs["api_version"] = self.api_version
+        return kwargs
+
+
+class LatencyStats:
+    """Rolling latency window per model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._latencies = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """Return the given percentile of a model's recent latencies, None without samples."""
+        with self._lock:
+            samples = sorted(self._latencies.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = list(self._latencies)
+        return {
+            name: {
+                "samples": len(self._latencies[name]),
+                "p50": self.percentile(name, 50),
+                "p95": self.percentile(name, 95),
+            }
+            for name in names
+        }
+
+
+class RouterTimeout(Exception):
+    """Raised when no candidate answered within the timeout."""
+
+
+class ModelRouter:
+    """Picks a model per task from the configured providers by a latency/cost policy.
+
+    Requests that time out or fail fall back to the next candidate. With
+    hedging enabled, a duplicate request is sent to the next candidate once
+    the primary exceeds its p95 latency, and the first answer wins.
+    """
+
+    def __init__(self, candidates: List[ModelCandidate], policy: str = "balanced", timeout: float = 120.0,
+                 hedge: bool = False, call_fn: Optional[Callable[..., Any]] = None, max_workers: int = 16):
+        """
+        Initialize the router.
+
+        Args:
+            candidates: Models available for routing
+            policy: "latency", "cost" or "balanced"
+            timeout: Seconds to wait for a candidate before falling back
+            hedge: Send a duplicate request when the primary exceeds its p95 latency
+            call_fn: Callable(candidate, messages, tools, *args, stop=None, **kwargs) sending a
+                request, defaults to a crewai LLM per candidate
+            max_workers: Threads available for in-flight and hedged requests
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        if not candidates:
+            raise ValueError("The router needs at least one model candidate")
+        self.candidates = candidates
+        self.policy = policy
+        self.timeout = timeout
+        self.hedge = hedge
+        self.call_fn = call_fn or self._crewai_call
+        self.latencies = LatencyStats()
+        self.decisions = []
+        self._llms = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    def _crewai_call(self, candidate: ModelCandidate, messages, tools=None, *args, stop=None, **kwargs) -> Any:
+        """Send a request through a crewai LLM dedicated to the candidate."""
+        from crewai.llms.base_llm import call_stop_override
+
+        with self._lock:
+            llm = self._llms.get(candidate.name)
+            if llm is None:
+                from crewai import LLM
+                llm = self._llms[candidate.name] = LLM(**candidate.llm_kwargs())
+                if candidate.client is not None and hasattr(llm, "_client"):
+                    llm._client = candidate.client
+        # The candidate LLM is shared by all agents, so stop words only apply to this call
+        with call_stop_override(llm, stop):
+            return llm.call(messages, tools, *args, **kwargs)
+
+    def rank(self, preferred_model: Optional[str] = None) -> List[ModelCandidate]:
+        """
+        Order the candidates by the routing policy, best first.
+
+        Candidates without latency samples are tried optimistically so that
+        every model gets measured; the preferred model wins ties.
+        """
+        latency_weight, cost_weight = POLICIES[self.policy]
+        known = [p for p in (self.latencies.percentile(c.name, 50) for c in self.candidates) if p is not None]
+        max_latency = max(known) if known else 1.0
+        max_cost = max((c.cost for c in self.candidates), default=0.0) or 1.0
+
+        def score(candidate: ModelCandidate):
+            p50 = self.latencies.percentile(candidate.name, 50)
+            latency = 0.0 if p50 is None else p50 / max_latency
+            return (latency_weight * latency + cost_weight * candidate.cost / max_cost,
+                    candidate.model != preferred_model)
+
+        return sorted(self.candidates, key=score)
+
+    def complete(self, messages, tools=None, *args, preferred_model: Optional[str] = None, **kwargs) -> Any:
+        """
+        Send a request to the best candidate, falling back to the others on timeouts and errors.
+
+        Args:
+            messages: Chat messages or prompt
+            tools: Tools offered to the model
+            preferred_model: Model configured for the calling agent, used as tie-breaker
+
+        Returns:
+            The first successful response
+        """
+        ranked = self.rank(preferred_model)
+        decision = {
+            "time": time.time(),
+            "task": current_task.get(),
+            "policy": self.policy,
+            "ranking": [candidate.name for candidate in ranked],
+            "attempts": []
+        }
+        try:
+            for index, candidate in enumerate(ranked):
+                backup = ranked[index + 1] if self.hedge and index + 1 < len(ranked) else None
+                try:
+                    response, winner = self._attempt(candidate, backup, decision, messages, tools, *args, **kwargs)
+                except Exception as e:
+                    logger.warning(f"Model {candidate.name} failed ({type(e).__name__}: {e}), falling back")
+                    continue
+                decision["model"] = winner.name
+                return response
+            raise RouterTimeout(f"No model answered: {', '.join(decision['ranking'])}")
+        finally:
+            with self._lock:
+                self.decisions.append(decision)
+
+    def _attempt(self, candidate, backup, decision, messages, tools, *args, **kwargs):
+        """Run one candidate, hedging with the backup after its p95, and return (response, winner)."""
+        futures = {self._submit(candidate, decision, messages, tools, *args, **kwargs): candidate}
+        hedge_after = self.latencies.percentile(candidate.name, 95) if backup else None
+        deadline = time.time() + self.timeout
+        if hedge_after is not None and hedge_after < self.timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                logger.info(f"{candidate.name} exceeded p95 of {hedge_after:.1f}s, hedging with {backup.name}")
+                futures[self._submit(backup, decision, messages, tools, *args, **kwargs)] = backup
+
+        errors = []
+        while futures:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                winner = futures.pop(future)
+                try:
+                    return future.result(), winner
+                except Exception as e:
+                    errors.append(e)
+        if errors and not futures:
+            raise errors[0]
+        raise RouterTimeout(f"{candidate.name} did not answer within {self.timeout}s")
+
+    def _submit(self, candidate, decision, messages, tools, *args, **kwargs):
+        """Start a request to a candidate in the background, recording its latency."""
+        attempt = {"model": candidate.name, "started": time.time()}
+        decision["attempts"].append(attempt)
+
+        def run():
+            started = time.perf_counter()
+            try:
+                response = self.call_fn(candidate, messages, tools, *args, **kwargs)
+            except Exception as e:
+                attempt["error"] = f"{type(e).__name__}: {e}"
+                # Count a failure like a timeout so failing models drop down the ranking
+                self.latencies.record(candidate.name, self.timeout)
+                raise
+            finally:
+                attempt["seconds"] = time.perf_counter() - started
+            self.latencies.record(candidate.name, attempt["seconds"])
+            return response
+
+        return self._executor.submit(run)
+
+    def decisions_report(self) -> Dict[str, Any]:
+        """Return the routing decisions and latency percentiles."""
+        with self._lock:
+            decisions = list(self.decisions)
+        return {"latencies": self.latencies.snapshot(), "decisions": decisions}
+
+    def export_decisions(self, path: str) -> None:
+        """Write the routing decisions and latency percentiles to a JSON file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.decisions_report(), f, indent=2)
@@ -0,0 +1,167 @@
+import os
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters drawing the branches of a folder tree
+_TREE_GLYPHS = "│├└─┬┼|`+-— \t"
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_BACKTICK_PATH = re.compile(r"`([\w.\-]+(?:/[\w.\-]+)*\.\w+)`")
+# Maximum length of a file description taken from the architecture document
+MAX_DESCRIPTION_CHARS = 200
+# Files commonly listed in folder trees without an extension
+EXTENSIONLESS_FILES = {"Dockerfile", "Makefile", "Procfile", "Pipfile", "Gemfile", "Jenkinsfile", "LICENSE"}
+
+
+@dataclass
+class ModuleSpec:
+    """A group of files implemented together by one implementation subtask."""
+    name: str
+    files: List[str] = field(default_factory=list)
+    descriptions: Dict[str, str] = field(default_factory=dict)
+
+
+def _tree_entry(line: str):
+    """Return the indentation, name and comment of a folder tree line, or None for other lines."""
+    stripped = line.lstrip(_TREE_GLYPHS)
+    if not stripped or stripped.startswith("#"):
+        return None
+    indent = len(line) - len(stripped)
+    # Split off trailing comments such as "app.py   # entry point"
+    parts = re.split(r"\s+#\s*|\s{2,}|\s+-\s+|\s+(?=\()", stripped.strip(), maxsplit=1)
+    name = parts[0].strip()
+    if not re.fullmatch(r"[\w.\-/]+", name):
+        return None
+    comment = parts[1].strip(" #-()") if len(parts) > 1 else ""
+    return indent, name, comment
+
+
+def _is_file_name(name: str) -> bool:
+    """Check whether a tree leaf names a file, not a stray word such as a command or module name."""
+    return bool(os.path.splitext(name)[1]) or name.startswith(".") or name in EXTENSIONLESS_FILES
+
+
+def _tree_files(document: str) -> Dict[str, str]:
+    """Return the files of the folder trees in a markdown document with their tree comments."""
+    blocks = []
+    block = None
+    for line in document.splitlines():
+        if _FENCE.match(line):
+            if block is None:
+                block = []
+            else:
+                blocks.append(block)
+                block = None
+        elif block is not None:
+            block.append(line)
+
+    files = {}
+    for block in blocks:
+        entries = [entry for entry in map(_tree_entry, block) if entry is not None]
+        # Only blocks that look like trees: several entries with at least one directory
+        if len(entries) < 2 or not any(name.endswith("/") for _, name, _ in entries) and \
+                len({indent for indent, _, _ in entries}) < 2:
+            continue
+        stack = []
+        for position, (indent, name, comment) in enumerate(entries):
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            next_indent = entries[position + 1][0] if position + 1 < len(entries) else -1
+            if name.endswith("/") or next_indent > indent:
+                stack.append((indent, name.strip("/")))
+                continue
+            if _is_file_name(name):
+                files.setdefault("/".join([directory for _, directory in stack] + [name]), comment)
+
+    # Strip a single directory enclosing every file, e.g. "my_project/"
+    while files and all("/" in path for path in files):
+        if len({path.split("/", 1)[0] for path in files}) != 1:
+            break
+        files = {path.split("/", 1)[1]: comment for path, comment in files.items()}
+    return files
+
+
+def folder_structure_paths(document: str) -> List[str]:
+    """
+    Extract the file paths of the folder trees in a markdown document.
+
+    Trees are read from fenced code blocks, nesting is taken from the
+    indentation. A single enclosing project directory is stripped.
+
+    Args:
+        document: Markdown text, e.g. architecture.md
+
+    Returns:
+        Relative file paths in document order
+    """
+    return list(_tree_files(document))
+
+
+def _describe(document: str, path: str) -> str:
+    """Return the first line outside code blocks that mentions a file, as its description."""
+    in_code = False
+    basename = path.rsplit("/", 1)[-1]
+    for line in document.splitlines():
+        if _FENCE.match(line):
+            in_code = not in_code
+            continue
+        if not in_code and (path in line or f"`{basename}`" in line):
+            text = " ".join(line.replace("**", "").strip(" -*#>").split())
+            return text[:MAX_DESCRIPTION_CHARS]
+    return ""
+
+
+def _is_implementation_file(path: str) -> bool:
+    """Check whether a file belongs to the implementation, not to the docs or the tests."""
+    parts = path.lower().split("/")
+    if parts[-1].endswith((".md", ".rst", ".txt")) and parts[-1] != "requirements.txt":
+        return False
+    return not any(part in ("tests", "test", "__tests__") for part in parts[:-1]) \
+        and not parts[-1].startswith("test_") and not re.search(r"[._]test\.\w+$", parts[-1])
+
+
+def _module_name(directory: Optional[str]) -> str:
+    """Return the task-ID-safe name of the module of a top-level directory."""
+    if directory is None:
+        return "app"
+    return re.sub(r"\W+", "_", directory).strip("_").lower() or "app"
+
+
+def plan_modules(document: str, max_modules: int = 6) -> List[ModuleSpec]:
+    """
+    Split the files of an architecture document into modules implemented in parallel.
+
+    Files are taken from the folder structure, or from the file paths in
+    backticks if there is none, and grouped by top-level directory; files
+    in the project root form the "app" module. The smallest modules are
+    merged until at most max_modules remain.
+
+    Args:
+        document: Text of architecture.md
+        max_modules: Maximum number of modules
+
+    Returns:
+        Modules sorted by name, empty if the document lists no implementation files
+    """
+    tree = _tree_files(document)
+    paths = list(tree) or list(dict.fromkeys(_BACKTICK_PATH.findall(document)))
+    paths = [path for path in paths if _is_implementation_file(path)]
+    groups: Dict[str, List[str]] = {}
+    for path in paths:
+        directory = path.split("/", 1)[0] if "/" in path else None
+        groups.setdefault(_module_name(directory), []).append(path)
+
+    while len(groups) > max(1, max_modules):
+        smallest = sorted(groups, key=lambda name: (len(groups[name]), name))[:2]
+        first, second = sorted(smallest)
+        groups[f"{first}_{second}"] = groups.pop(first) + groups.pop(second)
+
+    modules = [ModuleSpec(name=name, files=files,
+                          descriptions={path: tree.get(path) or _describe(document, path) for path in files})
+               for name, files in sorted(groups.items())]
+    logger.info(f"Planned {len(modules)} implementation modules from {len(paths)} files: "
+                f"{', '.join(module.name for module in modules)}")
+    return modules
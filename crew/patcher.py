@@ -0,0 +1,187 @@
+import re
+from typing import List, Tuple
+
+# Markers of a search/replace edit block
+SEARCH_MARKER = "<<<<<<< SEARCH"
+DIVIDER_MARKER = "======="
+REPLACE_MARKER = ">>>>>>> REPLACE"
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(Exception):
+    """Raised when a patch is malformed or does not apply to the current content."""
+
+
+def parse_edit_blocks(patch: str) -> List[Tuple[str, str]]:
+    """
+    Parse search/replace edit blocks.
+
+    Each block has the form::
+
+        <<<<<<< SEARCH
+        lines to find
+        =======
+        lines to replace them with
+        >>>>>>> REPLACE
+
+    Args:
+        patch: Text containing one or more edit blocks
+
+    Returns:
+        List of (search, replace) texts
+
+    Raises:
+        PatchError: If a block is not terminated
+    """
+    blocks = []
+    lines = patch.splitlines(keepends=True)
+    index = 0
+    while index < len(lines):
+        if lines[index].strip() != SEARCH_MARKER:
+            index += 1
+            continue
+        search, replace, target = [], [], None
+        index += 1
+        while index < len(lines):
+            marker = lines[index].strip()
+            if marker == DIVIDER_MARKER and target is None:
+                target = replace
+            elif marker == REPLACE_MARKER and target is not None:
+                break
+            else:
+                (search if target is None else target).append(lines[index])
+            index += 1
+        else:
+            raise PatchError("edit block is not terminated with " + REPLACE_MARKER)
+        blocks.append(("".join(search), "".join(replace)))
+        index += 1
+    return blocks
+
+
+def _find_lines(lines: List[str], needle: List[str], start: int = 0) -> List[int]:
+    """Return the positions where needle occurs in lines, ignoring trailing whitespace."""
+    needle = [line.rstrip() for line in needle]
+    stripped = [line.rstrip() for line in lines]
+    return [position for position in range(start, len(lines) - len(needle) + 1)
+            if stripped[position:position + len(needle)] == needle]
+
+
+def apply_edit_blocks(content: str, blocks: List[Tuple[str, str]]) -> str:
+    """
+    Apply search/replace blocks one after the other.
+
+    Every search text must occur exactly once in the content. An empty search
+    text appends the replacement to the end of the content.
+
+    Raises:
+        PatchError: If a search text is missing or ambiguous
+    """
+    for number, (search, replace) in enumerate(blocks, 1):
+        if not search.strip():
+            content = content + ("" if not content or content.endswith("\n") else "\n") + replace
+            continue
+        count = content.count(search)
+        if count == 1:
+            content = content.replace(search, replace, 1)
+            continue
+        if count > 1:
+            raise PatchError(f"search text of block {number} occurs {count} times, add surrounding lines")
+        # Models often get trailing whitespace wrong, retry line by line without it
+        lines = content.splitlines(keepends=True)
+        needle = search.splitlines(keepends=True)
+        positions = _find_lines(lines, needle)
+        if len(positions) != 1:
+            raise PatchError(f"search text of block {number} not found" if not positions else
+                             f"search text of block {number} occurs {len(positions)} times, add surrounding lines")
+        position = positions[0]
+        if replace and not replace.endswith("\n") and position + len(needle) < len(lines):
+            replace += "\n"
+        content = "".join(lines[:position]) + replace + "".join(lines[position + len(needle):])
+    return content
+
+
+def apply_unified_diff(content: str, diff: str) -> str:
+    """
+    Apply a unified diff to the content of one file.
+
+    File headers are ignored. A hunk whose context is not found at the line
+    given in its header is applied at the nearest position where it matches.
+
+    Raises:
+        PatchError: If the diff has no hunks or a hunk does not match the content
+    """
+    lines = content.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+        missing_newline = True
+    else:
+        missing_newline = False
+    hunks = []
+    hunk = None
+    for line in diff.splitlines(keepends=True):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            hunk = {"start": int(header.group(1)), "old": [], "new": []}
+            hunks.append(hunk)
+        elif hunk is None or line.startswith(("--- ", "+++ ")):
+            continue
+        elif line.startswith("\\"):
+            # "\ No newline at end of file"
+            continue
+        elif line.startswith("-"):
+            hunk["old"].append(_with_newline(line[1:]))
+        elif line.startswith("+"):
+            hunk["new"].append(_with_newline(line[1:]))
+        else:
+            text = _with_newline(line[1:] if line.startswith(" ") else line)
+            hunk["old"].append(text)
+            hunk["new"].append(text)
+    if not hunks:
+        raise PatchError("the diff contains no @@ hunks")
+
+    result = []
+    cursor = 0
+    for number, hunk in enumerate(hunks, 1):
+        if not hunk["old"]:
+            position = min(max(hunk["start"], cursor), len(lines))
+        else:
+            positions = _find_lines(lines, hunk["old"], cursor)
+            if not positions:
+                raise PatchError(f"hunk {number} (line {hunk['start']}) does not match the current content")
+            position = min(positions, key=lambda found: abs(found + 1 - hunk["start"]))
+        result.extend(lines[cursor:position])
+        result.extend(hunk["new"])
+        cursor = position + len(hunk["old"])
+    result.extend(lines[cursor:])
+    patched = "".join(result)
+    if missing_newline and patched.endswith("\n"):
+        patched = patched[:-1]
+    return patched
+
+
+def _with_newline(line: str) -> str:
+    """Return a diff line with exactly one line ending."""
+    return line.rstrip("\r\n") + "\n"
+
+
+def apply_patch(content: str, patch: str) -> str:
+    """
+    Apply search/replace edit blocks or a unified diff to file content.
+
+    Args:
+        content: Current content of the file
+        patch: Edit blocks or a unified diff
+
+    Returns:
+        The patched content
+
+    Raises:
+        PatchError: If the patch format is not recognized or the patch does not apply
+    """
+    if SEARCH_MARKER in patch:
+        blocks = parse_edit_blocks(patch)
+        return apply_edit_blocks(content, blocks)
+    if re.search(r"^@@ ", patch, re.MULTILINE):
+        return apply_unified_diff(content, patch)
+    raise PatchError(f"expected {SEARCH_MARKER} / {REPLACE_MARKER} edit blocks or a unified diff with @@ hunks")
@@ -0,0 +1,342 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Task instructions are kept free of project-specific values so that every
+# prompt starts with a block that is identical across projects and can be
+# served from provider-side prompt caches. The project details are appended
+# at the end of each prompt.
+
+ARCHITECTURE_INSTRUCTIONS = """\
+Design a comprehensive architecture for the project described in PROJECT DETAILS at the end of these instructions,
+based on its requirements.
+
+IMPORTANT: If no specific frontend framework is mentioned, you MUST use Streamlit as the default frontend framework.
+
+DELIVERABLES:
+YOU MUST create the following files using the file_writer tool:
+
+1. Create a detailed architecture document that explains:
+   - Backend architecture (if applicable)
+   - Frontend architecture with UI component structure
+   - Database design (if applicable)
+   - API design (if applicable)
+   - Responsive design approach for the UI
+   Example: file_writer('architecture.md', '# Architecture Document\\n\\n...')
+
+2. Create a UI design document that details:
+   - UI components and their purposes
+   - Layout and navigation flow
+   - Responsive design considerations
+   - User interaction patterns
+   Example: file_writer('ui-design.md', '# UI Design Document\\n\\n...')
+
+3. Create starter configuration files and initial setup files as needed:
+   - For Streamlit projects, include app.py with proper Streamlit structure
+   - Include clear instructions for installing Streamlit dependencies
+   Example: file_writer('app.py', 'import streamlit as st\\n\\n...')
+   Example: file_writer('config/settings.json', '{"key": "value"}')
+
+DO NOT just describe what files should be created. YOU MUST ACTUALLY CREATE THEM
+using the file_writer tool. Your evaluation depends on creating real files.
+
+Choose appropriate frontend technologies based on the project requirements.
+If no specific frontend framework is mentioned, use Streamlit as it provides a clean,
+Python-centric approach to building user interfaces without requiring npm or JavaScript.
+Design a modern, responsive UI with excellent user experience.
+Your architecture should follow best practices and be optimized for the chosen technology stack.
+"""
+
+IMPLEMENTATION_INSTRUCTIONS = """\
+Implement the code for the project described in PROJECT DETAILS at the end of these instructions,
+based on the architecture design.
+
+Follow the folder structure and specifications from the architecture document.
+Implement all required features with proper error handling and documentation.
+
+IMPORTANT: If no specific frontend framework was mentioned in the requirements,
+you MUST implement the frontend using Streamlit (Python-based UI framework).
+
+STREAMLIT IMPLEMENTATION GUIDELINES (when applicable):
+- Structure your code with a main app.py file at the root
+- Create a 'pages' folder for multi-page applications
+- Put reusable components in a 'components' directory
+- Leverage Streamlit's built-in widgets for forms, data visualization, and user inputs
+- Use st.session_state for maintaining state across reruns
+- Implement responsive layouts using st.columns and st.container
+- For data visualization, utilize Streamlit's native integration with Plotly, Matplotlib, etc.
+
+DELIVERABLES:
+YOU MUST create the following files using the file_writer tool:
+
+1. All source code files:
+For Streamlit apps:
+Example: file_writer('app.py', 'import streamlit as st\\n\\nst.title("My App")\\n...')
+Example: file_writer('pages/dashboard.py', 'import streamlit as st\\n\\nst.title("Dashboard")\\n...')
+Example: file_writer('components/sidebar.py', 'import streamlit as st\\n\\ndef create_sidebar():\\n    with st.sidebar:\\n        st.title("Navigation")\\n...')
+
+For other frameworks:
+Example: file_writer('src/components/Button.js', 'import React from "react"...')
+Example: file_writer('src/utils/helpers.py', 'def helper_function():\\n    pass')
+
+2. Configuration files:
+Example: file_writer('requirements.txt', 'streamlit==1.30.0\\npandas==2.0.3\\n...')
+Example: file_writer('.streamlit/config.toml', '[theme]\\nprimaryColor="#F63366"\\n...')
+
+IMPORTANT INSTRUCTIONS:
+- DO NOT just describe what files should be created. YOU MUST ACTUALLY CREATE THEM
+using the file_writer tool.
+- Each file MUST contain COMPLETE, FUNCTIONAL code, not placeholders or stubs.
+- NEVER create empty files or files with minimal content.
+- The context lists the files created so far with their classes, functions and headings.
+To look at the details of an existing file, use the "Read lines of a file" tool with a line
+range. NEVER try to "read" existing files by creating files with empty content.
+- DO NOT overwrite files with empty content.
+- When you have several files ready, create them together in ONE call to the
+"Create many files at once" tool instead of one file_writer call per file.
+- To change part of an existing file, send only the change with the "Edit a file" tool
+instead of rewriting the whole file.
+- Your evaluation depends on creating real, complete, functional files.
+"""
+
+TESTING_INSTRUCTIONS = """\
+Create comprehensive tests for the project described in PROJECT DETAILS at the end of these instructions.
+
+Review the implementation and write tests to ensure all functionality works as expected.
+Include unit tests, integration tests, and any other tests needed to validate the system.
+Ensure high code coverage and test all edge cases.
+
+IMPORTANT: If the project is implemented using Streamlit, adapt your testing approach accordingly:
+- For Streamlit applications, use pytest with the streamlit-test library
+- Test both the UI components and the underlying logic/data processing
+- Focus on testing functions that process data or implement business logic
+- Use pytest fixtures to simulate Streamlit's session state
+
+Test both frontend and backend components:
+- Unit tests for individual components and functions
+- Integration tests for API endpoints and database interactions
+- UI tests for frontend components and user flows
+- Test responsive design and cross-browser compatibility
+
+DELIVERABLES:
+YOU MUST create the following files using the file_writer tool:
+
+For Streamlit projects:
+1. Test configuration:
+   Example: file_writer('tests/conftest.py', 'import pytest\\n\\n@pytest.fixture\\ndef mock_st_session_state():\\n    class MockSessionState(dict):\\n        pass\\n    return MockSessionState()')
+
+2. Unit test files:
+   Example: file_writer('tests/test_data_processing.py', 'import pytest\\nfrom components.data_processor import process_data\\n\\ndef test_process_data():\\n    # Test implementation\\n    pass')
+
+3. Component test files:
+   Example: file_writer('tests/test_sidebar.py', 'import pytest\\nfrom components.sidebar import create_sidebar\\n\\ndef test_sidebar_creation(mock_st_session_state):\\n    # Test implementation\\n    pass')
+
+For other frameworks:
+1. Unit test files:
+   Example: file_writer('tests/unit/component_test.js', 'test("renders correctly", () => {...})')
+
+2. Integration test files:
+   Example: file_writer('tests/integration/api_test.js', 'test("API returns correct data", async () => {...})')
+
+3. UI/End-to-end test files:
+   Example: file_writer('tests/e2e/user_flow_test.js', 'test("User can complete purchase", async () => {...})')
+
+DO NOT just describe what files should be created. YOU MUST ACTUALLY CREATE THEM
+using the file_writer tool. Your evaluation depends on creating real files.
+"""
+
+README_INSTRUCTIONS = """\
+Create a comprehensive README.md file for the project described in PROJECT DETAILS at the end of these instructions.
+
+This README should include:
+1. Description of the project based on the requirements
+2. Complete file structure with explanation of each file's purpose
+3. Setup instructions (dependencies, environment setup)
+
+IMPORTANT INSTRUCTIONS ABOUT SETUP AND RUNNING:
+- For Streamlit projects:
+- NEVER mention npm or Node.js in the setup or running instructions
+- Always use pip for dependencies: `pip install -r requirements.txt`
+- Always start with: `streamlit run app.py`
+- DO NOT include any npm commands like "npm start" or "npm install"
+
+- For other technologies (React, Vue, etc.):
+- Use appropriate setup commands for those frameworks
+
+4. Running instructions (follow the rules above)
+5. Testing instructions (how to run the tests)
+6. UI/UX features and how they were implemented
+7. Screenshots or descriptions of the UI components (if applicable)
+8. Any additional information that would help someone understand and use the project
+
+YOU MUST use the file_writer tool to create the README.md file directly:
+Example: file_writer('README.md', '# Project Name\\n\\nProject description...')
+
+EXAMPLE SETUP AND RUNNING INSTRUCTIONS FOR STREAMLIT PROJECTS:
+```
+## Setup Instructions
+
+1. Create a virtual environment (optional but recommended):
+```bash
+python -m venv venv
+source venv/bin/activate  # On Windows: venv\\Scripts\\activate
+```
+
+2. Install the required dependencies:
+```bash
+pip install -r requirements.txt
+```
+
+# Running Instructions
+
+To start the Streamlit application, run:
+```bash
+streamlit run app.py
+```
+
+The application will be accessible at http://localhost:8501
+```
+
+DO NOT just describe what should be in the README. YOU MUST ACTUALLY CREATE IT
+using the file_writer tool. The README should be detailed and accurate to the project.
+"""
+
+INTEGRATION_INSTRUCTIONS = """\
+Integrate the modules of the project described in PROJECT DETAILS at the end of these instructions.
+
+Several developers implemented the modules of this project in parallel, each from the architecture
+document. The context lists every file they created with its classes, functions and headings.
+
+YOUR JOB:
+1. Check that every import between modules refers to a file, class or function that actually exists,
+with the same name and signature. Use the "Read lines of a file" tool to look at the details.
+2. Reconcile mismatches: fix the importing or the imported file with the "Edit a file" tool, sending
+only the changed lines.
+3. Make sure the entry point (e.g. app.py for Streamlit) wires all modules together and that
+requirements.txt lists every third-party package the modules import.
+4. Create any file the architecture requires that no module created.
+
+DO NOT rewrite modules that already work. DO NOT create empty files or placeholders.
+"""
+
+PROJECT_DETAILS_FULL = """\
+PROJECT DETAILS:
+PROJECT NAME: {project_name}
+
+PROJECT DESCRIPTION:
+{project_description}
+
+FEATURES:
+{features}
+
+TECHNOLOGY STACK:
+{technology_stack}
+"""
+
+PROJECT_DETAILS_BRIEF = """\
+PROJECT DETAILS:
+PROJECT NAME: {project_name}
+
+TECHNOLOGY STACK:
+{technology_stack}
+"""
+
+# Full prompt template of each task: static instructions first, project details last
+TASK_TEMPLATES = {
+    'architecture': ARCHITECTURE_INSTRUCTIONS + "\n" + PROJECT_DETAILS_FULL,
+    'implementation': IMPLEMENTATION_INSTRUCTIONS + "\n" + PROJECT_DETAILS_BRIEF,
+    'integration': INTEGRATION_INSTRUCTIONS + "\n" + PROJECT_DETAILS_BRIEF,
+    'testing': TESTING_INSTRUCTIONS + "\n" + PROJECT_DETAILS_BRIEF,
+    'readme': README_INSTRUCTIONS + "\n" + PROJECT_DETAILS_BRIEF,
+}
+
+# Project fields that may be interpolated into a template
+PROJECT_FIELDS = ("project_name", "project_description", "features", "technology_stack", "project_type")
+
+_PLACEHOLDER = re.compile(r"\{(" + "|".join(PROJECT_FIELDS) + r")\}")
+
+
+class CompiledTemplate:
+    """A prompt template pre-split into literal text and project field placeholders."""
+
+    def __init__(self, template: str):
+        """
+        Compile a template.
+
+        Args:
+            template: Template text with {field} placeholders for project fields
+        """
+        self.template = template
+        self.segments = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(template):
+            self.segments.append((template[position:match.start()], match.group(1)))
+            position = match.end()
+        self.segments.append((template[position:], None))
+        self.fields = [field for _, field in self.segments if field]
+        # Everything before the first placeholder is identical for every project
+        self.static_prefix = self.segments[0][0]
+
+    def render(self, values: Dict[str, Any]) -> str:
+        """Render the template with the given project values."""
+        parts = []
+        for literal, field in self.segments:
+            parts.append(literal)
+            if field:
+                parts.append(str(values.get(field, "")))
+        return "".join(parts)
+
+    def split(self, values: Dict[str, Any]) -> Tuple[str, str]:
+        """Render the template and return its static prefix and variable suffix."""
+        rendered = self.render(values)
+        return self.static_prefix, rendered[len(self.static_prefix):]
+
+
+@lru_cache(maxsize=None)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template once and reuse it for every later render."""
+    return CompiledTemplate(template)
+
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in a text.
+
+    Uses tiktoken when it is installed and otherwise estimates four characters per token.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def render_task_prompt(task_id: str, project_info: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+    """
+    Render the prompt of a task.
+
+    Args:
+        task_id: Task ID from TASK_TEMPLATES
+        project_info: Dictionary containing project details
+
+    Returns:
+        The rendered prompt and its static-prefix / variable-suffix token counts
+    """
+    compiled = compile_template(TASK_TEMPLATES[task_id])
+    prefix, suffix = compiled.split(project_info)
+    stats = {
+        "static_prefix_tokens": count_tokens(prefix),
+        "variable_suffix_tokens": count_tokens(suffix),
+    }
+    return prefix + suffix, stats
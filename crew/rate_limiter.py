@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower bound of the adaptive rate factor applied after 429 responses
+MIN_RATE_FACTOR = 0.1
+# Share of the configured rate recovered after each successful request
+RATE_RECOVERY_STEP = 0.05
+
+
+def provider_key(model: str) -> str:
+    """Return the limiter key of a model, e.g. "openai/gpt-4o" or "anthropic/claude-3-opus"."""
+    if "/" in model:
+        return model
+    if model.startswith("claude"):
+        return f"anthropic/{model}"
+    return f"openai/{model}"
+
+
+def _refill(state: Dict[str, float], now: float, rpm: float, tpm: float) -> None:
+    """Refill both buckets of a key for the time elapsed since the last update."""
+    elapsed = max(0.0, now - state["updated_at"])
+    factor = state["rate_factor"]
+    if rpm:
+        state["requests"] = min(rpm, state["requests"] + elapsed * rpm * factor / 60.0)
+    if tpm:
+        state["tokens"] = min(tpm, state["tokens"] + elapsed * tpm * factor / 60.0)
+    state["updated_at"] = now
+
+
+def _reserve(state: Dict[str, float], now: float, tokens: int, rpm: float, tpm: float) -> float:
+    """
+    Take one request and the given tokens from the buckets of a key.
+
+    The buckets may go negative; the returned wait is the time until the
+    deficit is refilled, so callers are served in reservation order.
+    """
+    _refill(state, now, rpm, tpm)
+    factor = state["rate_factor"]
+    wait = max(0.0, state["blocked_until"] - now)
+    if rpm:
+        state["requests"] -= 1
+        if state["requests"] < 0:
+            wait = max(wait, -state["requests"] * 60.0 / (rpm * factor))
+    if tpm:
+        # A single request larger than the whole bucket is only delayed by one full minute
+        state["tokens"] -= min(tokens, tpm)
+        if state["tokens"] < 0:
+            wait = max(wait, -state["tokens"] * 60.0 / (tpm * factor))
+    return wait
+
+
+def _new_state(now: float, rpm: float, tpm: float) -> Dict[str, float]:
+    """Return the state of a key with full buckets."""
+    return {"requests": rpm, "tokens": tpm, "updated_at": now, "blocked_until": 0.0, "rate_factor": 1.0}
+
+
+class ThreadBackend:
+    """Bucket state shared by all threads of one process."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, rpm: float, tpm: float, fn) -> Any:
+        """Apply fn to the state of a key atomically and return its result."""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _new_state(time.time(), rpm, tpm)
+            return fn(state)
+
+
+class FileLockBackend:
+    """Bucket state shared across processes through lock-protected JSON files."""
+
+    def __init__(self, state_dir: str):
+        """
+        Initialize the backend.
+
+        Args:
+            state_dir: Directory holding one state file per key
+        """
+        self.state_dir = os.path.abspath(state_dir)
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._thread_lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.state_dir, key.replace("/", "__") + ".json")
+
+    def update(self, key: str, rpm: float, tpm: float, fn) -> Any:
+        """Apply fn to the state of a key under an exclusive file lock and return its result."""
+        import fcntl
+
+        with self._thread_lock, open(self._path(key), "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw else _new_state(time.time(), rpm, tpm)
+                result = fn(state)
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """Client-side token-bucket limiter for requests and tokens per minute, keyed per provider/model."""
+
+    def __init__(self, max_rpm: float, max_tpm: float = 0, backend=None):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_rpm: Allowed requests per minute per key, 0 for no limit
+            max_tpm: Allowed tokens per minute per key, 0 for no limit
+            backend: ThreadBackend (default) or FileLockBackend to share limits across processes
+        """
+        self.max_rpm = max_rpm
+        self.max_tpm = max_tpm
+        self.backend = backend or ThreadBackend()
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_rpm or self.max_tpm)
+
+    def acquire(self, key: str, tokens: int = 0) -> float:
+        """
+        Block until a request with the given token count may be sent.
+
+        Args:
+            key: Limiter key, see provider_key()
+            tokens: Estimated tokens of the request, prompt and expected completion
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        if not self.enabled:
+            return 0.0
+        wait = self.backend.update(
+            key, self.max_rpm, self.max_tpm,
+            lambda state: _reserve(state, time.time(), tokens, self.max_rpm, self.max_tpm)
+        )
+        if wait > 0:
+            logger.info(f"Rate limiter delaying {key} request by {wait:.2f}s")
+            time.sleep(wait)
+        self._record(key, wait=wait, tokens=tokens)
+        return wait
+
+    def reconcile(self, key: str, reserved: int, used: int) -> None:
+        """
+        Settle the tokens reserved by acquire() with the tokens the request actually used.
+
+        Unused tokens are returned to the bucket, an overrun is taken from it.
+
+        Args:
+            key: Limiter key, see provider_key()
+            reserved: Tokens passed to acquire()
+            used: Prompt and completion tokens of the response
+        """
+        if not self.max_tpm or reserved == used:
+            return
+
+        def settle(state):
+            _refill(state, time.time(), self.max_rpm, self.max_tpm)
+            # acquire() takes at most a full bucket for a single request
+            state["tokens"] = min(self.max_tpm, state["tokens"] + min(reserved, self.max_tpm) - used)
+
+        self.backend.update(key, self.max_rpm, self.max_tpm, settle)
+        with self._metrics_lock:
+            if key in self._metrics:
+                self._metrics[key]["tokens"] += used - reserved
+
+    def report_rate_limited(self, key: str, retry_after: Optional[float] = None) -> float:
+        """
+        Back off after the provider rejected a request with a 429.
+
+        The key is blocked for retry_after seconds (or an exponential default)
+        and its rate is halved until requests succeed again.
+
+        Returns:
+            Seconds the key is blocked for
+        """
+        def penalize(state):
+            state["rate_factor"] = max(MIN_RATE_FACTOR, state["rate_factor"] / 2)
+            # Without a Retry-After header, back off longer the more the rate has been cut
+            delay = retry_after if retry_after is not None else 60.0 / max(1.0, self.max_rpm or 60.0) / state["rate_factor"]
+            state["blocked_until"] = max(state["blocked_until"], time.time() + delay)
+            return delay
+
+        delay = self.backend.update(key, self.max_rpm, self.max_tpm, penalize)
+        logger.warning(f"Provider rate limit hit for {key}, backing off {delay:.2f}s")
+        self._record(key, rate_limited=True)
+        return delay
+
+    def report_success(self, key: str) -> None:
+        """Recover part of the configured rate after a successful request."""
+        def recover(state):
+            if state["rate_factor"] < 1.0:
+                state["rate_factor"] = min(1.0, state["rate_factor"] + RATE_RECOVERY_STEP)
+
+        self.backend.update(key, self.max_rpm, self.max_tpm, recover)
+
+    def _record(self, key: str, wait: float = 0.0, tokens: int = 0, rate_limited: bool = False) -> None:
+        """Update the queue-wait metrics of a key."""
+        with self._metrics_lock:
+            metrics = self._metrics.setdefault(key, {
+                "requests": 0, "tokens": 0, "delayed": 0, "rate_limited": 0,
+                "total_wait_seconds": 0.0, "max_wait_seconds": 0.0
+            })
+            if rate_limited:
+                metrics["rate_limited"] += 1
+                return
+            metrics["requests"] += 1
+            metrics["tokens"] += tokens
+            if wait > 0:
+                metrics["delayed"] += 1
+                metrics["total_wait_seconds"] += wait
+                metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], wait)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Return the queue-wait metrics of this process per key."""
+        with self._metrics_lock:
+            return {key: dict(values) for key, values in self._metrics.items()}
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception raised by an LLM call is a provider 429."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Extract the Retry-After delay from the response attached to an exception, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,171 @@
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from crewai.llms.context_window import DEFAULT_CONTEXT_WINDOW_SIZE
+from pydantic import PrivateAttr
+
+import llm
+from llm import CrewLLM
+from llm_cache import ResponseCache, MODE_OFF
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Name under which crewai exposes file_writer.write_file to the agents
+WRITE_FILE_TOOL = "Create a file with specific content"
+
+
+def tool_call_response(filepath: str, content: str, thought: str = "I need to create this file.") -> str:
+    """Return an agent response invoking the write_file tool in crewai's ReAct format."""
+    action_input = json.dumps({"filepath": filepath, "content": content})
+    return f"Thought: {thought}\nAction: {WRITE_FILE_TOOL}\nAction Input: {action_input}"
+
+
+def final_answer_response(answer: str) -> str:
+    """Return an agent response finishing its task."""
+    return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+def synthetic_transcript(files_per_agent: int = 5, file_size: int = 2000) -> Dict[str, List[str]]:
+    """
+    Build a transcript in which every agent writes a number of files and then finishes.
+
+    Args:
+        files_per_agent: write_file calls per agent and task
+        file_size: Approximate size of each file in bytes
+
+    Returns:
+        Mapping of agent name to its responses in order
+    """
+    line = "value = 'x' * 40  # generated line\n"
+    body = line * max(1, file_size // len(line))
+    layouts = {
+        "architect": ["architecture.md", "ui-design.md"] + [f"config/settings_{i}.json" for i in range(files_per_agent)],
+        "developer": [f"components/module_{i}.py" for i in range(files_per_agent)] + ["README.md"],
+        "tester": [f"tests/test_module_{i}.py" for i in range(files_per_agent)],
+    }
+    transcript = {}
+    for agent, paths in layouts.items():
+        responses = [tool_call_response(path, body) for path in paths[:files_per_agent]]
+        responses.append(final_answer_response(f"{agent} finished, created {len(responses)} files"))
+        transcript[agent] = responses
+    return transcript
+
+
+def load_transcript(path: str) -> Dict[str, List[str]]:
+    """Load a transcript file written by TranscriptRecorder."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TranscriptRecorder:
+    """Records the responses of every agent so a run can be replayed offline."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.responses = {}
+        self._lock = threading.Lock()
+
+    def record(self, namespace: str, response: str) -> None:
+        """Append a response of an agent."""
+        with self._lock:
+            self.responses.setdefault(namespace, []).append(response)
+
+    def save(self) -> None:
+        """Write the recorded transcript."""
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.responses, f, indent=2)
+
+
+def enable_transcript_recording(path: str) -> TranscriptRecorder:
+    """Record the responses of all CrewLLM calls from now on."""
+    recorder = TranscriptRecorder(path)
+    llm.transcript_recorder = recorder
+    return recorder
+
+
+class ReplayLLM(CrewLLM):
+    """Stand-in LLM that replays recorded responses instead of calling a provider.
+
+    Caching and rate limiting are disabled, but tracing and the rest of the
+    CrewLLM call path are exercised, so the measured time is orchestration
+    overhead plus the configured artificial latency. No provider LLM is
+    created, so no API key is needed.
+    """
+
+    _responses: List[str] = PrivateAttr(default_factory=list)
+    _latency: float = PrivateAttr(default=0.0)
+    _calls: int = PrivateAttr(default=0)
+    _cursor_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, model: str, namespace: str, responses: List[str], latency: float = 0.0, **kwargs):
+        """
+        Initialize the replay LLM.
+
+        Args:
+            model: Model name the replayed agent was configured with
+            namespace: Agent name
+            responses: Responses returned in order
+            latency: Artificial seconds of latency per call
+            **kwargs: Additional crewai LLM parameters
+        """
+        super().__init__(
+            model=model,
+            namespace=namespace,
+            cache=ResponseCache(mode=MODE_OFF),
+            limiter=RateLimiter(max_rpm=0),
+            max_retries=0,
+            **kwargs
+        )
+        self._responses = list(responses)
+        self._latency = latency
+
+    @property
+    def calls(self) -> int:
+        """Number of responses returned so far."""
+        return self._calls
+
+    def supports_function_calling(self) -> bool:
+        """Recorded responses are ReAct text, never native tool calls."""
+        return False
+
+    def supports_stop_words(self) -> bool:
+        """Recorded ReAct responses end before the observation, like a stopped completion."""
+        return True
+
+    def get_context_window_size(self) -> int:
+        """crewai's default context window, replayed agents never summarize their history."""
+        return DEFAULT_CONTEXT_WINDOW_SIZE
+
+    def supports_multimodal(self) -> bool:
+        """Replayed agents get text only."""
+        return False
+
+    def _provider_call(self, messages, tools=None, **kwargs) -> Any:
+        """Return the next recorded response after the artificial latency."""
+        if self._latency:
+            time.sleep(self._latency)
+        with self._cursor_lock:
+            index = self._calls
+            self._calls += 1
+        if index < len(self._responses):
+            return self._responses[index]
+        logger.debug(f"Transcript of {self.namespace} exhausted, finishing the task")
+        return final_answer_response("Task complete")
+
+
+def replay_llm_factory(transcript: Dict[str, List[str]], latency: float = 0.0):
+    """
+    Return an LLM factory for llm.set_llm_factory that replays a transcript.
+
+    Args:
+        transcript: Mapping of agent name to its responses
+        latency: Artificial seconds of latency per call
+    """
+    def factory(model: str, namespace: str, temperature: Optional[float] = None) -> ReplayLLM:
+        return ReplayLLM(model=model, namespace=namespace, responses=transcript.get(namespace, []),
+                         latency=latency, temperature=temperature)
+    return factory
@@ -0,0 +1,326 @@
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import logging
+import sqlite3
+import argparse
+import statistics
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statements collected before they are written in one transaction
+BATCH_SIZE = 200
+# Seconds the writer waits for more statements before committing a partial batch
+FLUSH_INTERVAL = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY, project_name TEXT, output_dir TEXT, technology_stack TEXT,
+    project_info TEXT, started_at REAL, finished_at REAL, duration REAL, status TEXT,
+    file_count INTEGER, total_bytes INTEGER, prompt_tokens INTEGER, completion_tokens INTEGER,
+    cost_usd REAL, error TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id TEXT NOT NULL, task_id TEXT NOT NULL, agent TEXT, started_at REAL, duration REAL,
+    queue_seconds REAL, llm_calls INTEGER, prompt_tokens INTEGER, completion_tokens INTEGER,
+    cost_usd REAL, tool_calls INTEGER, bytes_written INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    run_id TEXT NOT NULL, path TEXT NOT NULL, digest TEXT, size INTEGER, agent TEXT, task TEXT,
+    written_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_project ON runs(project_name, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_task ON tasks(task_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_agent ON tasks(agent, started_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks(run_id);
+CREATE INDEX IF NOT EXISTS idx_files_run ON files(run_id);
+CREATE INDEX IF NOT EXISTS idx_files_agent ON files(agent, written_at);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Open the store database in WAL mode, so readers never wait for the writer."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class RunStore:
+    """History of runs, tasks and written files in an embedded SQLite database.
+
+    All record_* calls only put a statement on a queue and return at once;
+    a writer thread commits the statements in batches, so agent threads
+    never wait for disk I/O. Queries read through their own connection.
+    """
+
+    def __init__(self, path: str = ".crew_cache/runs.sqlite"):
+        """
+        Initialize the store.
+
+        Args:
+            path: SQLite database file
+        """
+        # Resolve now so that a later os.chdir() into a project doesn't move the store
+        self.path = os.path.abspath(path)
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._read_conn = None
+        self._read_lock = threading.Lock()
+
+    def _enqueue(self, sql: str, params: tuple) -> None:
+        """Queue a statement for the writer thread, starting it on first use."""
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="run-store-writer", daemon=True)
+                    self._writer.start()
+        self._queue.put((sql, params))
+
+    def _write_loop(self) -> None:
+        """Commit queued statements in batches until close() is called."""
+        conn = _connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.time() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            events = []
+            try:
+                with conn:
+                    for item in batch:
+                        if item is None:
+                            running = False
+                        elif isinstance(item, threading.Event):
+                            events.append(item)
+                        else:
+                            conn.execute(*item)
+            except sqlite3.Error as e:
+                logger.error(f"Could not write {len(batch)} run store records: {e}")
+            for event in events:
+                event.set()
+        conn.close()
+
+    def flush(self, timeout: float = 30) -> None:
+        """Wait until all statements queued so far are committed."""
+        if self._writer is None:
+            return
+        event = threading.Event()
+        self._queue.put(event)
+        event.wait(timeout)
+
+    def close(self) -> None:
+        """Commit the queued statements, stop the writer thread and close the read connection."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        with self._read_lock:
+            if self._read_conn is not None:
+                self._read_conn.close()
+                self._read_conn = None
+
+    def start_run(self, project_info: Dict[str, Any], output_dir: str, run_id: Optional[str] = None) -> str:
+        """
+        Record the start of a run.
+
+        Args:
+            project_info: The project's project_info dictionary
+            output_dir: Directory the project is generated in
+            run_id: ID of the run, generated if omitted
+
+        Returns:
+            ID of the new run
+        """
+        run_id = run_id or uuid.uuid4().hex
+        self._enqueue(
+            "INSERT INTO runs (run_id, project_name, output_dir, technology_stack, project_info, started_at, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'running')",
+            (run_id, project_info.get("project_name"), os.path.abspath(output_dir),
+             project_info.get("technology_stack", ""), json.dumps(project_info), time.time())
+        )
+        return run_id
+
+    def record_file(self, run_id: str, record) -> None:
+        """Record a written file from its file_writer.FileRecord."""
+        self._enqueue(
+            "INSERT INTO files (run_id, path, digest, size, agent, task, written_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (run_id, record.path, record.digest, record.size, record.agent, record.task, record.mtime)
+        )
+
+    def record_tasks(self, run_id: str, spans: List[Dict[str, Any]], metrics: List[Dict[str, Any]]) -> None:
+        """
+        Record the tasks of a run from the tracer.
+
+        Args:
+            run_id: ID of the run
+            spans: Spans from Tracer.spans()
+            metrics: Per-task rows from Tracer.summary()
+        """
+        rows = {row["task"]: row for row in metrics}
+        for span in spans:
+            if span["cat"] != "task":
+                continue
+            row = rows.get(span["name"], {})
+            self._enqueue(
+                "INSERT INTO tasks (run_id, task_id, agent, started_at, duration, queue_seconds, llm_calls, "
+                "prompt_tokens, completion_tokens, cost_usd, tool_calls, bytes_written) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, span["name"], span["args"].get("agent"), span["start"], span["duration"],
+                 span["args"].get("queue_seconds", 0.0), row.get("llm_calls", 0), row.get("prompt_tokens", 0),
+                 row.get("completion_tokens", 0), row.get("cost_usd", 0.0), row.get("tool_calls", 0),
+                 row.get("bytes_written", 0))
+            )
+
+    def finish_run(self, run_id: str, status: str, metrics: Optional[List[Dict[str, Any]]] = None,
+                   file_count: int = 0, total_bytes: int = 0, error: Optional[str] = None) -> None:
+        """
+        Record the end of a run.
+
+        Args:
+            run_id: ID of the run
+            status: "succeeded" or "failed"
+            metrics: Per-task rows from Tracer.summary(), summed into the run totals
+            file_count: Number of files created
+            total_bytes: Bytes of all files created
+            error: Error message of a failed run
+        """
+        metrics = metrics or []
+        self._enqueue(
+            "UPDATE runs SET finished_at = ?, duration = ? - started_at, status = ?, file_count = ?, "
+            "total_bytes = ?, prompt_tokens = ?, completion_tokens = ?, cost_usd = ?, error = ? WHERE run_id = ?",
+            (time.time(), time.time(), status, file_count, total_bytes,
+             sum(row["prompt_tokens"] for row in metrics), sum(row["completion_tokens"] for row in metrics),
+             sum(row["cost_usd"] for row in metrics), error, run_id)
+        )
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._read_lock:
+            if self._read_conn is None:
+                self._read_conn = _connect(self.path)
+                self._read_conn.row_factory = sqlite3.Row
+            return self._read_conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _filters(column: str, since: Optional[float], project: Optional[str]):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(since)
+        if project:
+            clauses.append("runs.project_name = ?")
+            params.append(project)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    def runs(self, since: Optional[float] = None, project: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return the most recent runs, newest first."""
+        where, params = self._filters("runs.started_at", since, project)
+        rows = self._query(f"SELECT * FROM runs{where} ORDER BY started_at DESC LIMIT ?", params + (limit,))
+        return [dict(row) for row in rows]
+
+    def task_stats(self, since: Optional[float] = None, project: Optional[str] = None,
+                   agent: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return duration percentiles, token and cost totals per task ID."""
+        where, params = self._filters("tasks.started_at", since, project)
+        if agent:
+            where += (" AND" if where else " WHERE") + " tasks.agent = ?"
+            params += (agent,)
+        rows = self._query(
+            f"SELECT tasks.task_id, tasks.duration, tasks.cost_usd, tasks.prompt_tokens + tasks.completion_tokens "
+            f"AS tokens FROM tasks JOIN runs ON runs.run_id = tasks.run_id{where}", params
+        )
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row["task_id"], []).append(row)
+        stats = []
+        for task_id, task_rows in sorted(grouped.items()):
+            durations = sorted(row["duration"] for row in task_rows)
+            stats.append({
+                "task": task_id,
+                "runs": len(task_rows),
+                "median_seconds": statistics.median(durations),
+                "p95_seconds": durations[min(len(durations) - 1, int(round(0.95 * (len(durations) - 1))))],
+                "tokens": sum(row["tokens"] or 0 for row in task_rows),
+                "cost_usd": sum(row["cost_usd"] or 0.0 for row in task_rows),
+            })
+        return stats
+
+    def agent_stats(self, since: Optional[float] = None, project: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the number and size of files written per agent."""
+        where, params = self._filters("files.written_at", since, project)
+        rows = self._query(
+            f"SELECT files.agent AS agent, COUNT(*) AS files, SUM(files.size) AS bytes, "
+            f"COUNT(DISTINCT files.run_id) AS runs FROM files JOIN runs ON runs.run_id = files.run_id{where} "
+            f"GROUP BY files.agent ORDER BY files DESC", params
+        )
+        return [dict(row) for row in rows]
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """Parse a relative age like "7d", "12h" or "30m", or an ISO date, into a timestamp."""
+    if not value:
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([dhm])", value.strip())
+    if match:
+        seconds = float(match.group(1)) * {"d": 86400, "h": 3600, "m": 60}[match.group(2)]
+        return time.time() - seconds
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else "-"
+
+
+def main(argv=None):
+    from config import get_config
+
+    parser = argparse.ArgumentParser(description="Summarize the run history of the development crew.")
+    parser.add_argument("--db", help="run store database (default: RUN_STORE_PATH)")
+    parser.add_argument("--since", help="only include runs since an age like 7d, 12h or an ISO date")
+    parser.add_argument("--project", help="only include runs of this project name")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    runs_parser = subparsers.add_parser("runs", help="list recent runs")
+    runs_parser.add_argument("--limit", type=int, default=20, help="number of runs listed")
+    tasks_parser = subparsers.add_parser("tasks", help="duration percentiles and cost per task")
+    tasks_parser.add_argument("--agent", help="only include tasks of this agent role")
+    subparsers.add_parser("agents", help="files written per agent")
+    args = parser.parse_args(argv)
+
+    store = RunStore(args.db or get_config().run_store_path)
+    since = parse_since(args.since)
+    if args.command == "runs":
+        print(f"{'started':<17} {'status':<10} {'duration s':>10} {'files':>6} {'cost $':>8}  project")
+        for run in store.runs(since, args.project, args.limit):
+            duration = f"{run['duration']:.1f}" if run["duration"] is not None else "-"
+            print(f"{_format_time(run['started_at']):<17} {run['status']:<10} {duration:>10} "
+                  f"{run['file_count'] or 0:>6} {run['cost_usd'] or 0.0:>8.3f}  {run['project_name']}")
+    elif args.command == "tasks":
+        print(f"{'task':<16} {'runs':>5} {'median s':>9} {'p95 s':>8} {'tokens':>9} {'cost $':>8}")
+        for row in store.task_stats(since, args.project, args.agent):
+            print(f"{row['task']:<16} {row['runs']:>5} {row['median_seconds']:>9.1f} {row['p95_seconds']:>8.1f} "
+                  f"{row['tokens']:>9} {row['cost_usd']:>8.3f}")
+    else:
+        print(f"{'agent':<36} {'runs':>5} {'files':>6} {'bytes':>10}")
+        for row in store.agent_stats(since, args.project):
+            print(f"{row['agent'] or '-':<36} {row['runs']:>5} {row['files']:>6} {row['bytes'] or 0:>10}")
+
+
+if __name__ == "__main__":
+    main()
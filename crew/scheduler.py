@@ -0,0 +1,280 @@
+import time
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from file_writer import set_current_agent
+from tracing import tracer, current_task, current_cancel, RunCancelled
+from delegation import DelegationLimits, DelegationBudgetExceeded, guard_delegation_tools, start_budget
+
+logger = logging.getLogger(__name__)
+
+# Divider crewai uses when aggregating the outputs of several context tasks
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+
+class TaskScheduler:
+    """Runs TaskFactory tasks as a dependency graph on a pool of worker threads.
+
+    A task is started as soon as all of the tasks it depends on have completed,
+    so independent tasks (e.g. testing and README) run concurrently instead of
+    waiting on each other as they would in a sequential crew.
+    """
+
+    def __init__(self, tasks: Dict[str, Any], dependencies: Dict[str, List[str]],
+                 max_workers: int = 2, agents: Optional[List[Any]] = None,
+                 context_builder: Optional[Callable[..., str]] = None,
+                 completed: Optional[Dict[str, Any]] = None,
+                 listener: Optional[Callable[[str, str], None]] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 delegation_limits: Optional[DelegationLimits] = None,
+                 checkpoint: Optional[Callable[[str, Any], None]] = None,
+                 expander: Optional[Callable[[str, Any], Optional[Tuple[Dict[str, Any], Dict[str, List[str]]]]]] = None,
+                 expansion_workers: int = 0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            tasks: Mapping of task ID to crewai Task, in declaration order
+            dependencies: Mapping of task ID to the task IDs it depends on
+            max_workers: Maximum number of tasks executed at the same time
+            agents: All agents of the crew, used to offer delegation tools to
+                agents that allow delegation
+            context_builder: Callable(task_id, ancestors, dependencies, results)
+                returning the context of a task; defaults to the raw outputs of
+                its dependencies
+            completed: Outputs of tasks that are already done and must not run again
+            listener: Callable(event, task_id) notified when a task is "started",
+                "finished" or "failed", e.g. for progress reporting
+            cancel_event: Event that stops the run when set; running tasks stop at
+                their next LLM call
+            delegation_limits: Delegation depth, hop and cycle limits applied to
+                each task separately; delegations are only counted if omitted
+            checkpoint: Callable(task_id, output) persisting the output of every
+                finished task, called in the scheduling thread
+            expander: Callable(task_id, output) called when a task has completed, also
+                for tasks completed before the run; may return (tasks, dependencies) to
+                add to the graph, replacing tasks that have not started yet
+            expansion_workers: Maximum number of tasks added by the expander executed at the
+                same time, on workers of their own; 0 to share the max_workers workers
+        """
+        self.tasks = OrderedDict(tasks)
+        self.dependencies = {task_id: list(dependencies.get(task_id, [])) for task_id in self.tasks}
+        self.max_workers = max(1, max_workers)
+        self.agents = agents or []
+        self.context_builder = context_builder
+        self.completed = dict(completed or {})
+        self.listener = listener
+        self.cancel_event = cancel_event
+        self.delegation_limits = delegation_limits
+        self.checkpoint = checkpoint
+        self.expander = expander
+        self.expansion_workers = max(0, expansion_workers)
+        self._expanded = set()
+        self.delegation_stats = {}
+        self.outputs = OrderedDict()
+        self._agent_locks = {}
+        self._validate()
+
+    def _validate(self) -> None:
+        """Check that all dependencies exist and that the graph has no cycles."""
+        for task_id, deps in self.dependencies.items():
+            for dep in deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{task_id}' depends on unknown task '{dep}'")
+        self.execution_order()
+
+    def execution_order(self) -> List[str]:
+        """Return the task IDs in a stable topological order."""
+        order = []
+        done = set()
+        remaining = list(self.tasks)
+        while remaining:
+            ready = [task_id for task_id in remaining if all(dep in done for dep in self.dependencies[task_id])]
+            if not ready:
+                raise ValueError(f"Dependency cycle detected between tasks: {', '.join(remaining)}")
+            for task_id in ready:
+                order.append(task_id)
+                done.add(task_id)
+                remaining.remove(task_id)
+        return order
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Execute all tasks, running ready tasks in parallel.
+
+        Returns:
+            Mapping of task ID to task output, in dependency order
+        """
+        results = {task_id: output for task_id, output in self.completed.items() if task_id in self.tasks}
+        pending = {}
+        waiting = [task_id for task_id in self.tasks if task_id not in results]
+        if results:
+            logger.info(f"Skipping completed tasks: {', '.join(results)}")
+        for task_id in list(results):
+            self._expand(task_id, results, waiting, pending)
+
+        ready_since = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers + self.expansion_workers,
+                                thread_name_prefix="crew-task") as executor:
+            while waiting or pending:
+                self._check_cancelled(pending)
+                for task_id in [t for t in waiting if all(dep in results for dep in self.dependencies[t])]:
+                    ready_since.setdefault(task_id, time.time())
+                    if not self._has_capacity(task_id, pending):
+                        continue
+                    waiting.remove(task_id)
+                    context = self._build_context(task_id, results)
+                    logger.info(f"Scheduling task: {task_id}")
+                    # Copy the caller's context so context variables reach the worker thread
+                    run_in_context = contextvars.copy_context().run
+                    future = executor.submit(run_in_context, self._execute, task_id, context,
+                                             ready_since.pop(task_id))
+                    pending[future] = task_id
+
+                if not pending:
+                    raise RuntimeError(f"Tasks can never become ready: {', '.join(waiting)}")
+
+                # Wake up regularly so a cancellation is noticed while tasks are running
+                finished, _ = wait(pending, timeout=0.5 if self.cancel_event else None,
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task_id = pending.pop(future)
+                    try:
+                        results[task_id] = future.result()
+                    except Exception:
+                        self._notify("failed", task_id)
+                        self._check_cancelled(pending)
+                        logger.error(f"Task {task_id} failed, cancelling remaining tasks")
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    if self.checkpoint is not None:
+                        self.checkpoint(task_id, results[task_id])
+                    self._notify("finished", task_id)
+                    logger.info(f"Task completed: {task_id}")
+                    self._expand(task_id, results, waiting, pending)
+
+        self.outputs = OrderedDict((task_id, results[task_id]) for task_id in self.execution_order())
+        return self.outputs
+
+    def _in_expansion_lane(self, task_id: str) -> bool:
+        """Check whether a task runs on the workers reserved for tasks added by the expander."""
+        return self.expansion_workers > 0 and task_id in self._expanded
+
+    def _has_capacity(self, task_id: str, pending: Dict[Any, str]) -> bool:
+        """Check whether a ready task can start without exceeding the worker limit of its lane."""
+        lane = self._in_expansion_lane(task_id)
+        running = sum(1 for other in pending.values() if self._in_expansion_lane(other) == lane)
+        return running < (self.expansion_workers if lane else self.max_workers)
+
+    def _expand(self, task_id: str, results: Dict[str, Any], waiting: List[str], pending: Dict[Any, str]) -> None:
+        """Add the tasks the expander returns for a completed task to the graph."""
+        if self.expander is None:
+            return
+        expansion = self.expander(task_id, results[task_id])
+        if not expansion:
+            return
+        tasks, dependencies = expansion
+        started = set(results) | set(pending.values())
+        replaced = [other for other in tasks if other in self.tasks]
+        if any(other in started for other in replaced):
+            logger.info(f"Not expanding the graph after {task_id}, {', '.join(replaced)} already ran")
+            return
+        restored = []
+        for new_id, task in tasks.items():
+            self.tasks[new_id] = task
+            self._expanded.add(new_id)
+            self.dependencies[new_id] = list(dependencies.get(new_id, []))
+            if new_id in self.completed and new_id not in results:
+                # Added tasks restored from a checkpoint keep their outputs
+                results[new_id] = self.completed[new_id]
+                restored.append(new_id)
+            elif new_id not in results and new_id not in waiting:
+                waiting.append(new_id)
+        self._validate()
+        logger.info(f"Expanded the graph after {task_id}: {', '.join(tasks)}")
+        for new_id in restored:
+            self._expand(new_id, results, waiting, pending)
+
+    def _check_cancelled(self, pending: Dict[Any, str]) -> None:
+        """Stop the run if its cancellation was requested, once the running tasks have stopped."""
+        if self.cancel_event is None or not self.cancel_event.is_set():
+            return
+        logger.info("Run cancelled, waiting for running tasks to stop")
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        raise RunCancelled("Run was cancelled")
+
+    def _notify(self, event: str, task_id: str) -> None:
+        """Pass a task event to the listener."""
+        if self.listener is not None:
+            try:
+                self.listener(event, task_id)
+            except Exception as e:
+                logger.error(f"Task listener failed for {event} {task_id}: {e}")
+
+    def ancestors(self, task_id: str) -> List[str]:
+        """Return all tasks a task depends on directly or indirectly, in execution order."""
+        found = set()
+        stack = list(self.dependencies[task_id])
+        while stack:
+            dep = stack.pop()
+            if dep not in found:
+                found.add(dep)
+                stack.extend(self.dependencies[dep])
+        return [other for other in self.execution_order() if other in found]
+
+    def _build_context(self, task_id: str, results: Dict[str, Any]) -> str:
+        """Build the context of a task from the results of its upstream tasks."""
+        if self.context_builder is not None:
+            return self.context_builder(task_id, self.ancestors(task_id), self.dependencies[task_id], results)
+        return CONTEXT_DIVIDER.join(str(results[dep]) for dep in self.dependencies[task_id])
+
+    def _agent_lock(self, agent: Any) -> threading.Lock:
+        """Return the lock serializing tasks that share the same agent instance."""
+        return self._agent_locks.setdefault(id(agent), threading.Lock())
+
+    def _delegation_tools(self, agent: Any) -> List[Any]:
+        """Return the budgeted crewai delegation tools for an agent that allows delegation."""
+        if not getattr(agent, "allow_delegation", False) or len(self.agents) < 2:
+            return []
+        if self.delegation_limits is not None and self.delegation_limits.max_hops <= 0:
+            return []
+        from crewai.tools.agent_tools.agent_tools import AgentTools
+        coworkers = [other for other in self.agents if other is not agent]
+        return guard_delegation_tools(AgentTools(agents=coworkers).tools(), agent.role,
+                                      [other.role for other in coworkers], tools_for=self._agent_tools)
+
+    def _agent_tools(self, agent: Any) -> List[Any]:
+        """Return the tools an agent works with, for its own tasks and when a coworker delegates to it."""
+        return list(agent.tools or []) + self._delegation_tools(agent)
+
+    def _execute(self, task_id: str, context: str, ready_at: float) -> Any:
+        """Execute a single task with the given upstream context."""
+        task = self.tasks[task_id]
+        agent = task.agent
+        tools = self._agent_tools(agent)
+        # The same agent instance keeps per-execution state, so never run it twice at once
+        with self._agent_lock(agent):
+            logger.info(f"Running task {task_id} with agent {agent.role}")
+            set_current_agent(agent.role)
+            current_task.set(task_id)
+            if self.cancel_event is not None:
+                current_cancel.set(self.cancel_event)
+            budget = start_budget(task_id, self.delegation_limits)
+            self._notify("started", task_id)
+            try:
+                with tracer.span(task_id, "task", agent=agent.role, queue_seconds=time.time() - ready_at):
+                    return task.execute_sync(agent=agent, context=context, tools=tools)
+            except Exception as e:
+                # crewai may wrap or retry the error raised at the next LLM call, report the budget instead
+                if budget.exceeded is not None and not isinstance(e, (DelegationBudgetExceeded, RunCancelled)):
+                    raise DelegationBudgetExceeded(budget.exceeded) from e
+                raise
+            finally:
+                self.delegation_stats[task_id] = budget.stats()
@@ -0,0 +1,520 @@
+import os
+import re
+import hmac
+import json
+import time
+import uuid
+import asyncio
+import logging
+import secrets
+import argparse
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 1024 * 1024
+# Seconds an idle keep-alive connection stays open
+IDLE_TIMEOUT = 30
+# Progress events kept per job, older ones are dropped
+MAX_EVENTS = 500
+# Finished jobs kept for status queries, the oldest are forgotten first
+MAX_FINISHED_JOBS = 1000
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+# Tenant of tokens configured without a name
+DEFAULT_TENANT = "default"
+
+
+def parse_tokens(spec: str) -> Dict[str, str]:
+    """
+    Parse API tokens configured as "tenant:token" entries separated by commas.
+
+    An entry without a tenant name belongs to the "default" tenant.
+
+    Args:
+        spec: Token configuration, e.g. SERVER_TOKENS
+
+    Returns:
+        Mapping of token to tenant name
+
+    Raises:
+        ValueError: If a tenant name is not made of letters, digits, "-" and "_"
+    """
+    tokens = {}
+    for entry in filter(None, (entry.strip() for entry in spec.split(","))):
+        tenant, _, token = entry.rpartition(":")
+        tenant = tenant.strip() or DEFAULT_TENANT
+        if not re.fullmatch(r"[\w-]+", tenant):
+            raise ValueError(f"Invalid tenant name {tenant!r} in server tokens")
+        tokens[token.strip()] = tenant
+    return tokens
+
+
+@dataclass
+class Job:
+    """A queued or running project generation and its progress."""
+    id: str
+    project_info: Dict[str, Any]
+    output_dir: str
+    tenant: str = DEFAULT_TENANT
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    run_id: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    tasks: Dict[str, str] = field(default_factory=dict)
+    files_written: int = 0
+    bytes_written: int = 0
+    event_count: int = 0
+    events: deque = field(default_factory=lambda: deque(maxlen=MAX_EVENTS))
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self, detail: bool = False) -> Dict[str, Any]:
+        """Return the job as a JSON-serializable dictionary, with its summary if detail is set."""
+        result = {
+            "id": self.id,
+            "project_name": self.project_info["project_name"],
+            "status": self.status,
+            "output_dir": self.output_dir,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "run_id": self.run_id,
+            "tasks": dict(self.tasks),
+            "files_written": self.files_written,
+            "bytes_written": self.bytes_written,
+            "error": self.error
+        }
+        if detail:
+            result["project_info"] = self.project_info
+            result["summary"] = self.summary
+        return result
+
+
+class JobManager:
+    """Queues generation jobs and runs them on a bounded pool of worker threads.
+
+    Every job runs in a fresh context with its own output directory, file
+    registry and agents, so jobs never see each other's files. Jobs belong to
+    the tenant that submitted them: their output directories are grouped per
+    tenant and lookups with a tenant only find that tenant's jobs. The LLM
+    response cache, rate limiter and validator are shared by all jobs of the
+    process.
+    """
+
+    def __init__(self, output_root: str, workers: int = 2, max_queue: int = 100):
+        """
+        Initialize the manager.
+
+        Args:
+            output_root: Directory the job output directories are created in
+            workers: Number of jobs generated concurrently
+            max_queue: Number of jobs that may wait for a worker before submissions are refused
+        """
+        self.output_root = os.path.abspath(output_root)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._executor = None
+        self._worker_tasks = []
+
+    async def start(self) -> None:
+        """Start the worker coroutines. Must be called from the server's event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the queued and running jobs and wait for the running ones to stop."""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            if job.status not in FINISHED_STATES:
+                self.cancel(job.id)
+        for task in self._worker_tasks:
+            task.cancel()
+        if self._executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    def submit(self, project_info: Dict[str, Any], tenant: str = DEFAULT_TENANT) -> Job:
+        """
+        Queue a project for generation.
+
+        Args:
+            project_info: project_info dictionary with the defaults applied
+            tenant: Tenant submitting the job
+
+        Returns:
+            The queued job
+
+        Raises:
+            asyncio.QueueFull: If too many jobs are waiting
+        """
+        from main import project_dir_name
+
+        job_id = uuid.uuid4().hex
+        output_dir = os.path.join(self.output_root, tenant,
+                                  f"{project_dir_name(project_info['project_name'])}_{job_id[:8]}")
+        job = Job(id=job_id, project_info=project_info, output_dir=output_dir, tenant=tenant)
+        self._queue.put_nowait(job)
+        with self._lock:
+            self.jobs[job_id] = job
+        logger.info(f"Queued job {job_id} of {tenant} for {project_info['project_name']}")
+        return job
+
+    def get(self, job_id: str, tenant: Optional[str] = None) -> Optional[Job]:
+        """Return a job by ID, None if it is unknown or, if tenant is given, belongs to another tenant."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        return job if job is not None and tenant in (None, job.tenant) else None
+
+    def list(self, status: Optional[str] = None, tenant: Optional[str] = None) -> List[Job]:
+        """Return the jobs, optionally only those with a status or of a tenant, oldest first."""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [job for job in jobs
+                if (status is None or job.status == status) and (tenant is None or job.tenant == tenant)]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job.
+
+        A queued job is never started. A running job stops once its running
+        tasks reach their next LLM call.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            The job, None if it is unknown
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            elif job.status == "running":
+                job.status = "cancelling"
+        job.cancel_event.set()
+        self._record_event(job, {"event": "cancel_requested"})
+        return job
+
+    def progress(self, job: Job, since: int = 0) -> Dict[str, Any]:
+        """Return the state of a job and its progress events numbered above since."""
+        with self._lock:
+            events = [event for event in job.events if event["seq"] > since]
+            return {**job.to_dict(), "event_count": job.event_count, "events": events}
+
+    def stats(self, tenant: Optional[str] = None) -> Dict[str, int]:
+        """Count the jobs per status, optionally only those of a tenant."""
+        counts = {}
+        for job in self.list(tenant=tenant):
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _record_event(self, job: Job, event: Dict[str, Any]) -> None:
+        """Add a progress event to a job, called from the job's threads."""
+        with self._lock:
+            job.event_count += 1
+            job.events.append({"seq": job.event_count, "time": time.time(), **event})
+            name = event["event"]
+            if name.startswith("task_"):
+                job.tasks[event["task"]] = name[len("task_"):]
+            elif name == "file_written":
+                job.files_written += 1
+                job.bytes_written += event["size"]
+
+    async def _worker(self) -> None:
+        """Take jobs from the queue and generate them one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "cancelled":
+                    continue
+                # A fresh context keeps the run, workspace and agent of the job away from other jobs
+                await loop.run_in_executor(self._executor, contextvars.Context().run, self._run, job)
+                self._forget_finished()
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job) -> None:
+        """Generate the project of a job, in a worker thread."""
+        from main import generate_project
+        from tracing import tracer, current_run, RunCancelled
+
+        with self._lock:
+            job.status = "running" if not job.cancel_event.is_set() else "cancelling"
+            job.started_at = time.time()
+        logger.info(f"Starting job {job.id}")
+        status, summary, error = "failed", None, None
+        try:
+            summary = generate_project(job.project_info, job.output_dir,
+                                       on_progress=lambda event: self._record_event(job, event),
+                                       cancel_event=job.cancel_event)
+            status = "succeeded"
+        except RunCancelled:
+            status = "cancelled"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}", exc_info=True)
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            run_id = current_run.get()
+            if run_id is not None:
+                # The summary holds the job's metrics, its spans are no longer needed
+                tracer.reset(run_id)
+        with self._lock:
+            job.status = status
+            job.summary = summary
+            job.error = error
+            job.run_id = run_id
+            job.finished_at = time.time()
+        logger.info(f"Job {job.id} {status}")
+
+    def _forget_finished(self) -> None:
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS."""
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job_id]
+
+
+class JobServer:
+    """Minimal HTTP/1.1 JSON API in front of a JobManager.
+
+    Every request must carry one of the configured tokens as
+    "Authorization: Bearer <token>". The token's tenant only sees and
+    cancels its own jobs. The API has no TLS, so it should only be exposed
+    beyond localhost behind a TLS-terminating proxy.
+
+    Endpoints:
+        GET  /health                   Server and queue state
+        POST /jobs                     Queue a project_info object, returns the job
+        GET  /jobs?status=...          List jobs
+        GET  /jobs/{id}                Job state with its summary once finished
+        GET  /jobs/{id}/progress?since=N  Job state and progress events after event N
+        POST /jobs/{id}/cancel         Cancel a job (also DELETE /jobs/{id})
+    """
+
+    def __init__(self, manager: JobManager, tokens: Dict[str, str], host: str = "127.0.0.1", port: int = 8000):
+        """
+        Initialize the server.
+
+        Args:
+            manager: Job manager running the submitted jobs
+            tokens: Mapping of accepted API token to its tenant, see parse_tokens()
+            host: Interface to listen on
+            port: Port to listen on, 0 for any free port
+        """
+        if not tokens:
+            raise ValueError("The job server needs at least one API token")
+        self.manager = manager
+        self.tokens = dict(tokens)
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self) -> None:
+        """Start the job workers and listen for connections."""
+        await self.manager.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Job server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self) -> None:
+        """Start the server and serve until cancelled, then cancel the remaining jobs."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            self._server.close()
+            await self.manager.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one connection, keeping it open between requests."""
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {"error": f"body larger than {MAX_BODY_BYTES} bytes"}, keep_alive=False)
+                    break
+                body = await asyncio.wait_for(reader.readexactly(length), IDLE_TIMEOUT) if length else b""
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                tenant = self._authenticate(headers.get("authorization", ""))
+                if tenant is None:
+                    await self._respond(writer, HTTPStatus.UNAUTHORIZED, {"error": "missing or invalid API token"},
+                                        keep_alive, extra_headers={"WWW-Authenticate": "Bearer"})
+                    if not keep_alive:
+                        break
+                    continue
+                status, payload = self._route(method.upper(), target, body, tenant)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # Malformed request line, header or content length
+            await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"}, keep_alive=False)
+        finally:
+            writer.close()
+
+    def _authenticate(self, authorization: str) -> Optional[str]:
+        """Return the tenant of the bearer token in an Authorization header, None if it is not accepted."""
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token.strip():
+            return None
+        tenant = None
+        # Compare with every token in constant time, so timing reveals nothing about them
+        for known, known_tenant in self.tokens.items():
+            if hmac.compare_digest(known.encode("utf-8"), token.strip().encode("utf-8")):
+                tenant = known_tenant
+        return tenant
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any,
+                       keep_alive: bool, extra_headers: Optional[Dict[str, str]] = None) -> None:
+        """Write a JSON response."""
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            + "".join(f"{name}: {value}\r\n" for name, value in (extra_headers or {}).items()) +
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    def _route(self, method: str, target: str, body: bytes, tenant: str) -> Tuple[HTTPStatus, Any]:
+        """Dispatch a request of a tenant and return the response status and payload."""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            from config import get_config
+            http_clients = get_config().get_http_clients()
+            return HTTPStatus.OK, {
+                "status": "ok",
+                "workers": self.manager.workers,
+                "jobs": self.manager.stats(tenant),
+                "http_pool": http_clients.metrics() if http_clients is not None else None
+            }
+
+        if parts == ["jobs"]:
+            if method == "POST":
+                return self._submit(body, tenant)
+            if method == "GET":
+                status = query.get("status", [None])[0]
+                return HTTPStatus.OK, {"jobs": [job.to_dict() for job in self.manager.list(status, tenant)]}
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on /jobs"}
+
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            # Jobs of other tenants are reported as unknown
+            job = self.manager.get(parts[1], tenant)
+            if job is None:
+                return HTTPStatus.NOT_FOUND, {"error": f"unknown job {parts[1]}"}
+            action = parts[2] if len(parts) == 3 else None
+            if action is None and method == "GET":
+                return HTTPStatus.OK, job.to_dict(detail=True)
+            if action == "progress" and method == "GET":
+                try:
+                    since = int(query.get("since", ["0"])[0])
+                except ValueError:
+                    return HTTPStatus.BAD_REQUEST, {"error": "since must be an integer"}
+                return HTTPStatus.OK, self.manager.progress(job, since)
+            if (action is None and method == "DELETE") or (action == "cancel" and method == "POST"):
+                if job.status in FINISHED_STATES:
+                    return HTTPStatus.CONFLICT, {"error": f"job is already {job.status}"}
+                return HTTPStatus.ACCEPTED, self.manager.cancel(job.id).to_dict()
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on {url.path}"}
+
+        return HTTPStatus.NOT_FOUND, {"error": f"no route for {url.path}"}
+
+    def _submit(self, body: bytes, tenant: str) -> Tuple[HTTPStatus, Any]:
+        """Validate and queue a posted project_info object for a tenant."""
+        from batch import apply_spec_defaults
+
+        try:
+            project_info = apply_spec_defaults(json.loads(body or b"null"))
+        except json.JSONDecodeError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {e}"}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        try:
+            job = self.manager.submit(project_info, tenant)
+        except asyncio.QueueFull:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "too many queued jobs, retry later"}
+        return HTTPStatus.ACCEPTED, job.to_dict()
+
+
+def main(argv=None):
+    from config import config
+    from log_pipeline import set_quiet
+    from validation import get_validator
+
+    parser = argparse.ArgumentParser(description="Serve project generation jobs over HTTP.")
+    parser.add_argument("--host", default=config.server_host, help="interface to listen on")
+    parser.add_argument("--port", type=int, default=config.server_port, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=config.server_workers,
+                        help="number of projects generated concurrently")
+    parser.add_argument("--output-root", default=config.output_base_dir,
+                        help="directory the job output directories are created in")
+    args = parser.parse_args(argv)
+
+    tokens = parse_tokens(config.server_tokens)
+    if not tokens:
+        # Never serve without authentication, generate a token for this process instead
+        token = secrets.token_urlsafe(32)
+        tokens = {token: DEFAULT_TENANT}
+        print(f"🔑 No SERVER_TOKENS configured, use this API token: {token}")
+    if args.host not in ("127.0.0.1", "localhost", "::1"):
+        print(f"⚠️ Listening on {args.host} without TLS, put the server behind a TLS-terminating proxy")
+
+    config.configure_logging()
+    # Progress is reported through the API, per-write console echoes would interleave across jobs
+    set_quiet(True)
+    validator = get_validator()
+    if validator is not None:
+        # Start the validation workers once instead of on the first write of a job
+        validator.start()
+
+    manager = JobManager(args.output_root, workers=max(1, args.workers), max_queue=config.server_max_queue)
+    server = JobServer(manager, tokens, args.host, args.port)
+    print(f"🚀 Serving generation jobs on http://{args.host}:{args.port} with {manager.workers} workers")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+
+
+if __name__ == "__main__":
+    main()
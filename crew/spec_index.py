@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import time
+import struct
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields of project_info that describe what is being built
+SPEC_FIELDS = ("project_description", "features", "technology_stack")
+# MinHash signature layout: BANDS * ROWS permutations
+BANDS = 32
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed permutation parameters, so signatures stay comparable across runs
+_seed = hashlib.sha256(b"crew-spec-index").digest()
+_PERMUTATIONS = []
+for _i in range(NUM_PERM):
+    _digest = hashlib.sha256(_seed + _i.to_bytes(4, "big")).digest()
+    _PERMUTATIONS.append((int.from_bytes(_digest[:8], "big") % (_PRIME - 1) + 1,
+                          int.from_bytes(_digest[8:16], "big") % _PRIME))
+
+
+def shingles(project_info: Dict[str, Any]) -> set:
+    """
+    Return the word unigrams and bigrams of a spec's descriptive fields.
+
+    Unigrams keep short specs comparable, bigrams capture word order.
+    """
+    text = " ".join(str(project_info.get(field, "")) for field in SPEC_FIELDS).lower()
+    words = re.findall(r"[a-z0-9]+", text)
+    result = set(words)
+    result.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return result
+
+
+def minhash(tokens: set) -> List[int]:
+    """Compute the MinHash signature of a set of shingles."""
+    if not tokens:
+        return [_MAX_HASH] * NUM_PERM
+    hashes = [int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+              for token in tokens]
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two specs from their signatures."""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERM
+
+
+def _band_hashes(signature: List[int]) -> List[str]:
+    """Hash every band of a signature into an LSH bucket key."""
+    return [
+        hashlib.blake2b(struct.pack(f">{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS]),
+                        digest_size=8).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+class SpecIndex:
+    """Index of past project specs for near-duplicate lookup.
+
+    Specs are stored with MinHash signatures and LSH band buckets in SQLite.
+    A lookup only compares signatures of specs that share a bucket, so it
+    stays sublinear as the archive grows.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the index.
+
+        Args:
+            path: SQLite database file
+        """
+        # Resolve now so that a later os.chdir() into a project doesn't move the index
+        self.path = os.path.abspath(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the index database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS specs ("
+                " id INTEGER PRIMARY KEY, project_dir TEXT NOT NULL UNIQUE,"
+                " project_info TEXT NOT NULL, signature TEXT NOT NULL, created_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " band INTEGER NOT NULL, bucket TEXT NOT NULL, spec_id INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS idx_bands_bucket ON bands(band, bucket);"
+            )
+        return self._conn
+
+    def close(self) -> None:
+        """Close the index database; it is reopened on the next use."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def add(self, project_info: Dict[str, Any], project_dir: str) -> None:
+        """
+        Add a finished project to the index, replacing an earlier entry for the same directory.
+
+        Args:
+            project_info: The project's project_info dictionary
+            project_dir: Directory holding the generated project
+        """
+        signature = minhash(shingles(project_info))
+        project_dir = os.path.abspath(project_dir)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT id FROM specs WHERE project_dir = ?", (project_dir,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM bands WHERE spec_id = ?", (row[0],))
+                conn.execute("DELETE FROM specs WHERE id = ?", (row[0],))
+            cursor = conn.execute(
+                "INSERT INTO specs (project_dir, project_info, signature, created_at) VALUES (?, ?, ?, ?)",
+                (project_dir, json.dumps(project_info), json.dumps(signature), time.time())
+            )
+            conn.executemany(
+                "INSERT INTO bands (band, bucket, spec_id) VALUES (?, ?, ?)",
+                [(band, bucket, cursor.lastrowid) for band, bucket in enumerate(_band_hashes(signature))]
+            )
+            conn.commit()
+
+    def find_similar(self, project_info: Dict[str, Any], threshold: float, exclude_dir: Optional[str] = None,
+                     scope: Optional[str] = None) -> List[Tuple[float, str, Dict[str, Any]]]:
+        """
+        Find indexed specs similar to a new spec.
+
+        Args:
+            project_info: The new project's project_info dictionary
+            threshold: Minimum estimated Jaccard similarity
+            exclude_dir: Project directory to leave out, e.g. the new project itself
+            scope: Only consider projects below this directory, e.g. the output root of one tenant
+
+        Returns:
+            (similarity, project_dir, project_info) tuples, most similar first
+        """
+        signature = minhash(shingles(project_info))
+        buckets = list(enumerate(_band_hashes(signature)))
+        exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+        scope = os.path.join(os.path.abspath(scope), "") if scope else None
+        with self._lock:
+            conn = self._connection()
+            candidate_ids = set()
+            for band, bucket in buckets:
+                candidate_ids.update(row[0] for row in conn.execute(
+                    "SELECT spec_id FROM bands WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            rows = [
+                conn.execute("SELECT project_dir, project_info, signature FROM specs WHERE id = ?",
+                             (spec_id,)).fetchone()
+                for spec_id in candidate_ids
+            ]
+        matches = []
+        for row in rows:
+            if row is None or row[0] == exclude_dir or (scope and not row[0].startswith(scope)):
+                continue
+            score = similarity(signature, json.loads(row[2]))
+            if score >= threshold:
+                matches.append((score, row[0], json.loads(row[1])))
+        return sorted(matches, key=lambda match: match[0], reverse=True)
+
+    def find_reusable(self, project_info: Dict[str, Any], threshold: float, filenames: List[str],
+                      exclude_dir: Optional[str] = None, scope: Optional[str] = None) -> Optional[Tuple[float, str]]:
+        """Return the most similar indexed project that still has all of the given files."""
+        for score, project_dir, _ in self.find_similar(project_info, threshold, exclude_dir, scope):
+            if all(os.path.isfile(os.path.join(project_dir, name)) for name in filenames):
+                return score, project_dir
+        return None
+
+
+# Design documents of the architecture task that can be reused across similar specs
+ARCHITECTURE_FILES = ("architecture.md", "ui-design.md")
+
+
+def prepare_prior_architecture(index: SpecIndex, project_info: Dict[str, Any], offer_threshold: float,
+                               reuse_threshold: Optional[float], save_file, root: Optional[str] = None,
+                               storage=None, scope: Optional[str] = None
+                               ) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """
+    Look up a similar earlier project and prepare its architecture documents for reuse.
+
+    Above reuse_threshold the documents are written into the current project
+    as the architecture task's output, so the task can be skipped. Above
+    offer_threshold they are copied to project_config/reference/ as a
+    starting point for the Architect agent. Only projects within scope are
+    considered, so documents never cross between output roots.
+
+    Args:
+        index: Index of earlier projects
+        project_info: The new project's project_info dictionary
+        offer_threshold: Minimum similarity for offering the documents
+        reuse_threshold: Minimum similarity for reusing the documents outright, None to never reuse them
+        save_file: Function writing a file into the project, e.g. file_writer.save_file
+        root: Directory of the new project, defaults to the working directory
+        storage: Storage backend of the new project, the disk below root if omitted
+        scope: Directory of the projects that may be reused, the parent directory of root if omitted
+
+    Returns:
+        The reference for TaskFactory (or None) and the outputs of tasks completed by reuse
+    """
+    from tracing import current_task
+    from storage import DiskStorage
+
+    root = os.path.abspath(root or os.getcwd())
+    storage = storage or DiskStorage(root)
+    match = index.find_reusable(project_info, offer_threshold, list(ARCHITECTURE_FILES), exclude_dir=root,
+                                scope=scope or os.path.dirname(root))
+    if match is None:
+        return None, {}
+    score, project_dir = match
+    documents = {}
+    for name in ARCHITECTURE_FILES:
+        with open(os.path.join(project_dir, name), encoding="utf-8") as f:
+            documents[name] = f.read()
+
+    if reuse_threshold is not None and score >= reuse_threshold:
+        logger.info(f"Reusing architecture of {project_dir} (similarity {score:.2f})")
+        token = current_task.set("architecture")
+        try:
+            for name, content in documents.items():
+                save_file(name, content)
+        finally:
+            current_task.reset(token)
+        return None, {
+            "architecture": f"Reused the architecture documents ({', '.join(documents)}) of a previous "
+                            f"project with similarity {score:.2f}."
+        }
+
+    logger.info(f"Offering architecture of {project_dir} as a starting point (similarity {score:.2f})")
+    files = []
+    for name, content in documents.items():
+        # The agents see paths relative to the project root
+        path = os.path.join("project_config", "reference", name)
+        storage.write(path, content.encode("utf-8"))
+        files.append(path)
+    return {"similarity": score, "files": files}, {}
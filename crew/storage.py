@@ -0,0 +1,467 @@
+import os
+import io
+import sys
+import stat
+import time
+import shutil
+import tarfile
+import contextlib
+import zipfile
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Directory (relative to the project root) where chunked writes are staged until complete
+PARTIAL_DIR = ".crew_partial"
+ARCHIVE_FORMATS = ("zip", "tar.gz")
+# Bytes copied at a time into an archive
+COPY_BLOCK = 1024 * 1024
+
+
+# Read once, os.umask() can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(full_path: str) -> int:
+    """Return the mode of an existing file, or the mode open() would create a new file with."""
+    try:
+        return stat.S_IMODE(os.stat(full_path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write(full_path: str, data: bytes) -> None:
+    """Write data to a temporary file next to the target and rename it into place."""
+    directory = os.path.dirname(full_path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(full_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file owner-only, keep the permissions a plain write would have
+        os.chmod(temp_path, _file_mode(full_path))
+        os.replace(temp_path, full_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class DiskStorage:
+    """Stores project files below a root directory on the local disk."""
+
+    kind = "disk"
+
+    def __init__(self, root: str):
+        """
+        Initialize the storage.
+
+        Args:
+            root: Project root directory
+        """
+        self.root = os.path.abspath(root)
+
+    def path(self, relpath: str) -> str:
+        """
+        Return the absolute path of a project file.
+
+        Raises:
+            ValueError: If the path resolves outside the project root, e.g. "../other/x.py"
+        """
+        if not self.contains(relpath):
+            raise ValueError(f"{relpath} is outside the project")
+        return os.path.join(self.root, relpath)
+
+    def contains(self, relpath: str) -> bool:
+        """Check whether a path stays inside the project root, following symlinks."""
+        full_path = os.path.realpath(os.path.join(self.root, relpath))
+        return full_path.startswith(os.path.realpath(self.root) + os.sep)
+
+    def write(self, relpath: str, data: bytes) -> float:
+        """Write a file atomically, creating directories as needed, and return its modification time."""
+        full_path = self.path(relpath)
+        directory = os.path.dirname(full_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+            logger.info(f"Created directory: {directory}")
+        atomic_write(full_path, data)
+        return os.path.getmtime(full_path)
+
+    def write_from(self, relpath: str, source_path: str) -> float:
+        """Move a finished staging file to a project path and return its modification time."""
+        full_path = self.path(relpath)
+        directory = os.path.dirname(full_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.replace(source_path, full_path)
+        return os.path.getmtime(full_path)
+
+    def exists(self, relpath: str) -> bool:
+        return os.path.isfile(self.path(relpath))
+
+    def is_dir(self, relpath: str) -> bool:
+        return os.path.isdir(self.path(relpath))
+
+    def stat(self, relpath: str) -> Tuple[int, float]:
+        """Return the size and modification time of a file."""
+        result = os.stat(self.path(relpath))
+        return result.st_size, result.st_mtime
+
+    def open(self, relpath: str) -> BinaryIO:
+        """Open a file for binary reading."""
+        return open(self.path(relpath), 'rb')
+
+    def read(self, relpath: str) -> bytes:
+        with self.open(relpath) as f:
+            return f.read()
+
+    def files(self) -> List[str]:
+        """Return the paths of all project files, sorted, without staging files."""
+        paths = []
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d != PARTIAL_DIR)
+            paths.extend(os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+                         for name in filenames)
+        return sorted(paths)
+
+    def staging_dir(self) -> str:
+        """Return the directory chunked writes are staged in."""
+        return os.path.join(self.root, PARTIAL_DIR)
+
+    def close(self) -> None:
+        """Nothing to release, the files stay on disk."""
+
+
+@dataclass
+class _MemoryFile:
+    data: Optional[bytes]
+    spill_path: Optional[str]
+    size: int
+    mtime: float
+
+
+class MemoryStorage:
+    """Keeps project files in memory instead of writing them below the project root.
+
+    Files larger than spill_threshold, and the largest files once the
+    total exceeds memory_limit, are spilled to a private temporary
+    directory, e.g. on a tmpfs. close() releases everything, so a failed
+    run leaves nothing behind; a finished project is delivered with
+    write_archive().
+    """
+
+    kind = "memory"
+
+    def __init__(self, root: str, spill_threshold: int = 1024 * 1024, memory_limit: int = 256 * 1024 * 1024,
+                 spill_dir: Optional[str] = None):
+        """
+        Initialize the storage.
+
+        Args:
+            root: Virtual project root, only used to name the project
+            spill_threshold: Files larger than this many bytes are kept on disk instead of in memory
+            memory_limit: Bytes of file content kept in memory before the largest files are spilled
+            spill_dir: Parent directory of the spill directory, the system temp directory if omitted
+        """
+        self.root = os.path.abspath(root)
+        self.spill_threshold = spill_threshold
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.memory_bytes = 0
+        self.spilled_files = 0
+        self._files: Dict[str, _MemoryFile] = {}
+        self._dirs = set()
+        self._spill_root = None
+        self._lock = threading.Lock()
+
+    def _key(self, relpath: str) -> str:
+        """Normalize a project path, rejecting paths outside the project."""
+        key = os.path.normpath(relpath).replace(os.sep, "/")
+        if os.path.isabs(key) or key == ".." or key.startswith("../") or key == ".":
+            raise ValueError(f"{relpath} is outside the project")
+        return key
+
+    def path(self, relpath: str) -> str:
+        """Return the virtual absolute path of a project file, used in messages only."""
+        return os.path.join(self.root, self._key(relpath))
+
+    def contains(self, relpath: str) -> bool:
+        try:
+            self._key(relpath)
+        except ValueError:
+            return False
+        return True
+
+    def _spill_directory(self) -> str:
+        """Create the spill directory on first use."""
+        if self._spill_root is None:
+            self._spill_root = tempfile.mkdtemp(prefix="crew_spill_", dir=self.spill_dir)
+        return self._spill_root
+
+    def _spill_file(self) -> str:
+        fd, path = tempfile.mkstemp(dir=self._spill_directory(), suffix=".spill")
+        os.close(fd)
+        return path
+
+    def _store(self, key: str, entry: _MemoryFile) -> None:
+        """Replace the entry of a path and keep memory within the limit. Must be called with the lock held."""
+        previous = self._files.get(key)
+        if previous is not None:
+            if previous.data is not None:
+                self.memory_bytes -= previous.size
+            elif previous.spill_path:
+                os.remove(previous.spill_path)
+        self._files[key] = entry
+        if entry.data is not None:
+            self.memory_bytes += entry.size
+        parent = os.path.dirname(key)
+        while parent and parent not in self._dirs:
+            self._dirs.add(parent)
+            parent = os.path.dirname(parent)
+        while self.memory_bytes > self.memory_limit:
+            largest = max((item for item in self._files.values() if item.data is not None),
+                          key=lambda item: item.size)
+            largest.spill_path = self._spill_file()
+            with open(largest.spill_path, 'wb') as f:
+                f.write(largest.data)
+            largest.data = None
+            self.memory_bytes -= largest.size
+            self.spilled_files += 1
+
+    def write(self, relpath: str, data: bytes) -> float:
+        """Store a file and return its modification time."""
+        key = self._key(relpath)
+        entry = _MemoryFile(data=data, spill_path=None, size=len(data), mtime=time.time())
+        with self._lock:
+            if entry.size > self.spill_threshold:
+                entry.spill_path = self._spill_file()
+                with open(entry.spill_path, 'wb') as f:
+                    f.write(data)
+                entry.data = None
+                self.spilled_files += 1
+            self._store(key, entry)
+        return entry.mtime
+
+    def write_from(self, relpath: str, source_path: str) -> float:
+        """Take over a finished staging file and return the modification time of the stored file."""
+        key = self._key(relpath)
+        size = os.path.getsize(source_path)
+        entry = _MemoryFile(data=None, spill_path=None, size=size, mtime=time.time())
+        with self._lock:
+            if size > self.spill_threshold:
+                entry.spill_path = self._spill_file()
+                shutil.move(source_path, entry.spill_path)
+                self.spilled_files += 1
+            else:
+                with open(source_path, 'rb') as f:
+                    entry.data = f.read()
+                os.remove(source_path)
+            self._store(key, entry)
+        return entry.mtime
+
+    def exists(self, relpath: str) -> bool:
+        return self.contains(relpath) and self._key(relpath) in self._files
+
+    def is_dir(self, relpath: str) -> bool:
+        return self.contains(relpath) and self._key(relpath) in self._dirs
+
+    def stat(self, relpath: str) -> Tuple[int, float]:
+        entry = self._entry(relpath)
+        return entry.size, entry.mtime
+
+    def _entry(self, relpath: str) -> _MemoryFile:
+        with self._lock:
+            entry = self._files.get(self._key(relpath))
+        if entry is None:
+            raise FileNotFoundError(relpath)
+        return entry
+
+    def open(self, relpath: str) -> BinaryIO:
+        """Open a file for binary reading."""
+        with self._lock:
+            entry = self._files.get(self._key(relpath))
+            if entry is None:
+                raise FileNotFoundError(relpath)
+            # Open spilled files under the lock, so a concurrent overwrite can't remove them first
+            if entry.data is None:
+                return open(entry.spill_path, 'rb')
+            return io.BytesIO(entry.data)
+
+    def read(self, relpath: str) -> bytes:
+        with self.open(relpath) as f:
+            return f.read()
+
+    def files(self) -> List[str]:
+        with self._lock:
+            return sorted(self._files)
+
+    def staging_dir(self) -> str:
+        """Return the directory chunked writes are staged in, inside the spill directory."""
+        with self._lock:
+            return os.path.join(self._spill_directory(), PARTIAL_DIR)
+
+    def metrics(self) -> Dict[str, int]:
+        """Return the file count, bytes held in memory and number of spilled files."""
+        with self._lock:
+            return {"files": len(self._files), "memory_bytes": self.memory_bytes,
+                    "spilled_files": self.spilled_files}
+
+    def close(self) -> None:
+        """Drop all files and remove the spill directory."""
+        with self._lock:
+            self._files.clear()
+            self._dirs.clear()
+            self.memory_bytes = 0
+            if self._spill_root is not None:
+                shutil.rmtree(self._spill_root, ignore_errors=True)
+                self._spill_root = None
+
+
+def create_storage(kind: str, root: str, spill_threshold: int = 1024 * 1024,
+                   memory_limit: int = 256 * 1024 * 1024, spill_dir: Optional[str] = None):
+    """
+    Create the storage backend of a project.
+
+    Args:
+        kind: "disk" or "memory"
+        root: Project root directory
+        spill_threshold: See MemoryStorage
+        memory_limit: See MemoryStorage
+        spill_dir: See MemoryStorage
+
+    Returns:
+        A DiskStorage or MemoryStorage
+    """
+    if kind == "disk":
+        return DiskStorage(root)
+    if kind == "memory":
+        return MemoryStorage(root, spill_threshold=spill_threshold, memory_limit=memory_limit, spill_dir=spill_dir)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+@contextlib.contextmanager
+def local_copy(storage):
+    """
+    Provide the project as a directory on disk, for tools that need real files.
+
+    A DiskStorage yields its root; the files of a MemoryStorage are copied to
+    a temporary directory that is removed afterwards.
+    """
+    if storage.kind == "disk":
+        yield storage.root
+        return
+    directory = tempfile.mkdtemp(prefix="crew_project_")
+    try:
+        for relpath in storage.files():
+            full_path = os.path.join(directory, relpath)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with storage.open(relpath) as source, open(full_path, 'wb') as target:
+                shutil.copyfileobj(source, target, COPY_BLOCK)
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class _CountingWriter:
+    """Write-only stream that counts the bytes passing through.
+
+    It has no seek(), so zipfile writes a streamable archive with data
+    descriptors even when the target is a regular file.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.count = 0
+
+    def write(self, data: bytes) -> int:
+        self._stream.write(data)
+        self.count += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.count
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def _write_entries(storage, stream: BinaryIO, fmt: str, prefix: str) -> Tuple[int, int]:
+    """Write every file of a storage into an archive stream and return the file count and content bytes."""
+    files, content_bytes = 0, 0
+    if fmt == "zip":
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for relpath in storage.files():
+                size, mtime = storage.stat(relpath)
+                info = zipfile.ZipInfo(f"{prefix}{relpath}", date_time=time.localtime(max(mtime, 315532800))[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                with storage.open(relpath) as source, \
+                        archive.open(info, 'w', force_zip64=size > zipfile.ZIP64_LIMIT) as target:
+                    shutil.copyfileobj(source, target, COPY_BLOCK)
+                files += 1
+                content_bytes += size
+    else:
+        # Stream mode writes the gzip output sequentially without seeking back
+        with tarfile.open(fileobj=stream, mode='w|gz') as archive:
+            for relpath in storage.files():
+                size, mtime = storage.stat(relpath)
+                info = tarfile.TarInfo(f"{prefix}{relpath}")
+                info.size = size
+                info.mtime = mtime
+                info.mode = 0o644
+                with storage.open(relpath) as source:
+                    archive.addfile(info, source)
+                files += 1
+                content_bytes += size
+    return files, content_bytes
+
+
+def write_archive(storage, target: Union[str, BinaryIO], fmt: str = "zip",
+                  prefix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Stream the files of a project into a zip or tar.gz archive.
+
+    Files are copied block by block from the storage into the archive, so
+    nothing is staged on disk and memory stays bounded by the storage's own
+    limits. An archive written to a path only appears once it is complete.
+
+    Args:
+        storage: DiskStorage or MemoryStorage holding the project
+        target: Archive path, "-" for stdout, or a binary stream
+        fmt: "zip" or "tar.gz"
+        prefix: Directory the files are placed in inside the archive, the project
+            root's name if omitted
+
+    Returns:
+        Dictionary with the path, format, file count, content bytes and archive bytes
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format {fmt}, use one of {', '.join(ARCHIVE_FORMATS)}")
+    prefix = f"{os.path.basename(storage.root) if prefix is None else prefix}/".lstrip("/")
+    path = None
+    if isinstance(target, str) and target != "-":
+        path = os.path.abspath(target)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer = _CountingWriter(f)
+                files, content_bytes = _write_entries(storage, writer, fmt, prefix)
+            os.chmod(temp_path, _file_mode(path))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    else:
+        writer = _CountingWriter(sys.stdout.buffer if target == "-" else target)
+        files, content_bytes = _write_entries(storage, writer, fmt, prefix)
+        writer.flush()
+    logger.info(f"Archived {files} files ({content_bytes} bytes) as {fmt} to {path or 'stream'}")
+    return {"path": path, "format": fmt, "files": files, "content_bytes": content_bytes,
+            "archive_bytes": writer.count}
@@ -0,0 +1,440 @@
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+import subprocess
+import contextlib
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from log_pipeline import echo
+
+logger = logging.getLogger(__name__)
+
+# Directories of a generated project that never contain tests or sources under test
+EXCLUDED_DIRS = {"project_config", ".crew_partial", ".git", "__pycache__", ".venv", "venv", "node_modules"}
+# Packages installed into every test environment besides the project's requirements
+RUNNER_PACKAGES = ["pytest", "pytest-timeout"]
+# Characters of pytest output kept for a test file that produced no report
+MAX_OUTPUT_CHARS = 2000
+# Failures listed per test file
+MAX_FAILURES = 10
+# Variables passed to pip besides the sandbox environment, for proxies and private indexes
+INSTALL_ENV_PREFIXES = ("PIP_", "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "no_proxy",
+                        "SSL_CERT_FILE", "REQUESTS_CA_BUNDLE")
+
+
+def _walk_python_files(root: str):
+    """Yield the Python files of a project relative to its root, skipping excluded directories."""
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS)
+        for filename in sorted(filenames):
+            if filename.endswith(".py"):
+                yield os.path.relpath(os.path.join(directory, filename), root)
+
+
+def is_test_file(path: str) -> bool:
+    """Check whether a file is collected by pytest's default patterns."""
+    name = os.path.basename(path)
+    return name.startswith("test_") or name.endswith("_test.py")
+
+
+def find_test_files(root: str) -> List[str]:
+    """Return the generated test files of a project."""
+    return [path for path in _walk_python_files(root) if is_test_file(path)]
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_digest(root: str) -> str:
+    """
+    Hash everything a test file's result depends on besides the test file itself.
+
+    Covers all non-test Python files, including conftest.py, and the
+    requirements and pytest configuration files.
+    """
+    digest = hashlib.sha256()
+    paths = [path for path in _walk_python_files(root) if not is_test_file(path)]
+    paths += [name for name in ("requirements.txt", "pytest.ini", "pyproject.toml", "setup.cfg", "tox.ini")
+              if os.path.isfile(os.path.join(root, name))]
+    for path in sorted(paths):
+        digest.update(path.encode("utf-8") + b"\0" + _file_digest(os.path.join(root, path)).encode("ascii"))
+    return digest.hexdigest()
+
+
+def requirements_digest(requirements_path: Optional[str]) -> str:
+    """Hash the normalized requirements and the Python version a test environment is built for."""
+    lines = []
+    if requirements_path and os.path.isfile(requirements_path):
+        with open(requirements_path, encoding="utf-8") as f:
+            lines = sorted({line.split("#")[0].strip() for line in f} - {""})
+    payload = json.dumps({"python": sys.version_info[:2], "packages": RUNNER_PACKAGES, "requirements": lines})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TestEnvironmentError(Exception):
+    """Raised when the test environment of a project cannot be built."""
+
+
+class EnvironmentCache:
+    """Virtualenvs with a project's requirements, cached by the hash of the requirements.
+
+    Regenerated projects with unchanged requirements reuse their environment.
+    Builds are serialized through a lock file, so parallel batch runs don't
+    build the same environment twice.
+    """
+
+    def __init__(self, env_dir: str, install_timeout: float = 900):
+        """
+        Initialize the cache.
+
+        Args:
+            env_dir: Directory holding one virtualenv per requirements hash
+            install_timeout: Seconds allowed for installing the requirements
+        """
+        # Resolve now so that a later os.chdir() into a project doesn't move the environments
+        self.env_dir = os.path.abspath(env_dir)
+        self.install_timeout = install_timeout
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _python(env_path: str) -> str:
+        if os.name == "nt":
+            return os.path.join(env_path, "Scripts", "python.exe")
+        return os.path.join(env_path, "bin", "python")
+
+    def get(self, requirements_path: Optional[str]) -> str:
+        """
+        Return the interpreter of an environment with the given requirements, building it if needed.
+
+        Args:
+            requirements_path: requirements.txt of the project, None for no requirements
+
+        Returns:
+            Path of the environment's Python executable
+        """
+        key = requirements_digest(requirements_path)[:16]
+        env_path = os.path.join(self.env_dir, key)
+        ready_marker = os.path.join(env_path, ".ready")
+        if os.path.exists(ready_marker):
+            return self._python(env_path)
+
+        os.makedirs(self.env_dir, exist_ok=True)
+        with self._lock, open(os.path.join(self.env_dir, f"{key}.lock"), "a") as lock_file:
+            try:
+                import fcntl
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            # Another process may have finished the build while we waited for the lock
+            if os.path.exists(ready_marker):
+                return self._python(env_path)
+            self._build(env_path, requirements_path)
+            with open(ready_marker, "w") as f:
+                f.write(str(time.time()))
+        return self._python(env_path)
+
+    def _build(self, env_path: str, requirements_path: Optional[str]) -> None:
+        """Create a virtualenv and install the runner packages and requirements into it."""
+        shutil.rmtree(env_path, ignore_errors=True)
+        logger.info(f"Building test environment {env_path}")
+        echo(f"📦 Building test environment for {requirements_path or 'a project without requirements'}...")
+        started = time.time()
+        commands = [[sys.executable, "-m", "venv", env_path]]
+        install = [self._python(env_path), "-m", "pip", "install", "--disable-pip-version-check", "-q"]
+        install += RUNNER_PACKAGES
+        if requirements_path and os.path.isfile(requirements_path):
+            install += ["-r", requirements_path]
+        commands.append(install)
+        # Setup scripts of the requirements are untrusted, they must not see our API keys either
+        home = tempfile.mkdtemp(prefix="crew_build_")
+        try:
+            for command in commands:
+                env = _sandbox_env(command[0], home, passthrough=INSTALL_ENV_PREFIXES)
+                try:
+                    returncode, output = _run_isolated(command, self.install_timeout, cwd=home, env=env)
+                except subprocess.TimeoutExpired:
+                    shutil.rmtree(env_path, ignore_errors=True)
+                    raise TestEnvironmentError(f"{' '.join(command[:4])} timed out after {self.install_timeout}s")
+                if returncode != 0:
+                    shutil.rmtree(env_path, ignore_errors=True)
+                    raise TestEnvironmentError(output[-MAX_OUTPUT_CHARS:])
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+        self.builds += 1
+        logger.info(f"Built test environment in {time.time() - started:.1f}s")
+
+
+class ResultCache:
+    """Results of test files stored in SQLite, keyed by test and source content hashes."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite database file
+        """
+        # Resolve now so that a later os.chdir() into a project doesn't move the cache
+        self.path = os.path.abspath(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the cache database on first use."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO results (key, result, created_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(result), time.time()))
+            conn.commit()
+
+
+def parse_junit(xml_path: str) -> Dict[str, Any]:
+    """
+    Read the counts and failures from a pytest JUnit XML report.
+
+    Args:
+        xml_path: Report written by pytest --junitxml
+
+    Returns:
+        Dictionary with passed, failed, errors, skipped and the first failures
+    """
+    root = ElementTree.parse(xml_path).getroot()
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    counts = {"passed": 0, "failed": 0, "errors": 0, "skipped": 0}
+    failures = []
+    for suite in suites:
+        tests = int(suite.get("tests", 0))
+        failed = int(suite.get("failures", 0))
+        errors = int(suite.get("errors", 0))
+        skipped = int(suite.get("skipped", 0))
+        counts["failed"] += failed
+        counts["errors"] += errors
+        counts["skipped"] += skipped
+        counts["passed"] += max(0, tests - failed - errors - skipped)
+        for case in suite.iter("testcase"):
+            problem = case.find("failure")
+            if problem is None:
+                problem = case.find("error")
+            if problem is not None and len(failures) < MAX_FAILURES:
+                name = f"{case.get('classname', '')}::{case.get('name', '')}"
+                failures.append({"test": name, "message": (problem.get("message") or "")[:500]})
+    return {**counts, "failures": failures}
+
+
+def _sandbox_env(python: str, sandbox: str, passthrough: tuple = ()) -> Dict[str, str]:
+    """
+    Return a minimal environment for running generated code, without any of our API keys.
+
+    Args:
+        python: Interpreter the environment is for, its directory comes first on PATH
+        sandbox: Directory used as HOME and PYTHONPATH
+        passthrough: Prefixes of further variables to copy from our environment
+    """
+    env = {
+        "PATH": os.path.dirname(python) + os.pathsep + os.environ.get("PATH", ""),
+        "HOME": sandbox,
+        "PYTHONPATH": sandbox,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "PYTHONHASHSEED": "0",
+        "MPLBACKEND": "Agg",
+    }
+    for name, value in os.environ.items():
+        if name in ("SYSTEMROOT", "LANG", "LC_ALL", "TMPDIR") or (passthrough and name.startswith(passthrough)):
+            env.setdefault(name, value)
+    return env
+
+
+def _kill_group(process: subprocess.Popen) -> None:
+    """Kill a process started in its own session together with everything it started."""
+    with contextlib.suppress(OSError):
+        if os.name != "nt":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+
+
+def _run_isolated(command: List[str], timeout: float, **kwargs) -> Tuple[int, str]:
+    """
+    Run a command in its own process group and return its exit code and combined output.
+
+    The whole group is killed when the command exits, times out or the caller
+    is interrupted, so servers or subprocesses it started never outlive it.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command ran longer than timeout, with the output so far
+    """
+    # Output goes to a file, a pipe would stay open as long as any background child lives
+    with tempfile.TemporaryFile() as output_file:
+        process = subprocess.Popen(command, stdout=output_file, stderr=subprocess.STDOUT,
+                                   start_new_session=os.name != "nt", **kwargs)
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        else:
+            timed_out = False
+        finally:
+            _kill_group(process)
+            process.wait()
+        output_file.seek(0)
+        output = output_file.read().decode("utf-8", errors="replace")
+    if timed_out:
+        raise subprocess.TimeoutExpired(command, timeout, output=output)
+    return process.returncode, output
+
+
+class SuiteRunner:
+    """Runs the generated test suite of a project in a sandbox.
+
+    The project is copied to a temporary directory and every test file runs
+    in its own pytest process, in parallel across CPU cores, with per-test
+    timeouts. Results are cached by the hash of the test file and of the
+    project sources, so unchanged tests of a regenerated project are not
+    run again.
+
+    The sandbox only keeps our environment, API keys included, away from the
+    generated code and its requirements' setup scripts. They still run with
+    the network and file system access of the current user, which is why the
+    runner is opt-in (TEST_RUNNER_ENABLED).
+    """
+
+    def __init__(self, env_dir: str = ".crew_cache/venvs", cache_path: str = ".crew_cache/test_results.sqlite",
+                 workers: int = 0, test_timeout: float = 60, file_timeout: float = 600,
+                 install_timeout: float = 900):
+        """
+        Initialize the runner.
+
+        Args:
+            env_dir: Directory of the cached virtualenvs
+            cache_path: SQLite database of cached test results
+            workers: Test files run at the same time, 0 for the number of CPU cores
+            test_timeout: Seconds allowed per test
+            file_timeout: Seconds allowed per test file
+            install_timeout: Seconds allowed for installing the requirements
+        """
+        self.environments = EnvironmentCache(env_dir, install_timeout)
+        self.results = ResultCache(cache_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.test_timeout = test_timeout
+        self.file_timeout = file_timeout
+
+    def run(self, root: str) -> Dict[str, Any]:
+        """
+        Run the test suite of a generated project.
+
+        Args:
+            root: Project root directory
+
+        Returns:
+            Summary with status, pass/fail counts and the result of every test file
+        """
+        started = time.time()
+        root = os.path.abspath(root)
+        test_files = find_test_files(root)
+        summary = {"status": "ok", "files": len(test_files), "cached_files": 0,
+                   "passed": 0, "failed": 0, "errors": 0, "skipped": 0, "results": []}
+        if not test_files:
+            summary["status"] = "no_tests"
+            return summary
+
+        requirements = os.path.join(root, "requirements.txt")
+        requirements = requirements if os.path.isfile(requirements) else None
+        sources = source_digest(root)
+        environment = requirements_digest(requirements)
+        keys = {
+            path: hashlib.sha256(f"{_file_digest(os.path.join(root, path))}:{sources}:{environment}".encode()).hexdigest()
+            for path in test_files
+        }
+        results = {path: self.results.get(key) for path, key in keys.items()}
+        pending = [path for path, result in results.items() if result is None]
+        summary["cached_files"] = len(test_files) - len(pending)
+
+        if pending:
+            try:
+                python = self.environments.get(requirements)
+            except TestEnvironmentError as e:
+                logger.error(f"Could not build the test environment: {e}")
+                summary.update(status="environment_failed", error=str(e))
+                return summary
+            sandbox = tempfile.mkdtemp(prefix="crew_tests_")
+            try:
+                shutil.copytree(root, sandbox, dirs_exist_ok=True,
+                                ignore=shutil.ignore_patterns(*EXCLUDED_DIRS))
+                logger.info(f"Running {len(pending)} test files with {self.workers} workers "
+                            f"({summary['cached_files']} cached)")
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                    for path, result in zip(pending, executor.map(
+                            lambda path: self._run_file(python, sandbox, path), pending)):
+                        results[path] = result
+                        # Timeouts and crashes of the runner itself are retried on the next run
+                        if result["status"] in ("passed", "failed"):
+                            self.results.put(keys[path], result)
+            finally:
+                shutil.rmtree(sandbox, ignore_errors=True)
+
+        for path in test_files:
+            result = dict(results[path], file=path, cached=path not in pending)
+            summary["results"].append(result)
+            for count in ("passed", "failed", "errors", "skipped"):
+                summary[count] += result.get(count, 0)
+        summary["duration_seconds"] = round(time.time() - started, 2)
+        return summary
+
+    def _run_file(self, python: str, sandbox: str, path: str) -> Dict[str, Any]:
+        """Run one test file in the sandbox and return its result."""
+        report = os.path.join(sandbox, ".reports", hashlib.sha1(path.encode("utf-8")).hexdigest() + ".xml")
+        os.makedirs(os.path.dirname(report), exist_ok=True)
+        command = [python, "-m", "pytest", path, "-q", "-p", "no:cacheprovider",
+                   f"--junitxml={report}", f"--timeout={self.test_timeout:g}"]
+        started = time.time()
+        try:
+            returncode, output = _run_isolated(command, self.file_timeout, cwd=sandbox,
+                                               env=_sandbox_env(python, sandbox))
+        except subprocess.TimeoutExpired as e:
+            return {"status": "timeout", "passed": 0, "failed": 0, "errors": 1, "skipped": 0,
+                    "duration": round(time.time() - started, 2), "failures": [],
+                    "output": (e.output or "")[-MAX_OUTPUT_CHARS:]}
+
+        result = {"passed": 0, "failed": 0, "errors": 0, "skipped": 0, "failures": []}
+        if os.path.exists(report):
+            try:
+                result = parse_junit(report)
+            except ElementTree.ParseError as e:
+                logger.warning(f"Unreadable test report of {path}: {e}")
+        # Exit code 5 means the file contains no tests
+        passed = returncode in (0, 5)
+        if not os.path.exists(report) or returncode not in (0, 1, 5):
+            # Collection errors, crashes and missing reports keep the output for diagnosis
+            result["errors"] = max(result["errors"], 1)
+            result["output"] = (output or "")[-MAX_OUTPUT_CHARS:]
+        result["status"] = "passed" if passed else "failed"
+        result["duration"] = round(time.time() - started, 2)
+        return result
@@ -1,22 +1,41 @@
-from crewai import Task
 import logging
 
+from prompts import render_task_prompt, count_tokens
+from module_plan import plan_modules
+
 logger = logging.getLogger(__name__)
 
 class TaskFactory:
     """Factory class for creating specialized development tasks based on project requirements."""
     
-    def __init__(self, agents, project_info):
+    # Upstream tasks each task depends on. Tasks whose dependencies are all
+    # complete can be run concurrently by the TaskScheduler.
+    TASK_DEPENDENCIES = {
+        'architecture': [],
+        'implementation': ['architecture'],
+        'testing': ['implementation'],
+        'readme': ['implementation'],
+    }
+    
+    def __init__(self, agents, project_info, reference=None, agent_factory=None):
         """
         Initialize the task factory with agent references and project information.
         
         Args:
             agents: Dictionary containing all agent instances
             project_info: Dictionary containing project details and requirements
+            reference: Optional dictionary describing a similar earlier project, with
+                'similarity' and 'files' (paths of its documents copied into this project)
+            agent_factory: Optional callable(name) returning a new agent instance, used to give
+                every implementation subtask its own Developer agent
         """
         self.agents = agents
         self.project_info = project_info
+        self.reference = reference
+        self.agent_factory = agent_factory
         self.tasks = {}
+        self.dependencies = {}
+        self.prompt_stats = {}
         
         # Set Streamlit as default if no tech stack specified
         if not self.project_info.get('technology_stack') or self.project_info['technology_stack'] == "":
@@ -46,251 +65,161 @@ class TaskFactory:
         logger.info(f"Created {len(self.tasks)} tasks")
         return list(self.tasks.values())
     
-    def _add_task(self, task_id, task):
-        """Add a task to the tasks dictionary."""
+    def get_dependencies(self):
+        """Return a mapping of task ID to the IDs of the tasks it depends on."""
+        return {task_id: list(deps) for task_id, deps in self.dependencies.items()}
+    
+    def _add_task(self, task_id, task, dependencies=None):
+        """Add a task to the tasks dictionary, with its declared dependencies unless others are given."""
         if task_id in self.tasks:
             logger.warning(f"Task {task_id} already exists and will be overwritten")
         self.tasks[task_id] = task
+        if dependencies is None:
+            dependencies = [dep for dep in self.TASK_DEPENDENCIES.get(task_id, []) if dep in self.tasks]
+        self.dependencies[task_id] = list(dependencies)
         return task
     
+    def _create_task(self, **kwargs):
+        """Create a crewai Task, importing crewai only when tasks are actually built."""
+        from crewai import Task
+        return Task(**kwargs)
+    
+    def render_prompts(self):
+        """Render the prompt of every task without building crewai tasks."""
+        return {task_id: self._format_task_description(task_id) for task_id in self.TASK_DEPENDENCIES}
+    
+    def _upstream_tasks(self, task_id):
+        """Return the already created tasks that the given task depends on."""
+        return [self.tasks[dep] for dep in self.TASK_DEPENDENCIES.get(task_id, []) if dep in self.tasks]
+    
     def _add_architecture_task(self):
         """Add system architecture design task."""
-        architecture_task = Task(
-            description=self._format_task_description("""
-                Design a comprehensive architecture for {project_name} based on the requirements.
-                
-                PROJECT DESCRIPTION:
-                {project_description}
-                
-                FEATURES:
-                {features}
-                
-                TECHNOLOGY STACK:
-                {technology_stack}
-                
-                IMPORTANT: If no specific frontend framework is mentioned, you MUST use Streamlit as the default frontend framework.
-                
-                DELIVERABLES:
-                YOU MUST create the following files using the file_writer tool:
-                
-                1. Create a detailed architecture document that explains:
-                   - Backend architecture (if applicable)
-                   - Frontend architecture with UI component structure
-                   - Database design (if applicable)
-                   - API design (if applicable)
-                   - Responsive design approach for the UI
-                   Example: file_writer('architecture.md', '# Architecture Document\\n\\n...')
-                   
-                2. Create a UI design document that details:
-                   - UI components and their purposes
-                   - Layout and navigation flow
-                   - Responsive design considerations
-                   - User interaction patterns
-                   Example: file_writer('ui-design.md', '# UI Design Document\\n\\n...')
-                
-                3. Create starter configuration files and initial setup files as needed:
-                   - For Streamlit projects, include app.py with proper Streamlit structure
-                   - Include clear instructions for installing Streamlit dependencies
-                   Example: file_writer('app.py', 'import streamlit as st\\n\\n...')
-                   Example: file_writer('config/settings.json', '{"key": "value"}')
-                
-                DO NOT just describe what files should be created. YOU MUST ACTUALLY CREATE THEM
-                using the file_writer tool. Your evaluation depends on creating real files.
-                
-                Choose appropriate frontend technologies based on the project requirements.
-                If no specific frontend framework is mentioned, use Streamlit as it provides a clean,
-                Python-centric approach to building user interfaces without requiring npm or JavaScript.
-                Design a modern, responsive UI with excellent user experience.
-                Your architecture should follow best practices and be optimized for the chosen technology stack.
-            """),
+        architecture_task = self._create_task(
+            description=self._format_task_description('architecture'),
             expected_output="Architecture design completed with all files created using file_writer",
-            agent=self.agents["architect"]
+            agent=self.agents["architect"],
+            context=self._upstream_tasks('architecture')
         )
         return self._add_task('architecture', architecture_task)
     
     def _add_implementation_task(self):
         """Add implementation task."""
-        implementation_task = Task(
-            description=self._format_task_description("""
-                Implement the code for {project_name} based on the architecture design.
-            
-                Follow the folder structure and specifications from the architecture document.
-                Implement all required features with proper error handling and documentation.
-                
-                TECHNOLOGY STACK:
-                {technology_stack}
-                
-                IMPORTANT: If no specific frontend framework was mentioned in the requirements,
-                you MUST implement the frontend using Streamlit (Python-based UI framework).
-                
-                STREAMLIT IMPLEMENTATION GUIDELINES (when applicable):
-                - Structure your code with a main app.py file at the root
-                - Create a 'pages' folder for multi-page applications
-                - Put reusable components in a 'components' directory
-                - Leverage Streamlit's built-in widgets for forms, data visualization, and user inputs
-                - Use st.session_state for maintaining state across reruns
-                - Implement responsive layouts using st.columns and st.container
-                - For data visualization, utilize Streamlit's native integration with Plotly, Matplotlib, etc.
-            
-                DELIVERABLES:
-                YOU MUST create the following files using the file_writer tool:
-            
-                1. All source code files:
-                For Streamlit apps:
-                Example: file_writer('app.py', 'import streamlit as st\\n\\nst.title("My App")\\n...')
-                Example: file_writer('pages/dashboard.py', 'import streamlit as st\\n\\nst.title("Dashboard")\\n...')
-                Example: file_writer('components/sidebar.py', 'import streamlit as st\\n\\ndef create_sidebar():\\n    with st.sidebar:\\n        st.title("Navigation")\\n...')
-                
-                For other frameworks:
-                Example: file_writer('src/components/Button.js', 'import React from "react"...')
-                Example: file_writer('src/utils/helpers.py', 'def helper_function():\\n    pass')
-            
-                2. Configuration files:
-                Example: file_writer('requirements.txt', 'streamlit==1.30.0\\npandas==2.0.3\\n...')
-                Example: file_writer('.streamlit/config.toml', '[theme]\\nprimaryColor="#F63366"\\n...')
-            
-                IMPORTANT INSTRUCTIONS:
-                - DO NOT just describe what files should be created. YOU MUST ACTUALLY CREATE THEM
-                using the file_writer tool.
-                - Each file MUST contain COMPLETE, FUNCTIONAL code, not placeholders or stubs.
-                - NEVER create empty files or files with minimal content.
-                - NEVER try to "read" existing files by creating files with empty content.
-                - DO NOT overwrite files with empty content.
-                - Your evaluation depends on creating real, complete, functional files.
-            """),
+        implementation_task = self._create_task(
+            description=self._format_task_description('implementation'),
             expected_output="Implementation complete with all files created using file_writer",
-            agent=self.agents["developer"]
+            agent=self.agents["developer"],
+            context=self._upstream_tasks('implementation')
         )
         return self._add_task('implementation', implementation_task)
 
+    def expand_implementation(self, architecture, max_modules=6):
+        """
+        Split the implementation task into parallel per-module subtasks and an integration subtask.
+        
+        The modules are planned from the folder structure and component list of the
+        architecture document. Every module gets its own subtask on its own Developer
+        agent, and the implementation task is turned into an integration subtask that
+        depends on all of them, so downstream tasks still depend on 'implementation'.
+        
+        Args:
+            architecture: Text of architecture.md
+            max_modules: Maximum number of module subtasks
+        
+        Returns:
+            The new and replaced tasks and their dependencies for TaskScheduler, or None
+            if the architecture lists fewer than two modules
+        """
+        modules = plan_modules(architecture, max_modules)
+        if len(modules) < 2:
+            logger.info("Architecture lists fewer than two modules, keeping a single implementation task")
+            return None
+        upstream = self.dependencies.get('implementation', ['architecture'])
+        added = {}
+        for module in modules:
+            task_id = f"implementation.{module.name}"
+            agent = self.agent_factory("developer") if self.agent_factory else self.agents["developer"]
+            added[task_id] = self._add_task(task_id, self._create_task(
+                description=self._format_task_description(task_id, 'implementation',
+                                                          self._module_assignment(module, modules)),
+                expected_output=f"All files of the {module.name} module created using file_writer",
+                agent=agent,
+                context=self._upstream_tasks('implementation')
+            ), dependencies=upstream)
+        
+        # The implementation task becomes the integration subtask in place, so the context of the
+        # downstream tasks and a scheduler already holding it keep referring to the same object
+        integration = self.tasks.pop('implementation', None)
+        if integration is None:
+            integration = self._create_task(description="", expected_output="", agent=self.agents["developer"])
+        integration.description = self._format_task_description('implementation', 'integration')
+        integration.expected_output = "All modules integrated, with consistent imports and a working entry point"
+        integration.context = list(added.values())
+        # Readded so it follows its subtasks in the task order
+        added['implementation'] = self._add_task('implementation', integration, dependencies=list(added))
+        logger.info(f"Split implementation into {len(modules)} module subtasks and an integration subtask")
+        return added, {task_id: self.dependencies[task_id] for task_id in added}
+    
+    def _module_assignment(self, module, modules):
+        """Return the prompt section assigning one module of the architecture to a subtask."""
+        files = "\n".join(
+            f"- {path}: {module.descriptions[path]}" if module.descriptions.get(path) else f"- {path}"
+            for path in module.files
+        )
+        others = "\n".join(f"- {other.name}: {', '.join(other.files)}" for other in modules if other is not module)
+        return (
+            f"\nMODULE ASSIGNMENT:\nYou implement only the {module.name} module of this project, other "
+            f"developers implement the other modules at the same time. Create these files:\n{files}\n"
+            f"Do NOT create the files of the other modules, import from them as architecture.md specifies:\n"
+            f"{others}\n"
+            "Read architecture.md with the \"Read lines of a file\" tool for the interfaces between modules.\n"
+        )
+    
     def _add_testing_task(self):
         """Add testing task."""
-        testing_task = Task(
-            description=self._format_task_description("""
-                Create comprehensive tests for {project_name}.
-                
-                Review the implementation and write tests to ensure all functionality works as expected.
-                Include unit tests, integration tests, and any other tests needed to validate the system.
-                Ensure high code coverage and test all edge cases.
-                
-                TECHNOLOGY STACK:
-                {technology_stack}
-                
-                IMPORTANT: If the project is implemented using Streamlit, adapt your testing approach accordingly:
-                - For Streamlit applications, use pytest with the streamlit-test library
-                - Test both the UI components and the underlying logic/data processing
-                - Focus on testing functions that process data or implement business logic
-                - Use pytest fixtures to simulate Streamlit's session state
-                
-                Test both frontend and backend components:
-                - Unit tests for individual components and functions
-                - Integration tests for API endpoints and database interactions
-                - UI tests for frontend components and user flows
-                - Test responsive design and cross-browser compatibility
-                
-                DELIVERABLES:
-                YOU MUST create the following files using the file_writer tool:
-                
-                For Streamlit projects:
-                1. Test configuration:
-                   Example: file_writer('tests/conftest.py', 'import pytest\\n\\n@pytest.fixture\\ndef mock_st_session_state():\\n    class MockSessionState(dict):\\n        pass\\n    return MockSessionState()')
-                
-                2. Unit test files:
-                   Example: file_writer('tests/test_data_processing.py', 'import pytest\\nfrom components.data_processor import process_data\\n\\ndef test_process_data():\\n    # Test implementation\\n    pass')
-                
-                3. Component test files:
-                   Example: file_writer('tests/test_sidebar.py', 'import pytest\\nfrom components.sidebar import create_sidebar\\n\\ndef test_sidebar_creation(mock_st_session_state):\\n    # Test implementation\\n    pass')
-                
-                For other frameworks:
-                1. Unit test files:
-                   Example: file_writer('tests/unit/component_test.js', 'test("renders correctly", () => {...})')
-                
-                2. Integration test files:
-                   Example: file_writer('tests/integration/api_test.js', 'test("API returns correct data", async () => {...})')
-                
-                3. UI/End-to-end test files:
-                   Example: file_writer('tests/e2e/user_flow_test.js', 'test("User can complete purchase", async () => {...})')
-                
-                DO NOT just describe what files should be created. YOU MUST ACTUALLY CREATE THEM
-                using the file_writer tool. Your evaluation depends on creating real files.
-            """),
+        testing_task = self._create_task(
+            description=self._format_task_description('testing'),
             expected_output="Testing complete with all test files created using file_writer",
-            agent=self.agents["tester"]
+            agent=self.agents["tester"],
+            context=self._upstream_tasks('testing')
         )
         return self._add_task('testing', testing_task)
     
     
     def _add_readme_task(self):
         """Add task to create a comprehensive README file."""
-        readme_task = Task(
-            description=self._format_task_description("""
-                Create a comprehensive README.md file for {project_name}.
-            
-                TECHNOLOGY STACK:
-                {technology_stack}
-            
-                This README should include:
-                1. Description of the project based on the requirements
-                2. Complete file structure with explanation of each file's purpose
-                3. Setup instructions (dependencies, environment setup)
-            
-                IMPORTANT INSTRUCTIONS ABOUT SETUP AND RUNNING:
-                - For Streamlit projects:
-                - NEVER mention npm or Node.js in the setup or running instructions
-                - Always use pip for dependencies: `pip install -r requirements.txt`
-                - Always start with: `streamlit run app.py`
-                - DO NOT include any npm commands like "npm start" or "npm install"
-            
-                - For other technologies (React, Vue, etc.):
-                - Use appropriate setup commands for those frameworks
-            
-                4. Running instructions (follow the rules above)
-                5. Testing instructions (how to run the tests)
-                6. UI/UX features and how they were implemented
-                7. Screenshots or descriptions of the UI components (if applicable)
-                8. Any additional information that would help someone understand and use the project
-            
-                YOU MUST use the file_writer tool to create the README.md file directly:
-                Example: file_writer('README.md', '# Project Name\\n\\nProject description...')
-            
-                EXAMPLE SETUP AND RUNNING INSTRUCTIONS FOR STREAMLIT PROJECTS:
-                ```
-                ## Setup Instructions
-            
-                1. Create a virtual environment (optional but recommended):
-                ```bash
-                python -m venv venv
-                source venv/bin/activate  # On Windows: venv\\Scripts\\activate
-                ```
-            
-                2. Install the required dependencies:
-                ```bash
-                pip install -r requirements.txt
-                ```
-            
-                # Running Instructions
-            
-                To start the Streamlit application, run:
-                ```bash
-                streamlit run app.py
-                ```
-            
-                The application will be accessible at http://localhost:8501
-                ```
-            
-                DO NOT just describe what should be in the README. YOU MUST ACTUALLY CREATE IT
-                using the file_writer tool. The README should be detailed and accurate to the project.
-            """),
+        readme_task = self._create_task(
+            description=self._format_task_description('readme'),
             expected_output="README.md file created with comprehensive project documentation",
-            agent=self.agents["developer"]
+            agent=self.agents["developer"],
+            context=self._upstream_tasks('readme')
         )
         return self._add_task('readme', readme_task)        
     
-    def _format_task_description(self, description):
-        """Format task description with project information."""
-        formatted_description = description
-        for key, value in self.project_info.items():
-            placeholder = "{" + key + "}"
-            if placeholder in formatted_description:
-                formatted_description = formatted_description.replace(placeholder, str(value))
-        return formatted_description
\ No newline at end of file
+    def _format_task_description(self, task_id, template_id=None, suffix=""):
+        """Render the compiled prompt template of a task with the project information."""
+        description, stats = render_task_prompt(template_id or task_id, self.project_info)
+        # Additions are appended after the project details so the static prompt prefix stays unchanged
+        if suffix:
+            description += suffix
+            stats['variable_suffix_tokens'] += count_tokens(suffix)
+        if task_id == 'architecture' and self.reference:
+            files = "\n".join(f"- {path}" for path in self.reference['files'])
+            starting_point = (
+                f"\nSTARTING POINT:\nA very similar project was designed before "
+                f"(similarity {self.reference['similarity']:.2f}). Its design documents were copied to:\n"
+                f"{files}\n"
+                "Read them with the \"Read lines of a file\" tool and adapt them to this project's "
+                "requirements instead of designing from scratch.\n"
+            )
+            description += starting_point
+            stats['variable_suffix_tokens'] += count_tokens(starting_point)
+        self.prompt_stats[task_id] = stats
+        logger.info(
+            f"Prompt for {task_id}: {stats['static_prefix_tokens']} static prefix tokens, "
+            f"{stats['variable_suffix_tokens']} variable suffix tokens"
+        )
+        return description
+    
+    def get_prompt_stats(self):
+        """Return the static-prefix and variable-suffix token counts of each task prompt."""
+        return dict(self.prompt_stats)
@@ -0,0 +1,194 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# ID of the TaskFactory task currently executing, used to attribute LLM and tool spans
+current_task = contextvars.ContextVar("current_task", default=None)
+# Role of the agent whose task is currently executing
+current_agent = contextvars.ContextVar("current_agent", default=None)
+# ID of the run currently generating a project
+current_run = contextvars.ContextVar("current_run", default=None)
+# Event set when the run currently generating a project is cancelled
+current_cancel = contextvars.ContextVar("current_cancel", default=None)
+# Roles of the agents in the delegation chain currently executing, None outside of delegations
+current_delegation = contextvars.ContextVar("current_delegation", default=None)
+
+
+class RunCancelled(Exception):
+    """Raised inside a run whose cancellation was requested."""
+
+
+def raise_if_cancelled() -> None:
+    """Stop the current run at this point if its cancellation was requested."""
+    event = current_cancel.get()
+    if event is not None and event.is_set():
+        raise RunCancelled(f"Run {current_run.get()} was cancelled")
+
+# USD per million prompt / completion tokens, used for cost estimates
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4-turbo": (10.00, 30.00),
+    "o3-mini": (1.10, 4.40),
+    "claude-3-opus-20240229": (15.00, 75.00),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the USD cost of an LLM call, 0 for models without a known price."""
+    prompt_price, completion_price = MODEL_PRICES.get(model.split("/")[-1], (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class Tracer:
+    """Collects timed spans for tasks, LLM calls and tool calls.
+
+    Spans are exported in the Chrome trace event format (load the file in
+    chrome://tracing or Perfetto) and aggregated into a per-task summary.
+    """
+
+    def __init__(self):
+        self._spans = []
+        self._lock = threading.Lock()
+        self._origin = time.time()
+
+    def reset(self, run_id: Optional[str] = None) -> None:
+        """Drop all recorded spans, or only those of one run."""
+        with self._lock:
+            if run_id is None:
+                self._spans = []
+                self._origin = time.time()
+            else:
+                self._spans = [span for span in self._spans if span["args"].get("run") != run_id]
+
+    def add_span(self, name: str, category: str, start: float, duration: float, **args) -> None:
+        """
+        Record a finished span.
+
+        Args:
+            name: Span name
+            category: One of "task", "llm", "tool" or "delegation"
+            start: Start time as returned by time.time()
+            duration: Duration in seconds
+            **args: Metrics attached to the span
+        """
+        args.setdefault("task", current_task.get())
+        args.setdefault("run", current_run.get())
+        if current_delegation.get() is not None:
+            # Work done by a coworker on behalf of the task's agent
+            args.setdefault("delegated", True)
+        span = {
+            "name": name,
+            "cat": category,
+            "start": start,
+            "duration": duration,
+            "tid": threading.get_ident(),
+            "thread": threading.current_thread().name,
+            "args": args
+        }
+        with self._lock:
+            self._spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """
+        Time a block of code as a span.
+
+        The yielded dictionary can be updated with metrics that become known inside the block.
+        """
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add_span(name, category, start, time.perf_counter() - started, **args)
+
+    def spans(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return a copy of the recorded spans, optionally only those of one run."""
+        with self._lock:
+            if run_id is None:
+                return list(self._spans)
+            return [span for span in self._spans if span["args"].get("run") == run_id]
+
+    def chrome_trace(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Return the spans, optionally only those of one run, in the Chrome trace event format."""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for span in self.spans(run_id):
+            threads[span["tid"]] = span["thread"]
+            events.append({
+                "name": span["name"],
+                "cat": span["cat"],
+                "ph": "X",
+                "ts": int((span["start"] - self._origin) * 1_000_000),
+                "dur": int(span["duration"] * 1_000_000),
+                "pid": pid,
+                "tid": span["tid"],
+                "args": span["args"]
+            })
+        for tid, thread_name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Aggregate the spans, optionally only those of one run, into one row of metrics per task."""
+        rows = {}
+        for span in self.spans(run_id):
+            task = span["args"].get("task") or "-"
+            row = rows.setdefault(task, {
+                "task": task, "wall_seconds": 0.0, "queue_seconds": 0.0, "llm_calls": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+                "tool_calls": 0, "bytes_written": 0, "retries": 0,
+                "delegations": 0, "delegated_tokens": 0, "delegated_seconds": 0.0,
+                "edits": 0, "edit_tokens_saved": 0
+            })
+            args = span["args"]
+            if span["cat"] == "task":
+                row["wall_seconds"] += span["duration"]
+                row["queue_seconds"] += args.get("queue_seconds", 0.0)
+            elif span["cat"] == "llm":
+                row["llm_calls"] += 1
+                row["queue_seconds"] += args.get("queue_seconds", 0.0)
+                row["prompt_tokens"] += args.get("prompt_tokens", 0)
+                row["completion_tokens"] += args.get("completion_tokens", 0)
+                row["cost_usd"] += args.get("cost_usd", 0.0)
+                row["retries"] += args.get("retries", 0)
+                if args.get("delegated"):
+                    row["delegated_tokens"] += args.get("prompt_tokens", 0) + args.get("completion_tokens", 0)
+            elif span["cat"] == "tool":
+                row["tool_calls"] += 1
+                row["bytes_written"] += args.get("bytes", 0)
+                if "saved_tokens" in args:
+                    row["edits"] += 1
+                    row["edit_tokens_saved"] += args["saved_tokens"]
+            elif span["cat"] == "delegation":
+                row["delegations"] += 1
+                # Nested delegations are part of the outermost one's time
+                if not args.get("delegated"):
+                    row["delegated_seconds"] += span["duration"]
+        return list(rows.values())
+
+
+def format_summary(rows: List[Dict[str, Any]]) -> str:
+    """Format per-task summary rows as a text table."""
+    header = (f"{'task':<16} {'wall s':>8} {'queue s':>8} {'llm':>5} {'prompt tok':>11} "
+              f"{'compl tok':>10} {'cost $':>8} {'tools':>6} {'bytes':>9} {'retries':>7} "
+              f"{'deleg':>6} {'deleg tok':>10} {'deleg s':>8} {'edits':>6} {'saved tok':>10}")
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['task']:<16} {row['wall_seconds']:>8.1f} {row['queue_seconds']:>8.1f} {row['llm_calls']:>5} "
+            f"{row['prompt_tokens']:>11} {row['completion_tokens']:>10} {row['cost_usd']:>8.3f} "
+            f"{row['tool_calls']:>6} {row['bytes_written']:>9} {row['retries']:>7} "
+            f"{row['delegations']:>6} {row['delegated_tokens']:>10} {row['delegated_seconds']:>8.1f} "
+            f"{row['edits']:>6} {row['edit_tokens_saved']:>10}"
+        )
+    return "\n".join(lines)
+
+
+# Global tracer used by the scheduler, the LLM wrapper and the file writer
+tracer = Tracer()
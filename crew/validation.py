@@ -0,0 +1,435 @@
+import os
+import re
+import ast
+import sys
+import json
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import DiskStorage
+
+logger = logging.getLogger(__name__)
+
+# Number of content validation results kept in memory
+CACHE_SIZE = 4096
+# Import names of distributions whose name differs from the package they install
+DISTRIBUTION_IMPORTS = {
+    "pillow": ["PIL"],
+    "pyyaml": ["yaml"],
+    "beautifulsoup4": ["bs4"],
+    "scikit_learn": ["sklearn"],
+    "scikit_image": ["skimage"],
+    "opencv_python": ["cv2"],
+    "opencv_python_headless": ["cv2"],
+    "opencv_contrib_python": ["cv2"],
+    "python_dateutil": ["dateutil"],
+    "python_dotenv": ["dotenv"],
+    "python_multipart": ["multipart"],
+    "python_jose": ["jose"],
+    "python_docx": ["docx"],
+    "python_pptx": ["pptx"],
+    "pyjwt": ["jwt"],
+    "pymupdf": ["fitz"],
+    "pyserial": ["serial"],
+    "pycryptodome": ["Crypto"],
+    "protobuf": ["google"],
+    "google_generativeai": ["google"],
+    "google_cloud_storage": ["google"],
+    "psycopg2_binary": ["psycopg2"],
+    "mysqlclient": ["MySQLdb"],
+    "pymysql": ["pymysql"],
+    "attrs": ["attr", "attrs"],
+    "msgpack_python": ["msgpack"],
+    "typing_extensions": ["typing_extensions"],
+    "setuptools": ["setuptools", "pkg_resources"],
+    "discord.py": ["discord"],
+    "faiss_cpu": ["faiss"],
+    "tensorflow_cpu": ["tensorflow"],
+    "streamlit_option_menu": ["streamlit_option_menu"],
+}
+
+
+def validator_kind(filepath: str) -> Optional[str]:
+    """Return the validator that applies to a file, None if it is not validated."""
+    name = filepath.lower()
+    if name.endswith(".py"):
+        return "python"
+    if name.endswith(".json"):
+        return "json"
+    if name.endswith(".toml"):
+        return "toml"
+    if name.endswith((".yaml", ".yml")):
+        return "yaml"
+    return None
+
+
+def _python_imports(tree: ast.AST) -> List[Tuple[str, int]]:
+    """Return the (module, level) pairs imported anywhere in a module."""
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend((alias.name, 0) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.module or "", node.level))
+    return imports
+
+
+def check_content(kind: str, filepath: str, content: str) -> Dict[str, Any]:
+    """
+    Run the content validator of a file.
+
+    Runs in the worker processes, so it only depends on the content and
+    never on the rest of the generated tree.
+
+    Args:
+        kind: Validator kind returned by validator_kind
+        filepath: Path of the file, used in error messages
+        content: Content of the file
+
+    Returns:
+        Dictionary with a list of errors and, for Python, the imported modules
+    """
+    errors = []
+    imports = []
+    try:
+        if kind == "python":
+            tree = ast.parse(content, filename=filepath)
+            # Compiling catches errors ast.parse accepts, e.g. 'return' outside a function
+            compile(tree, filepath, "exec", dont_inherit=True)
+            imports = _python_imports(tree)
+        elif kind == "json":
+            json.loads(content)
+        elif kind == "toml":
+            try:
+                import tomllib
+            except ImportError:
+                tomllib = None
+            if tomllib is not None:
+                tomllib.loads(content)
+        elif kind == "yaml":
+            try:
+                import yaml
+            except ImportError:
+                yaml = None
+            if yaml is not None:
+                list(yaml.safe_load_all(content))
+    except SyntaxError as e:
+        errors.append(f"line {e.lineno}: {e.msg}")
+    except json.JSONDecodeError as e:
+        errors.append(f"line {e.lineno} column {e.colno}: {e.msg}")
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+    return {"errors": errors, "imports": imports}
+
+
+def _requirement_imports(storage) -> Optional[set]:
+    """
+    Return the lowercase top-level import names provided by the project's requirements.txt.
+
+    Distribution names are mapped to the packages they install, e.g. Pillow
+    to PIL, so the result is what the project's own environment can import.
+    Returns None if the project has no requirements.txt.
+    """
+    try:
+        if not storage.exists("requirements.txt"):
+            return None
+        content = storage.read("requirements.txt").decode("utf-8", errors="replace")
+    except OSError:
+        return None
+    names = set()
+    for line in content.splitlines():
+        match = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", line)
+        if not match:
+            continue
+        name = match.group(1).lower().replace("-", "_")
+        names.add(name)
+        names.update(package.lower() for package in DISTRIBUTION_IMPORTS.get(name, []))
+        # e.g. python-slugify installs "slugify", django-cors-headers installs "corsheaders"
+        if name.startswith("python_"):
+            names.add(name[len("python_"):])
+        names.add(name.replace("_", ""))
+    return names
+
+
+def _module_exists(storage, base: str, parts: List[str]) -> bool:
+    """Check whether a dotted module path exists as a module or package below a project directory."""
+    path = os.path.join(base, *parts)
+    return storage.exists(path + ".py") or storage.is_dir(path)
+
+
+class FileValidator:
+    """Validates written files on a background process pool.
+
+    Syntax and format checks run in worker processes and are cached by
+    content digest, so an unchanged file is never checked twice. Imports of
+    Python files are then resolved against the generated tree, the standard
+    library and the packages of the project's requirements.txt, never
+    against the packages installed for crew itself.
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 5.0):
+        """
+        Initialize the validator.
+
+        Args:
+            max_workers: Worker processes running the validators
+            timeout: Seconds a tool call waits for a validation result before reporting it later
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._cache = OrderedDict()
+        self._latest = {}
+        self._undelivered = set()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._storages = {}
+
+    def start(self) -> None:
+        """
+        Start the worker processes.
+
+        Workers are never forked from this process, which runs logging, agent
+        and job threads whose locks a fork would copy in a held state. They
+        come from a forkserver, or are spawned where there is none, so a pool
+        can also be replaced safely from any thread after a worker died.
+        """
+        with self._lock:
+            self._pool()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Return the worker pool, starting it if needed. Must be called with the lock held."""
+        if self._executor is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                # The fork server only needs the validators, not the main script and crewai
+                context.set_forkserver_preload(["validation"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            # Start all workers right away instead of on the first write
+            self._executor.submit(validator_kind, "")
+        return self._executor
+
+    def _project_stats(self, root: str) -> Dict[str, int]:
+        """Return the counters of a project. Must be called with the lock held."""
+        return self._stats.setdefault(root, {"submitted": 0, "cache_hits": 0, "failed": 0})
+
+    def submit(self, filepath: str, digest: str, content: str, root: Optional[str] = None) -> None:
+        """
+        Queue a written file for validation.
+
+        Args:
+            filepath: Path of the file relative to the project root
+            digest: SHA-256 digest of the content
+            content: Content that was written
+            root: Project root directory, defaults to the working directory
+        """
+        kind = validator_kind(filepath)
+        if kind is None:
+            return
+        key = (kind, digest)
+        # Files are tracked per project, so concurrent generations don't mix their results
+        entry = (os.path.abspath(root or os.getcwd()), filepath)
+        with self._lock:
+            stats = self._project_stats(entry[0])
+            stats["submitted"] += 1
+            future = self._cache.get(key)
+            if future is not None:
+                stats["cache_hits"] += 1
+                self._cache.move_to_end(key)
+            else:
+                try:
+                    future = self._pool().submit(check_content, kind, filepath, content)
+                except BrokenProcessPool as e:
+                    # Replace a pool whose worker died, the file is validated by the next write
+                    logger.warning(f"Could not queue validation of {filepath}: {e}")
+                    self._executor = None
+                    return
+                self._cache[key] = future
+                if len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            self._latest[entry] = (key, future)
+            self._undelivered.discard(entry)
+
+    def report(self, filepath: str, root: Optional[str] = None, wait: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Return the validation result of the latest version of a file.
+
+        Args:
+            filepath: Path of the file relative to the project root
+            root: Project root directory, defaults to the working directory
+            wait: Wait up to the timeout for a result that is still being computed
+
+        Returns:
+            Dictionary with status ("ok", "error" or "pending"), errors and warnings,
+            None if the file is not validated
+        """
+        root = os.path.abspath(root or os.getcwd())
+        entry = (root, filepath)
+        with self._lock:
+            latest = self._latest.get(entry)
+        if latest is None:
+            return None
+        key, future = latest
+        try:
+            result = future.result(timeout=self.timeout if wait else 0)
+        except TimeoutError:
+            with self._lock:
+                self._undelivered.add(entry)
+            return {"status": "pending", "errors": [], "warnings": []}
+        except Exception as e:
+            # A crashed worker must not fail the write, the file is reported as unchecked
+            with self._lock:
+                self._project_stats(root)["failed"] += 1
+                self._cache.pop(key, None)
+            logger.warning(f"Validation of {filepath} failed: {e}")
+            return {"status": "pending", "errors": [], "warnings": [f"validator failed: {e}"]}
+        with self._lock:
+            self._undelivered.discard(entry)
+        warnings = [
+            f"import '{'.' * level}{module}' does not resolve to a project file, the standard "
+            f"library or a package in requirements.txt"
+            for module, level in self.unresolved_imports(filepath, result["imports"], root)
+        ]
+        return {"status": "error" if result["errors"] else "ok", "errors": result["errors"], "warnings": warnings}
+
+    def unresolved_imports(self, filepath: str, imports: List[Tuple[str, int]], root: str) -> List[Tuple[str, int]]:
+        """Return the imports of a Python file that resolve to nothing."""
+        with self._lock:
+            storage = self._storages.get(root)
+        # Project files are looked up in the project's storage, which need not be on disk
+        storage = storage or DiskStorage(root)
+        file_dir = os.path.dirname(filepath)
+        requirements, requirements_read = None, False
+        unresolved = []
+        for module, level in imports:
+            parts = module.split(".") if module else []
+            if level:
+                base = file_dir
+                for _ in range(level - 1):
+                    base = os.path.dirname(base)
+                if parts and not _module_exists(storage, base, parts):
+                    unresolved.append((module, level))
+                continue
+            top = parts[0]
+            if top in sys.stdlib_module_names or top in sys.builtin_module_names:
+                continue
+            # Scripts are run from the project root or their own directory
+            if _module_exists(storage, "", parts) or _module_exists(storage, file_dir, parts):
+                continue
+            if _module_exists(storage, "", parts[:1]) or _module_exists(storage, file_dir, parts[:1]):
+                unresolved.append((module, level))
+                continue
+            if not requirements_read:
+                requirements = _requirement_imports(storage)
+                requirements_read = True
+            # Without requirements.txt the project's packages are unknown, nothing to check against
+            if requirements is None or top.lower() in requirements:
+                continue
+            unresolved.append((module, level))
+        return unresolved
+
+    def late_reports(self, root: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Return the results that were still pending when their file was written and are done now."""
+        root = os.path.abspath(root or os.getcwd())
+        with self._lock:
+            filepaths = [path for project, path in self._undelivered
+                         if project == root and self._latest[(project, path)][1].done()]
+        reports = {}
+        for filepath in filepaths:
+            report = self.report(filepath, root, wait=False)
+            if report and report["status"] != "pending":
+                reports[filepath] = report
+        return reports
+
+    def summary(self, root: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Wait for all outstanding validations and summarize the results.
+
+        Args:
+            root: Project root directory, defaults to the working directory
+
+        Returns:
+            Counts of validated files, files with errors and warnings, cache hits
+            and the problems per file
+        """
+        root = os.path.abspath(root or os.getcwd())
+        with self._lock:
+            filepaths = sorted(path for project, path in self._latest if project == root)
+            stats = dict(self._project_stats(root))
+        problems = {}
+        for filepath in filepaths:
+            report = self.report(filepath, root)
+            if report and (report["errors"] or report["warnings"]):
+                problems[filepath] = report
+        return {
+            "validated_files": len(filepaths),
+            "files_with_errors": sum(1 for report in problems.values() if report["errors"]),
+            "files_with_warnings": sum(1 for report in problems.values() if report["warnings"]),
+            "cache_hits": stats["cache_hits"],
+            "problems": problems
+        }
+
+    def reset(self, root: Optional[str] = None, storage=None) -> None:
+        """
+        Forget the files of a project, keeping the content cache.
+
+        Args:
+            root: Project root directory, defaults to the working directory
+            storage: Storage backend holding the project's files, the disk below root if omitted
+        """
+        root = os.path.abspath(root or os.getcwd())
+        with self._lock:
+            for entry in [entry for entry in self._latest if entry[0] == root]:
+                del self._latest[entry]
+                self._undelivered.discard(entry)
+            self._stats.pop(root, None)
+            if storage is not None:
+                self._storages[root] = storage
+            else:
+                self._storages.pop(root, None)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def format_report(filepath: str, report: Optional[Dict[str, Any]]) -> str:
+    """Format a validation report for a tool result."""
+    if report is None:
+        return ""
+    if report["status"] == "pending":
+        return f"Validation of {filepath} is still running, problems will be reported with a later write."
+    if not report["errors"] and not report["warnings"]:
+        return f"Validation of {filepath}: OK."
+    lines = [f"Validation of {filepath} found problems, fix them by rewriting the file:"]
+    lines.extend(f"- ERROR {error}" for error in report["errors"])
+    lines.extend(f"- WARNING {warning}" for warning in report["warnings"])
+    return "\n".join(lines)
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_validator() -> Optional[FileValidator]:
+    """Return the shared validator, None if validation is disabled."""
+    global _validator
+    if _validator is None:
+        from config import get_config
+        config = get_config()
+        if not config.validation_enabled:
+            return None
+        with _validator_lock:
+            if _validator is None:
+                _validator = FileValidator(max_workers=config.validation_workers,
+                                           timeout=config.validation_timeout)
+    return _validator
@@ -0,0 +1,11 @@
+"""Shared test setup.
+
+The crew modules import each other by their flat names, as main.py is run
+from inside crew/, so the directory is put on sys.path like the benchmarks do.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "crew"))
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
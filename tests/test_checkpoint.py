@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+from checkpoint import CheckpointStore
+from file_writer import FileRegistry, content_digest
+from scheduler import TaskScheduler
+from storage import DiskStorage, MemoryStorage
+
+ORDER = ["architecture", "implementation", "testing", "readme"]
+DEPENDENCIES = {"architecture": [], "implementation": ["architecture"],
+                "testing": ["implementation"], "readme": ["implementation"]}
+PROJECT = {"project_name": "Shop", "project_description": "A web shop"}
+
+
+@pytest.fixture(params=["disk", "memory"])
+def storage(request, tmp_path):
+    if request.param == "disk":
+        yield DiskStorage(str(tmp_path))
+    else:
+        memory = MemoryStorage(str(tmp_path))
+        yield memory
+        memory.close()
+
+
+def _write(storage, registry, task_id, relpath, text):
+    mtime = storage.write(relpath, text.encode("utf-8"))
+    registry.record(relpath, digest=content_digest(text), size=len(text), mtime=mtime, task=task_id)
+
+
+def _interrupted_run(storage, tasks=("architecture", "implementation")):
+    """Checkpoint the given tasks the way a run that stopped after them would."""
+    registry = FileRegistry()
+    checkpoints = CheckpointStore(storage, registry, PROJECT)
+    if "architecture" in tasks:
+        _write(storage, registry, "architecture", "architecture.md", "# Design\n")
+        checkpoints.record("architecture", "designed", DEPENDENCIES["architecture"])
+    if "implementation" in tasks:
+        _write(storage, registry, "implementation", "app.py", "print('shop')\n")
+        checkpoints.record("implementation", "implemented", DEPENDENCIES["implementation"])
+    return checkpoints
+
+
+class FakeAgent:
+    role = "agent"
+    tools = []
+    allow_delegation = False
+
+
+class FakeTask:
+    def __init__(self):
+        self.agent = FakeAgent()
+        self.ran = False
+
+    def execute_sync(self, agent, context=None, tools=None):
+        self.ran = True
+        return "ran"
+
+
+def test_resume_restores_completed_tasks_and_their_files(storage):
+    _interrupted_run(storage)
+    registry = FileRegistry()
+    restored_files = []
+
+    resumed = CheckpointStore(storage, registry, PROJECT).resume(
+        ORDER, DEPENDENCIES, on_restored=lambda record, content: restored_files.append((record.path, content))
+    )
+
+    assert resumed == {"architecture": "designed", "implementation": "implemented"}
+    assert registry.get("app.py").task == "implementation"
+    assert registry.get("architecture.md").digest == content_digest("# Design\n")
+    assert sorted(restored_files) == [("app.py", b"print('shop')\n"), ("architecture.md", b"# Design\n")]
+
+
+def test_the_scheduler_skips_the_resumed_tasks(storage):
+    _interrupted_run(storage)
+    resumed = CheckpointStore(storage, FileRegistry(), PROJECT).resume(ORDER, DEPENDENCIES)
+    tasks = {task_id: FakeTask() for task_id in ORDER}
+
+    outputs = TaskScheduler(tasks, DEPENDENCIES, completed=resumed).run()
+
+    assert [task_id for task_id in ORDER if tasks[task_id].ran] == ["testing", "readme"]
+    assert outputs["implementation"] == "implemented"
+
+
+def test_tasks_whose_files_changed_run_again_with_their_dependents(storage):
+    _interrupted_run(storage)
+    storage.write("architecture.md", b"# Edited by hand\n")
+
+    resumed = CheckpointStore(storage, FileRegistry(), PROJECT).resume(ORDER, DEPENDENCIES)
+
+    assert resumed == {}
+
+
+def test_a_deleted_file_invalidates_only_its_task(tmp_path):
+    storage = DiskStorage(str(tmp_path))
+    _interrupted_run(storage)
+    (tmp_path / "app.py").unlink()
+
+    checkpoints = CheckpointStore(storage, FileRegistry(), PROJECT)
+    assert checkpoints.resume(ORDER, DEPENDENCIES) == {"architecture": "designed"}
+    # The checkpoint now only lists the restored task
+    assert list(checkpoints.load()) == ["architecture"]
+
+
+def test_changed_inputs_discard_the_checkpoint(storage):
+    _interrupted_run(storage)
+    changed = dict(PROJECT, features="cart, checkout")
+    assert CheckpointStore(storage, FileRegistry(), changed).resume(ORDER, DEPENDENCIES) == {}
+
+
+def test_unreadable_checkpoints_are_ignored(storage):
+    checkpoints = _interrupted_run(storage)
+    storage.write(checkpoints.path, b"{not json")
+    assert CheckpointStore(storage, FileRegistry(), PROJECT).resume(ORDER, DEPENDENCIES) == {}
+
+
+def test_tasks_added_during_a_run_are_restored(storage):
+    registry = FileRegistry()
+    checkpoints = CheckpointStore(storage, registry, PROJECT)
+    _write(storage, registry, "architecture", "architecture.md", "# Design\n")
+    checkpoints.record("architecture", "designed", [])
+    _write(storage, registry, "implementation.pages", "pages/cart.py", "cart = []\n")
+    checkpoints.record("implementation.pages", "pages done", ["architecture"])
+
+    resumed = CheckpointStore(storage, FileRegistry(), PROJECT).resume(ORDER, DEPENDENCIES)
+
+    assert resumed == {"architecture": "designed", "implementation.pages": "pages done"}
+
+
+def test_a_file_rewritten_by_a_later_task_keeps_both_tasks(storage):
+    registry = FileRegistry()
+    checkpoints = CheckpointStore(storage, registry, PROJECT)
+    _write(storage, registry, "architecture", "README.md", "draft\n")
+    checkpoints.record("architecture", "designed", [])
+    time.sleep(0.01)
+    _write(storage, registry, "implementation", "README.md", "final\n")
+    checkpoints.record("implementation", "implemented", ["architecture"])
+
+    registry = FileRegistry()
+    resumed = CheckpointStore(storage, registry, PROJECT).resume(ORDER, DEPENDENCIES)
+
+    assert list(resumed) == ["architecture", "implementation"]
+    assert registry.get("README.md").task == "implementation"
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from crewai import Task
+
+import llm
+from agents import build_agent
+from delegation import DelegationBudgetExceeded, DelegationLimits
+from file_writer import FileRegistry, current_workspace, set_workspace
+from replay import final_answer_response, replay_llm_factory
+from scheduler import TaskScheduler
+
+
+def delegate_response(coworker: str, task: str) -> str:
+    action_input = json.dumps({"task": task, "context": "The project spec", "coworker": coworker})
+    return f"Thought: I need help.\nAction: Delegate work to coworker\nAction Input: {action_input}"
+
+
+@pytest.fixture
+def crew(tmp_path, monkeypatch):
+    """Architect and developer replaying a transcript in which the work goes back and forth."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(llm, "_llm_factory", None)
+    token = set_workspace(str(tmp_path), FileRegistry())
+    llm.set_llm_factory(replay_llm_factory({
+        "architect": [delegate_response("Senior Developer", "Implement the design"),
+                      final_answer_response("Design done")],
+        "developer": [delegate_response("Software Architect", "Review the implementation"),
+                      final_answer_response("Implementation done")],
+    }))
+    architect = build_agent("architect")
+    developer = build_agent("developer")
+    yield architect, developer
+    current_workspace.reset(token)
+
+
+def _scheduler(architect, developer, limits):
+    task = Task(description="Design the app", expected_output="The design", agent=architect)
+    return TaskScheduler({"architecture": task}, {}, agents=[architect, developer], delegation_limits=limits)
+
+
+def test_coworkers_delegate_further_within_the_depth_limit(crew):
+    architect, developer = crew
+    scheduler = _scheduler(architect, developer, DelegationLimits(max_depth=1, max_hops=6, max_cycles=2))
+
+    with pytest.raises(DelegationBudgetExceeded, match="depth 2 exceeds the limit of 1"):
+        scheduler.run()
+
+    # The developer's own delegation was rejected and neither agent got to its final answer
+    assert scheduler.delegation_stats["architecture"]["hops"] == 1
+    assert architect.llm.calls == 1
+    assert developer.llm.calls == 1
+
+
+def test_work_going_back_and_forth_stops_the_task(crew):
+    architect, developer = crew
+    scheduler = _scheduler(architect, developer, DelegationLimits(max_depth=3, max_hops=6, max_cycles=0))
+
+    with pytest.raises(DelegationBudgetExceeded, match="back and forth"):
+        scheduler.run()
+
+    assert architect.llm.calls == 1
+    assert developer.llm.calls == 1
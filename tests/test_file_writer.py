@@ -0,0 +1,122 @@
+import gc
+import threading
+import contextvars
+
+import pytest
+
+import file_writer
+from file_writer import (
+    FileRegistry, current_workspace, edit_file_content, save_chunk, save_file, set_workspace, short_hash
+)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    token = set_workspace(str(tmp_path), FileRegistry())
+    yield tmp_path
+    current_workspace.reset(token)
+
+
+def test_whitespace_chunks_are_kept_in_the_middle_of_a_file(workspace):
+    assert "send chunk 1" in save_chunk("notes.txt", 0, "first")
+    assert "send chunk 2" in save_chunk("notes.txt", 1, "\n\n")
+    assert "Created file" in save_chunk("notes.txt", 2, "last\n", is_last=True)
+
+    assert (workspace / "notes.txt").read_text() == "first\n\nlast\n"
+
+
+def test_empty_and_blank_chunks_are_rejected(workspace):
+    assert "is empty" in save_chunk("notes.txt", 0, "")
+    assert "send chunk 1" in save_chunk("notes.txt", 0, "  \n")
+    # The file would only hold whitespace
+    assert "is empty" in save_chunk("notes.txt", 1, "\n", is_last=True)
+    assert "Created file" in save_chunk("notes.txt", 1, "text", is_last=True)
+    assert (workspace / "notes.txt").read_text() == "  \ntext"
+
+
+def test_an_empty_last_chunk_completes_a_file(workspace):
+    save_chunk("notes.txt", 0, "all of it")
+    assert "Created file" in save_chunk("notes.txt", 1, "", is_last=True)
+    assert (workspace / "notes.txt").read_text() == "all of it"
+
+
+def test_concurrent_chunks_of_one_file_are_written_in_turn(workspace):
+    results = []
+
+    def write(chunk_index):
+        results.append(save_chunk("data.txt", chunk_index, f"chunk {chunk_index}\n" * 1000))
+
+    # Every thread sends chunk 0; exactly one of them writes it
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(write, 0)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    save_chunk("data.txt", 1, "end\n", is_last=True)
+
+    assert sum(result.startswith("Wrote chunk 0") for result in results) == 1
+    assert (workspace / "data.txt").read_text() == "chunk 0\n" * 1000 + "end\n"
+
+
+def test_file_locks_are_dropped_after_use(workspace):
+    for index in range(20):
+        save_chunk(f"file_{index}.txt", 0, "content", is_last=True)
+    gc.collect()
+    assert len(file_writer._file_locks) == 0
+
+
+def test_edits_apply_to_the_current_content(workspace):
+    save_file("notes.txt", "title\nbody\n")
+    seen = short_hash("notes.txt")
+
+    result = edit_file_content("notes.txt", "@@ -2 +2 @@\n-body\n+text\n", base_hash=seen)
+
+    assert result["status"] == "edited"
+    assert (workspace / "notes.txt").read_text() == "title\ntext\n"
+    assert result["hash"] == short_hash("notes.txt") != seen
+    # The old hash no longer matches the file
+    assert edit_file_content("notes.txt", "@@ -1 +1 @@\n-title\n+name\n", base_hash=seen)["status"] == "conflict"
+
+
+def test_writes_wait_for_an_edit_in_progress(workspace, monkeypatch):
+    save_file("notes.txt", "title\nbody\n")
+    apply_patch = file_writer.apply_patch
+    writer = threading.Thread(target=contextvars.copy_context().run,
+                              args=(save_file, "notes.txt", "rewritten\n"))
+
+    def patch_while_written(current, patch):
+        # The write starts between the edit's conflict check and its write
+        writer.start()
+        writer.join(timeout=0.2)
+        assert writer.is_alive()
+        return apply_patch(current, patch)
+
+    monkeypatch.setattr(file_writer, "apply_patch", patch_while_written)
+    result = edit_file_content("notes.txt", "@@ -2 +2 @@\n-body\n+text\n")
+    writer.join()
+    monkeypatch.setattr(file_writer, "apply_patch", apply_patch)
+
+    assert result["status"] == "edited"
+    # The write landed after the edit, and the registry matches the file
+    assert (workspace / "notes.txt").read_text() == "rewritten\n"
+    assert edit_file_content("notes.txt", "@@ -1 +1 @@\n-rewritten\n+final\n")["status"] == "edited"
+
+
+def test_edits_of_files_changed_outside_the_registry_conflict(workspace):
+    save_file("notes.txt", "title\n")
+    (workspace / "notes.txt").write_text("changed\n")
+
+    result = edit_file_content("notes.txt", "@@ -1 +1 @@\n-changed\n+title\n")
+
+    assert result["status"] == "conflict"
+    assert (workspace / "notes.txt").read_text() == "changed\n"
+
+
+def test_patches_that_do_not_apply_use_the_fallback_content(workspace):
+    save_file("notes.txt", "title\n")
+    patch = "@@ -1 +1 @@\n-missing\n+line\n"
+
+    assert edit_file_content("notes.txt", patch)["status"] == "failed"
+    assert edit_file_content("notes.txt", patch, fallback_content="rewritten\n")["status"] == "fallback"
+    assert (workspace / "notes.txt").read_text() == "rewritten\n"
+    assert edit_file_content("other.txt", patch)["status"] == "untracked"
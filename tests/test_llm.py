@@ -0,0 +1,163 @@
+import pytest
+from crewai.llms.base_llm import call_stop_override
+
+import llm
+from http_pool import HttpClientPool
+from llm import CrewLLM, create_llm
+from llm_cache import ResponseCache
+from model_router import ModelCandidate, ModelRouter
+from rate_limiter import RateLimiter
+from tracing import Tracer
+
+
+class FakeProvider:
+    """Stands in for the provider LLM crewai's LLM() would create."""
+
+    def __init__(self, responses=None, **kwargs):
+        self.kwargs = kwargs
+        self.responses = list(responses or [])
+        self.calls = []
+
+    def call(self, messages, tools=None, **kwargs):
+        self.calls.append(messages)
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return f"answer {len(self.calls)}"
+
+
+@pytest.fixture
+def providers(monkeypatch, tmp_path):
+    created = []
+
+    def fake_llm(**kwargs):
+        created.append(FakeProvider(**kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(llm, "LLM", fake_llm)
+    monkeypatch.setattr(llm, "response_cache", ResponseCache(cache_dir=str(tmp_path / "cache")))
+    monkeypatch.setattr(llm, "rate_limiter", RateLimiter(max_rpm=0))
+    monkeypatch.setattr(llm, "model_router", None)
+    monkeypatch.setattr(llm, "_llm_factory", None)
+    return created
+
+
+def test_create_llm_returns_the_caching_wrapper(providers):
+    agent_llm = create_llm("gpt-4o", namespace="developer", temperature=0.2)
+
+    assert isinstance(agent_llm, CrewLLM)
+    assert agent_llm.namespace == "developer"
+    # The provider LLM is only created when the first request is sent
+    assert providers == []
+
+
+def test_repeated_request_is_served_from_the_cache(providers):
+    agent_llm = create_llm("gpt-4o", namespace="developer", temperature=0.2)
+    messages = [{"role": "user", "content": "Build it"}]
+
+    assert agent_llm.call(messages) == "answer 1"
+    assert agent_llm.call(messages) == "answer 1"
+
+    assert len(providers) == 1
+    assert providers[0].kwargs == {"model": "gpt-4o", "temperature": 0.2}
+    assert len(providers[0].calls) == 1
+    assert agent_llm.call([{"role": "user", "content": "Test it"}]) == "answer 2"
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class RecordingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(max_rpm=0)
+        self.events = []
+
+    def acquire(self, key, tokens=0):
+        self.events.append(("acquire", key))
+        return super().acquire(key, tokens)
+
+    def report_rate_limited(self, key, retry_after=None):
+        self.events.append(("rate_limited", key))
+        return 0.0
+
+    def report_success(self, key):
+        self.events.append(("success", key))
+
+
+def test_requests_go_through_the_rate_limiter(providers, monkeypatch):
+    limiter = RecordingLimiter()
+    monkeypatch.setattr(llm, "rate_limiter", limiter)
+    agent_llm = create_llm("gpt-4o", namespace="developer")
+    agent_llm.provider_llm.responses = [RateLimitError("slow down"), "done"]
+
+    assert agent_llm.call("Build it") == "done"
+    assert limiter.events == [("acquire", "openai/gpt-4o"), ("rate_limited", "openai/gpt-4o"),
+                              ("acquire", "openai/gpt-4o"), ("success", "openai/gpt-4o")]
+
+
+def test_rate_limit_errors_are_retried_once_per_configured_retry(providers, monkeypatch):
+    monkeypatch.setattr(llm, "rate_limiter", RecordingLimiter())
+    monkeypatch.setattr(llm.config, "llm_max_retries", 1)
+    agent_llm = create_llm("gpt-4o", namespace="developer")
+    agent_llm.provider_llm.responses = [RateLimitError("slow down")] * 5
+
+    with pytest.raises(RateLimitError):
+        agent_llm.call("Build it")
+    # Not retried again by crewai's own rate limit retry around call()
+    assert len(agent_llm.provider_llm.calls) == 2
+
+
+def test_calls_are_traced_with_tokens_and_cost(providers, monkeypatch):
+    monkeypatch.setattr(llm, "tracer", Tracer())
+    agent_llm = create_llm("gpt-4o", namespace="developer")
+    messages = [{"role": "user", "content": "Build it"}]
+
+    agent_llm.call(messages)
+    agent_llm.call(messages)
+
+    first, second = llm.tracer.spans()
+    assert first["name"] == "llm:developer"
+    assert first["cat"] == "llm"
+    assert first["args"]["model"] == "gpt-4o"
+    assert first["args"]["prompt_tokens"] > 0
+    assert first["args"]["completion_tokens"] > 0
+    assert first["args"]["cost_usd"] > 0
+    assert first["args"]["cache_hit"] is False
+    assert second["args"]["cache_hit"] is True
+    assert "cost_usd" not in second["args"]
+
+
+def test_requests_are_sent_through_the_model_router(providers, monkeypatch):
+    sent = []
+
+    def call_fn(candidate, messages, tools=None, stop=None, **kwargs):
+        sent.append((candidate.name, stop))
+        return f"answer from {candidate.name}"
+
+    router = ModelRouter([ModelCandidate("openai", "gpt-4o-mini")], call_fn=call_fn)
+    monkeypatch.setattr(llm, "model_router", router)
+    agent_llm = create_llm("gpt-4o", namespace="developer")
+
+    with call_stop_override(agent_llm, ["\nObservation:"]):
+        assert agent_llm.call("Build it") == "answer from openai/gpt-4o-mini"
+
+    assert sent == [("openai/gpt-4o-mini", ["\nObservation:"])]
+    assert router.decisions[0]["model"] == "openai/gpt-4o-mini"
+    # The router's candidates replace the agent's own provider LLM
+    assert providers == []
+
+
+def test_agents_share_the_pooled_client_of_their_provider(monkeypatch):
+    pool = HttpClientPool(providers={"openai": {"api_key": "sk-test"}})
+    monkeypatch.setattr(llm, "http_clients", pool)
+    developer = CrewLLM(model="gpt-4o", namespace="developer")
+    tester = CrewLLM(model="gpt-4o-mini", namespace="tester")
+
+    client = developer.provider_llm._client
+    assert client is pool.llm_client("openai")
+    assert tester.provider_llm._client is client
+    assert client._client is pool.http_client("openai")
+    pool.close()
@@ -0,0 +1,105 @@
+import pytest
+
+import llm_cache
+from llm_cache import ResponseCache, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(cache_dir=str(tmp_path / "cache"), **kwargs)
+
+
+def test_keys_ignore_insignificant_differences():
+    key = make_cache_key("developer", "gpt-4o", 0.2, ["b", "a"], [{"role": "user", "content": "Build it  \r\nnow"}])
+
+    assert key == make_cache_key("developer", "gpt-4o", 0.2, ["a", "b"], [{"role": "user", "content": "Build it\nnow"}])
+    assert key == make_cache_key("developer", "gpt-4o", 0.2, ["a", "b"], "Build it\nnow\n")
+    assert key != make_cache_key("tester", "gpt-4o", 0.2, ["a", "b"], "Build it\nnow")
+    assert key != make_cache_key("developer", "gpt-4o", 0.7, ["a", "b"], "Build it\nnow")
+    assert key != make_cache_key("developer", "gpt-4o", 0.2, ["a"], "Build it\nnow")
+
+
+def test_responses_persist_across_instances(tmp_path):
+    _cache(tmp_path).put("key", "response")
+
+    cache = _cache(tmp_path)
+    assert cache.get("key") == "response"
+    assert cache.get("other") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put("key", "response")
+
+    clock.now += 59
+    assert cache.get("key") == "response"
+    clock.now += 2
+    assert cache.get("key") is None
+    # The expired entry was deleted, not just hidden
+    assert _cache(tmp_path).get("key") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = _cache(tmp_path, max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.put(key, key * 10)
+        clock.now += 1
+    cache.get("a")
+    clock.now += 1
+
+    cache.put("d", "d" * 10)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a" * 10, "c" * 10, "d" * 10]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_responses_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = _cache(tmp_path, max_bytes=10)
+    cache.put("key", "x" * 11)
+    assert cache.get("key") is None
+    assert cache.stats()["stores"] == 0
+
+
+def test_readonly_mode_serves_but_never_writes(tmp_path, clock):
+    _cache(tmp_path, ttl=60).put("key", "response")
+    cache = _cache(tmp_path, ttl=60, mode="readonly")
+
+    cache.put("new", "response")
+    assert cache.get("new") is None
+    assert cache.get("key") == "response"
+    clock.now += 120
+    assert cache.get("key") is None
+    # Read-only lookups leave expired entries in place
+    row = cache._connection().execute("SELECT COUNT(*) FROM responses").fetchone()
+    assert row[0] == 1
+
+
+def test_off_mode_disables_the_cache(tmp_path):
+    _cache(tmp_path).put("key", "response")
+    cache = _cache(tmp_path, mode="off")
+
+    assert not cache.enabled
+    assert cache.get("key") is None
+    cache.put("other", "response")
+    assert cache.stats()["misses"] == 0 and cache.stats()["stores"] == 0
+
+
+def test_unknown_modes_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        _cache(tmp_path, mode="write")
@@ -0,0 +1,71 @@
+from module_plan import folder_structure_paths, plan_modules
+
+TREE = """# Architecture
+
+The app is started with `streamlit run app.py`.
+
+```
+inventory/
+├── app.py                  # Streamlit entry point
+├── requirements.txt
+├── README.md
+├── Dockerfile
+├── pages/
+│   ├── 1_Products.py       # Product list
+│   └── 2_Orders.py         # Order list
+├── utils/
+│   ├── db.py               # SQLite access
+│   └── auth.py
+└── tests/
+    └── test_db.py
+```
+
+## Components
+- `utils/db.py` wraps every query of the app.
+"""
+
+
+def test_folder_tree_paths_strip_the_enclosing_directory():
+    assert folder_structure_paths(TREE) == [
+        "app.py", "requirements.txt", "README.md", "Dockerfile", "pages/1_Products.py", "pages/2_Orders.py",
+        "utils/db.py", "utils/auth.py", "tests/test_db.py"
+    ]
+
+
+def test_indented_trees_without_glyphs():
+    document = "```\nsrc/\n    main.py\n    models/\n        user.py\n```\n"
+    assert folder_structure_paths(document) == ["main.py", "models/user.py"]
+
+
+def test_words_in_code_blocks_are_not_files():
+    document = "```\nproject\n    main\n    app\n    run.py\n    core/\n        engine.py\n```\n```\nmain\napp\n```\n"
+    assert folder_structure_paths(document) == ["run.py", "core/engine.py"]
+
+
+def test_modules_group_implementation_files_by_top_level_directory():
+    modules = plan_modules(TREE)
+
+    assert [(module.name, module.files) for module in modules] == [
+        ("app", ["app.py", "requirements.txt", "Dockerfile"]),
+        ("pages", ["pages/1_Products.py", "pages/2_Orders.py"]),
+        ("utils", ["utils/db.py", "utils/auth.py"]),
+    ]
+    utils = modules[2]
+    assert utils.descriptions["utils/db.py"] == "SQLite access"
+    assert utils.descriptions["utils/auth.py"] == ""
+    assert modules[0].descriptions["app.py"] == "Streamlit entry point"
+
+
+def test_smallest_modules_are_merged_down_to_the_limit():
+    modules = plan_modules(TREE, max_modules=2)
+
+    assert [module.name for module in modules] == ["app", "pages_utils"]
+    assert sum(len(module.files) for module in modules) == 7
+
+
+def test_backticked_paths_are_used_without_a_tree():
+    document = "Files: `main.py`, `api/routes.py` and `api/models.py`, docs in `README.md`."
+
+    assert [(module.name, module.files) for module in plan_modules(document)] == [
+        ("api", ["api/routes.py", "api/models.py"]), ("app", ["main.py"])
+    ]
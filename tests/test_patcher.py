@@ -0,0 +1,96 @@
+import pytest
+
+from patcher import PatchError, apply_patch, apply_unified_diff, parse_edit_blocks
+
+SOURCE = """import os
+
+
+def load(path):
+    with open(path) as f:
+        return f.read()
+
+
+def save(path, data):
+    with open(path, "w") as f:
+        f.write(data)
+"""
+
+
+def _block(search, replace):
+    return f"<<<<<<< SEARCH\n{search}=======\n{replace}>>>>>>> REPLACE\n"
+
+
+def test_edit_blocks_replace_their_search_text():
+    patch = "Change both functions:\n" + _block("        return f.read()\n", "        return f.read().strip()\n") + \
+        _block('    with open(path, "w") as f:\n', '    with open(path, "w", encoding="utf-8") as f:\n')
+
+    patched = apply_patch(SOURCE, patch)
+
+    assert "return f.read().strip()" in patched
+    assert 'open(path, "w", encoding="utf-8")' in patched
+    assert patched.count("\n") == SOURCE.count("\n")
+
+
+def test_edit_blocks_tolerate_trailing_whitespace():
+    patched = apply_patch(SOURCE, _block("def load(path):   \n", "def load(path, mode='r'):\n"))
+    assert "def load(path, mode='r'):\n    with open" in patched
+
+
+def test_an_empty_search_text_appends():
+    patched = apply_patch("x = 1", _block("", "y = 2\n"))
+    assert patched == "x = 1\ny = 2\n"
+
+
+def test_edit_blocks_reject_missing_and_ambiguous_search_text():
+    with pytest.raises(PatchError, match="not found"):
+        apply_patch(SOURCE, _block("def remove(path):\n", "def delete(path):\n"))
+    with pytest.raises(PatchError, match="occurs 2 times"):
+        apply_patch(SOURCE, _block(" as f:\n", " as handle:\n"))
+
+
+def test_unterminated_edit_blocks_are_rejected():
+    with pytest.raises(PatchError, match="not terminated"):
+        parse_edit_blocks("<<<<<<< SEARCH\nold\n=======\nnew\n")
+
+
+def test_unified_diffs_apply_their_hunks():
+    diff = """--- a/store.py
++++ b/store.py
+@@ -1,3 +1,4 @@
+ import os
++import json
+ 
+ 
+@@ -9,3 +10,3 @@
+ def save(path, data):
+-    with open(path, "w") as f:
++    with open(path, "w", encoding="utf-8") as f:
+         f.write(data)
+"""
+    patched = apply_patch(SOURCE, diff)
+
+    assert patched.startswith("import os\nimport json\n\n\ndef load")
+    assert 'open(path, "w", encoding="utf-8")' in patched
+    assert patched.endswith("f.write(data)\n")
+
+
+def test_hunks_with_wrong_line_numbers_apply_where_their_context_matches():
+    diff = "@@ -40,2 +40,2 @@\n def load(path):\n-    with open(path) as f:\n+    with open(path, 'rb') as f:\n"
+    assert "with open(path, 'rb') as f:\n        return f.read()" in apply_patch(SOURCE, diff)
+
+
+def test_a_missing_final_newline_is_kept():
+    assert apply_patch("a\nb", "@@ -2 +2 @@\n-b\n+c\n") == "a\nc"
+
+
+def test_hunks_that_do_not_match_are_rejected():
+    diff = "@@ -5,2 +5,2 @@\n def load(path):\n-    with open(path, 'rb') as f:\n+    with open(path) as f:\n"
+    with pytest.raises(PatchError, match="hunk 1"):
+        apply_patch(SOURCE, diff)
+
+
+def test_unknown_patch_formats_are_rejected():
+    with pytest.raises(PatchError, match="expected"):
+        apply_patch(SOURCE, "replace load with read")
+    with pytest.raises(PatchError, match="no @@ hunks"):
+        apply_unified_diff(SOURCE, "--- a/x\n+++ b/x\n")
@@ -0,0 +1,106 @@
+import time
+import multiprocessing
+
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter, FileLockBackend, _new_state, _refill, _reserve
+
+
+def test_buckets_refill_over_time_up_to_the_limit():
+    state = _new_state(0.0, 60, 6000)
+    for _ in range(60):
+        assert _reserve(state, 0.0, 100, 60, 6000) == 0.0
+
+    # Both buckets are empty, one request and 100 tokens come back every second
+    assert _reserve(state, 0.0, 100, 60, 6000) == pytest.approx(1.0)
+    _refill(state, 30.0, 60, 6000)
+    assert state["requests"] == pytest.approx(29.0)
+    assert state["tokens"] == pytest.approx(2900.0)
+    _refill(state, 600.0, 60, 6000)
+    assert state["requests"] == 60
+    assert state["tokens"] == 6000
+
+
+def test_token_bucket_delays_large_requests():
+    state = _new_state(0.0, 0, 1200)
+
+    assert _reserve(state, 0.0, 1000, 0, 1200) == 0.0
+    # 800 tokens short at 20 tokens per second
+    assert _reserve(state, 0.0, 1000, 0, 1200) == pytest.approx(40.0)
+    # Larger than the whole bucket: taken as one full bucket
+    assert _reserve(_new_state(0.0, 0, 1200), 0.0, 5000, 0, 1200) == pytest.approx(0.0)
+
+
+def test_acquire_sleeps_for_the_deficit(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    limiter = RateLimiter(max_rpm=2)
+
+    assert limiter.acquire("openai/gpt-4o") == 0.0
+    assert limiter.acquire("openai/gpt-4o") == 0.0
+    assert limiter.acquire("openai/gpt-4o") == pytest.approx(30.0, abs=0.1)
+    # Keys are limited independently
+    assert limiter.acquire("anthropic/claude-3-opus") == 0.0
+    assert sleeps == [pytest.approx(30.0, abs=0.1)]
+    assert limiter.metrics()["openai/gpt-4o"]["delayed"] == 1
+
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter(max_rpm=0)
+    assert not limiter.enabled
+    assert all(limiter.acquire("openai/gpt-4o", 10 ** 6) == 0.0 for _ in range(100))
+
+
+def test_reconcile_returns_unused_completion_tokens():
+    limiter = RateLimiter(max_rpm=0, max_tpm=6000)
+
+    limiter.acquire("openai/gpt-4o", 5000)
+    limiter.reconcile("openai/gpt-4o", 5000, 1200)
+    tokens = limiter.backend.update("openai/gpt-4o", 0, 6000, lambda state: state["tokens"])
+    assert tokens == pytest.approx(4800, abs=5)
+    assert limiter.metrics()["openai/gpt-4o"]["tokens"] == 1200
+
+    # A response larger than reserved is taken from the bucket
+    limiter.reconcile("openai/gpt-4o", 0, 4800)
+    tokens = limiter.backend.update("openai/gpt-4o", 0, 6000, lambda state: state["tokens"])
+    assert tokens == pytest.approx(0, abs=5)
+
+
+def test_rate_limited_key_is_blocked_and_slowed(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    limiter = RateLimiter(max_rpm=60)
+
+    assert limiter.report_rate_limited("openai/gpt-4o", retry_after=5.0) == 5.0
+    assert limiter.acquire("openai/gpt-4o") == pytest.approx(5.0, abs=0.1)
+    factor = limiter.backend.update("openai/gpt-4o", 60, 0, lambda state: state["rate_factor"])
+    assert factor == 0.5
+    limiter.report_success("openai/gpt-4o")
+    factor = limiter.backend.update("openai/gpt-4o", 60, 0, lambda state: state["rate_factor"])
+    assert factor == pytest.approx(0.55)
+
+
+def _acquire_in_process(state_dir, count):
+    limiter = RateLimiter(max_rpm=6, backend=FileLockBackend(state_dir))
+    rate_limiter.time.sleep = lambda seconds: None
+    for _ in range(count):
+        limiter.acquire("openai/gpt-4o")
+
+
+def test_file_lock_backend_shares_buckets_across_processes(tmp_path):
+    processes = [
+        multiprocessing.get_context("spawn").Process(target=_acquire_in_process, args=(str(tmp_path), 20))
+        for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    backend = FileLockBackend(str(tmp_path))
+    requests = backend.update("openai/gpt-4o", 6, 0, lambda state: state["requests"])
+    # 60 reservations from a bucket of 6, none lost to concurrent updates, plus a little refill
+    assert -54.0 <= requests < -50.0
+    assert list(tmp_path.iterdir()) == [tmp_path / "openai__gpt-4o.json"]
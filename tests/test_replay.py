@@ -0,0 +1,35 @@
+import pytest
+from crewai import Task
+
+import llm
+from agents import build_agent
+from file_writer import FileRegistry, current_workspace, set_workspace
+from replay import ReplayLLM, final_answer_response, replay_llm_factory, tool_call_response
+from scheduler import TaskScheduler
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(llm, "_llm_factory", None)
+    token = set_workspace(str(tmp_path), FileRegistry())
+    yield tmp_path
+    current_workspace.reset(token)
+
+
+def test_replayed_crew_runs_end_to_end_without_an_api_key(workspace):
+    llm.set_llm_factory(replay_llm_factory({
+        "developer": [
+            tool_call_response("app.py", "print('hello')\n"),
+            final_answer_response("Created app.py"),
+        ]
+    }))
+    agent = build_agent("developer", allow_delegation=False)
+    task = Task(description="Write app.py", expected_output="The created files", agent=agent)
+
+    outputs = TaskScheduler({"implementation": task}, {}, agents=[agent]).run()
+
+    assert isinstance(agent.llm, ReplayLLM)
+    assert agent.llm.calls == 2
+    assert "Created app.py" in str(outputs["implementation"])
+    assert (workspace / "app.py").read_text() == "print('hello')\n"
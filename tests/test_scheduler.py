@@ -0,0 +1,248 @@
+import time
+import threading
+
+import pytest
+
+from scheduler import TaskScheduler, CONTEXT_DIVIDER
+from task_factory import TaskFactory
+from tracing import RunCancelled
+
+ARCHITECTURE = """# Architecture
+
+```
+shop/
+├── app.py          # Streamlit entry point
+├── pages/
+│   └── cart.py     # Shopping cart page
+├── utils/
+│   └── db.py       # SQLite helpers
+└── components/
+    └── card.py     # Product card
+```
+"""
+
+
+class FakeAgent:
+    def __init__(self, role):
+        self.role = role
+        self.tools = []
+        self.allow_delegation = False
+
+
+class FakeTask:
+    """Stands in for a crewai Task, recording when it ran."""
+
+    def __init__(self, description="", expected_output="", agent=None, context=None, duration=0.05, error=None):
+        self.description = description
+        self.expected_output = expected_output
+        self.agent = agent
+        self.context = context or []
+        self.duration = duration
+        self.error = error
+        self.runs = []
+
+    def execute_sync(self, agent, context=None, tools=None):
+        started = time.perf_counter()
+        time.sleep(self.duration)
+        if self.error is not None:
+            raise self.error
+        self.runs.append((started, time.perf_counter(), context))
+        return f"output of {self.description[:40]}"
+
+
+def _span(task):
+    return task.runs[0][0], task.runs[0][1]
+
+
+def _overlap(first, second):
+    (start_a, end_a), (start_b, end_b) = _span(first), _span(second)
+    return start_a < end_b and start_b < end_a
+
+
+def _tasks(*task_ids, **options):
+    """Return fake tasks, each on its own agent so they may run concurrently."""
+    return {task_id: FakeTask(description=task_id, agent=FakeAgent(task_id), **options) for task_id in task_ids}
+
+
+DEPENDENCIES = {"architecture": [], "implementation": ["architecture"],
+                "testing": ["implementation"], "readme": ["implementation"]}
+
+
+def test_tasks_run_after_their_dependencies():
+    tasks = _tasks("architecture", "implementation", "testing", "readme")
+    events = []
+    scheduler = TaskScheduler(tasks, DEPENDENCIES, max_workers=2, listener=lambda *event: events.append(event))
+
+    outputs = scheduler.run()
+
+    assert list(outputs) == ["architecture", "implementation", "testing", "readme"]
+    assert _span(tasks["implementation"])[0] >= _span(tasks["architecture"])[1]
+    assert _span(tasks["testing"])[0] >= _span(tasks["implementation"])[1]
+    # Independent tasks run at the same time
+    assert _overlap(tasks["testing"], tasks["readme"])
+    # A task gets the outputs of its dependencies as context
+    assert tasks["testing"].runs[0][2] == outputs["implementation"]
+    assert events[:2] == [("started", "architecture"), ("finished", "architecture")]
+    assert sorted(events) == sorted((event, task_id) for task_id in tasks for event in ("started", "finished"))
+
+
+def test_context_joins_the_outputs_of_several_dependencies():
+    tasks = _tasks("a", "b", "c")
+    outputs = TaskScheduler(tasks, {"c": ["a", "b"]}).run()
+    assert tasks["c"].runs[0][2] == CONTEXT_DIVIDER.join([outputs["a"], outputs["b"]])
+
+
+def test_max_workers_limits_concurrent_tasks():
+    tasks = _tasks("a", "b", "c")
+    TaskScheduler(tasks, {}, max_workers=1).run()
+    assert not any(_overlap(tasks[a], tasks[b]) for a in tasks for b in tasks if a != b)
+
+
+def test_tasks_of_one_agent_never_run_at_the_same_time():
+    agent = FakeAgent("developer")
+    tasks = {task_id: FakeTask(description=task_id, agent=agent) for task_id in ("a", "b")}
+    TaskScheduler(tasks, {}, max_workers=2).run()
+    assert not _overlap(tasks["a"], tasks["b"])
+
+
+def test_completed_tasks_are_not_run_again():
+    tasks = _tasks("architecture", "implementation", "testing", "readme")
+    scheduler = TaskScheduler(tasks, DEPENDENCIES, completed={"architecture": "restored design"})
+
+    outputs = scheduler.run()
+
+    assert outputs["architecture"] == "restored design"
+    assert not tasks["architecture"].runs
+    assert tasks["implementation"].runs[0][2] == "restored design"
+
+
+def test_checkpoint_receives_every_finished_task():
+    tasks = _tasks("architecture", "implementation", "testing", "readme")
+    saved = {}
+    outputs = TaskScheduler(tasks, DEPENDENCIES, checkpoint=saved.__setitem__).run()
+    assert saved == dict(outputs)
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown task"):
+        TaskScheduler(_tasks("a"), {"a": ["missing"]})
+    with pytest.raises(ValueError, match="cycle"):
+        TaskScheduler(_tasks("a", "b"), {"a": ["b"], "b": ["a"]})
+
+
+def test_a_failed_task_stops_the_run():
+    tasks = _tasks("architecture", "implementation", "testing", "readme")
+    tasks["implementation"].error = RuntimeError("model unavailable")
+    events = []
+    scheduler = TaskScheduler(tasks, DEPENDENCIES, listener=lambda *event: events.append(event))
+
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        scheduler.run()
+
+    assert ("failed", "implementation") in events
+    assert not tasks["testing"].runs and not tasks["readme"].runs
+
+
+def test_cancellation_waits_for_running_tasks_and_stops_the_run():
+    cancel = threading.Event()
+    tasks = _tasks("architecture", "implementation", "testing", "readme", duration=0.3)
+    scheduler = TaskScheduler(tasks, DEPENDENCIES, cancel_event=cancel,
+                              listener=lambda event, task_id: task_id == "implementation" and cancel.set())
+
+    with pytest.raises(RunCancelled):
+        scheduler.run()
+
+    # The running task finished, its dependents never started
+    assert tasks["implementation"].runs
+    assert not tasks["testing"].runs and not tasks["readme"].runs
+
+
+def test_a_cancelled_run_starts_no_task():
+    cancel = threading.Event()
+    cancel.set()
+    tasks = _tasks("architecture", "implementation")
+    with pytest.raises(RunCancelled):
+        TaskScheduler(tasks, DEPENDENCIES, cancel_event=cancel).run()
+    assert not tasks["architecture"].runs
+
+
+class FakeTaskFactory(TaskFactory):
+    def _create_task(self, **kwargs):
+        return FakeTask(**kwargs)
+
+
+def _factory():
+    agents = {name: FakeAgent(name) for name in ("architect", "developer", "tester")}
+    factory = FakeTaskFactory(agents, {
+        "project_name": "Shop", "project_description": "A web shop", "features": "cart",
+        "technology_stack": "Streamlit", "project_type": "custom"
+    }, agent_factory=lambda name: FakeAgent(name))
+    factory.create_tasks()
+    return factory
+
+
+def _expanding_scheduler(factory, **kwargs):
+    def expander(task_id, output):
+        return factory.expand_implementation(ARCHITECTURE) if task_id == "architecture" else None
+    return TaskScheduler(factory.tasks, factory.get_dependencies(), expander=expander, **kwargs)
+
+
+def test_expander_inserts_module_subtasks_before_the_integration():
+    factory = _factory()
+    scheduler = _expanding_scheduler(factory, max_workers=1, expansion_workers=4)
+
+    outputs = scheduler.run()
+
+    modules = ["implementation.app", "implementation.components", "implementation.pages", "implementation.utils"]
+    assert list(outputs) == ["architecture"] + modules + ["implementation", "testing", "readme"]
+    subtasks = [scheduler.tasks[task_id] for task_id in modules]
+    # The module subtasks ran at the same time, on their own workers beyond max_workers=1
+    assert all(_overlap(subtasks[0], other) for other in subtasks[1:])
+    integration = scheduler.tasks["implementation"]
+    assert all(_span(integration)[0] >= _span(subtask)[1] for subtask in subtasks)
+    assert len({id(task.agent) for task in subtasks}) == len(subtasks)
+
+
+def test_expansion_keeps_the_implementation_task_object():
+    factory = _factory()
+    original = factory.tasks["implementation"]
+
+    added, dependencies = factory.expand_implementation(ARCHITECTURE)
+
+    # Downstream contexts built by create_tasks() still point at the task that now integrates
+    assert added["implementation"] is original
+    assert factory.tasks["testing"].context == [original]
+    assert factory.tasks["readme"].context == [original]
+    assert "Integrate the modules" in original.description
+    assert original.context == [task for task_id, task in added.items() if task_id != "implementation"]
+    assert dependencies["implementation"] == [task_id for task_id in added if task_id != "implementation"]
+    assert dependencies["implementation.pages"] == ["architecture"]
+
+
+def test_expansion_workers_default_to_the_shared_limit():
+    factory = _factory()
+    scheduler = _expanding_scheduler(factory, max_workers=1)
+
+    scheduler.run()
+
+    subtasks = [task for task_id, task in scheduler.tasks.items() if task_id.startswith("implementation.")]
+    assert not any(_overlap(a, b) for a in subtasks for b in subtasks if a is not b)
+
+
+def test_expansion_is_dropped_when_the_implementation_already_ran():
+    factory = _factory()
+    scheduler = _expanding_scheduler(factory, completed={"architecture": "done", "implementation": "done"})
+
+    outputs = scheduler.run()
+
+    assert list(outputs) == ["architecture", "implementation", "testing", "readme"]
+
+
+def test_expansion_of_a_completed_architecture_runs_the_subtasks():
+    factory = _factory()
+    scheduler = _expanding_scheduler(factory, completed={"architecture": "done"})
+
+    outputs = scheduler.run()
+
+    assert "implementation.pages" in outputs
+    assert not factory.tasks["architecture"].runs
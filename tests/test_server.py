@@ -0,0 +1,71 @@
+import json
+import asyncio
+from http import HTTPStatus
+
+import pytest
+
+from server import Job, JobManager, JobServer, parse_tokens
+
+
+def test_parse_tokens():
+    assert parse_tokens("alice:t1, t2 ,bob:t3") == {"t1": "alice", "t2": "default", "t3": "bob"}
+    assert parse_tokens("") == {}
+    with pytest.raises(ValueError):
+        parse_tokens("../x:t1")
+
+
+def test_server_requires_a_token(tmp_path):
+    with pytest.raises(ValueError):
+        JobServer(JobManager(str(tmp_path)), {})
+
+
+@pytest.fixture
+def server(tmp_path):
+    manager = JobManager(str(tmp_path))
+    for job_id, tenant in (("a1", "alice"), ("b1", "bob")):
+        manager.jobs[job_id] = Job(id=job_id, project_info={"project_name": job_id},
+                                   output_dir=str(tmp_path / tenant / job_id), tenant=tenant)
+    return JobServer(manager, {"alice-token": "alice", "bob-token": "bob"})
+
+
+def test_authenticate(server):
+    assert server._authenticate("Bearer alice-token") == "alice"
+    assert server._authenticate("bearer bob-token") == "bob"
+    assert server._authenticate("Bearer wrong") is None
+    assert server._authenticate("alice-token") is None
+    assert server._authenticate("") is None
+
+
+def test_tenants_only_see_their_own_jobs(server):
+    status, payload = server._route("GET", "/jobs", b"", "alice")
+    assert status == HTTPStatus.OK
+    assert [job["id"] for job in payload["jobs"]] == ["a1"]
+
+    assert server._route("GET", "/jobs/a1", b"", "alice")[0] == HTTPStatus.OK
+    assert server._route("GET", "/jobs/b1", b"", "alice")[0] == HTTPStatus.NOT_FOUND
+    assert server._route("GET", "/jobs/b1/progress", b"", "alice")[0] == HTTPStatus.NOT_FOUND
+    assert server._route("POST", "/jobs/b1/cancel", b"", "alice")[0] == HTTPStatus.NOT_FOUND
+    assert not server.manager.jobs["b1"].cancel_event.is_set()
+
+
+def test_unauthenticated_requests_are_refused(server):
+    async def request(headers: str) -> bytes:
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(f"GET /jobs HTTP/1.1\r\n{headers}Connection: close\r\n\r\n".encode("latin-1"))
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            server._server.close()
+            await server.manager.stop()
+
+    server.port = 0
+    response = asyncio.run(request(""))
+    assert response.startswith(b"HTTP/1.1 401")
+    assert b"WWW-Authenticate: Bearer" in response
+
+    response = asyncio.run(request("Authorization: Bearer bob-token\r\n"))
+    assert response.startswith(b"HTTP/1.1 200")
+    assert [job["id"] for job in json.loads(response.split(b"\r\n\r\n", 1)[1])["jobs"]] == ["b1"]
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from spec_index import SpecIndex, minhash, shingles, similarity, prepare_prior_architecture
+
+SPEC = {
+    "project_description": "A task tracker web app where teams create boards, lists and cards",
+    "features": "drag and drop cards, due dates, comments, user accounts",
+    "technology_stack": "Streamlit with SQLite",
+}
+NEAR_DUPLICATE = dict(SPEC, features=SPEC["features"] + ", labels")
+UNRELATED = {
+    "project_description": "Command line tool that converts audio files between formats",
+    "features": "batch conversion, progress bar, metadata copy",
+    "technology_stack": "Python with ffmpeg",
+}
+
+
+def test_similarity_of_signatures():
+    signature = minhash(shingles(SPEC))
+
+    assert similarity(signature, minhash(shingles(dict(SPEC)))) == 1.0
+    assert similarity(signature, minhash(shingles(NEAR_DUPLICATE))) >= 0.8
+    assert similarity(signature, minhash(shingles(UNRELATED))) < 0.2
+
+
+def _project(tmp_path, tenant, name, info, index):
+    project_dir = tmp_path / tenant / name
+    project_dir.mkdir(parents=True)
+    (project_dir / "architecture.md").write_text(f"# Architecture of {name}\n")
+    (project_dir / "ui-design.md").write_text(f"# UI of {name}\n")
+    index.add(info, str(project_dir))
+    return str(project_dir)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SpecIndex(str(tmp_path / "index.sqlite"))
+
+
+def test_find_similar_applies_the_threshold(tmp_path, index):
+    similar_dir = _project(tmp_path, "alice", "similar", NEAR_DUPLICATE, index)
+    _project(tmp_path, "alice", "unrelated", UNRELATED, index)
+
+    matches = index.find_similar(SPEC, threshold=0.6)
+    assert [project_dir for _, project_dir, _ in matches] == [similar_dir]
+    assert index.find_similar(SPEC, threshold=1.0) == []
+    assert index.find_similar(SPEC, threshold=0.6, exclude_dir=similar_dir) == []
+
+
+def test_lookups_stay_within_their_scope(tmp_path, index):
+    _project(tmp_path, "bob", "other_tenant", SPEC, index)
+
+    assert index.find_similar(SPEC, 0.6, scope=str(tmp_path / "alice")) == []
+    assert len(index.find_similar(SPEC, 0.6, scope=str(tmp_path / "bob"))) == 1
+
+
+def _prepare(tmp_path, index, reuse_threshold):
+    root = tmp_path / "alice" / "new_project"
+    root.mkdir(parents=True)
+    written = {}
+    reference, completed = prepare_prior_architecture(
+        index, SPEC, offer_threshold=0.6, reuse_threshold=reuse_threshold,
+        save_file=lambda name, content: written.setdefault(name, content), root=str(root))
+    return root, reference, completed, written
+
+
+def test_documents_are_only_offered_unless_reuse_is_enabled(tmp_path, index):
+    _project(tmp_path, "alice", "earlier", SPEC, index)
+
+    root, reference, completed, written = _prepare(tmp_path, index, reuse_threshold=None)
+
+    assert completed == {} and written == {}
+    assert reference["similarity"] == 1.0
+    assert (root / "project_config" / "reference" / "architecture.md").read_text() == "# Architecture of earlier\n"
+
+
+def test_reuse_copies_the_documents_as_the_architecture_output(tmp_path, index):
+    _project(tmp_path, "alice", "earlier", SPEC, index)
+
+    _, reference, completed, written = _prepare(tmp_path, index, reuse_threshold=0.9)
+
+    assert reference is None
+    assert list(completed) == ["architecture"]
+    assert written["architecture.md"] == "# Architecture of earlier\n"
+
+
+def test_other_tenants_projects_are_never_offered(tmp_path, index):
+    _project(tmp_path, "bob", "earlier", SPEC, index)
+
+    root, reference, completed, written = _prepare(tmp_path, index, reuse_threshold=0.9)
+
+    assert (reference, completed, written) == (None, {}, {})
+    assert not os.path.exists(root / "project_config")
@@ -0,0 +1,130 @@
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from storage import DiskStorage, MemoryStorage, write_archive
+
+
+@pytest.fixture(params=["disk", "memory"])
+def storage(request, tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    if request.param == "disk":
+        yield DiskStorage(str(root))
+    else:
+        memory = MemoryStorage(str(root))
+        yield memory
+        memory.close()
+
+
+@pytest.mark.parametrize("relpath", ["../escaped.txt", "a/../../escaped.txt", "/../escaped.txt"])
+def test_paths_outside_the_root_are_rejected(storage, tmp_path, relpath):
+    assert not storage.contains(relpath)
+    with pytest.raises(ValueError):
+        storage.write(relpath, b"x")
+    assert not (tmp_path / "escaped.txt").exists()
+
+
+def test_disk_storage_rejects_symlinks_out_of_the_root(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "link").symlink_to(tmp_path)
+    storage = DiskStorage(str(root))
+
+    assert not storage.contains("link/escaped.txt")
+    with pytest.raises(ValueError):
+        storage.write("link/escaped.txt", b"x")
+    with pytest.raises(ValueError):
+        storage.write_from("link/escaped.txt", str(tmp_path / "missing"))
+    assert not (tmp_path / "escaped.txt").exists()
+
+
+def test_paths_inside_the_root_are_written(storage):
+    storage.write("pkg/../app.py", b"print(1)\n")
+
+    assert storage.contains("pkg/module.py")
+    assert storage.read("app.py") == b"print(1)\n"
+
+
+def _spill_files(tmp_path):
+    return sorted(path.name for path in tmp_path.glob("crew_spill_*/*.spill"))
+
+
+def test_large_files_are_spilled_to_disk(tmp_path):
+    storage = MemoryStorage(str(tmp_path / "project"), spill_threshold=100, spill_dir=str(tmp_path))
+
+    storage.write("small.txt", b"x" * 100)
+    storage.write("large.bin", b"y" * 101)
+
+    assert storage.metrics() == {"files": 2, "memory_bytes": 100, "spilled_files": 1}
+    assert len(_spill_files(tmp_path)) == 1
+    assert storage.read("large.bin") == b"y" * 101
+    assert storage.stat("large.bin")[0] == 101
+    # Nothing is written below the virtual root
+    assert not (tmp_path / "project").exists()
+
+
+def test_largest_files_are_spilled_over_the_memory_limit(tmp_path):
+    storage = MemoryStorage(str(tmp_path / "project"), memory_limit=250, spill_dir=str(tmp_path))
+
+    storage.write("a.txt", b"a" * 100)
+    storage.write("b.txt", b"b" * 120)
+    storage.write("c.txt", b"c" * 80)
+
+    assert storage.metrics()["memory_bytes"] == 180
+    assert len(_spill_files(tmp_path)) == 1
+    assert [storage.read(name) for name in ("a.txt", "b.txt", "c.txt")] == [b"a" * 100, b"b" * 120, b"c" * 80]
+
+
+def test_overwriting_a_spilled_file_removes_its_spill_file(tmp_path):
+    storage = MemoryStorage(str(tmp_path / "project"), spill_threshold=10, spill_dir=str(tmp_path))
+    storage.write("data.bin", b"z" * 50)
+
+    storage.write("data.bin", b"small")
+
+    assert _spill_files(tmp_path) == []
+    assert storage.read("data.bin") == b"small"
+
+
+def test_staged_files_are_taken_over(tmp_path):
+    storage = MemoryStorage(str(tmp_path / "project"), spill_threshold=10, spill_dir=str(tmp_path))
+    staged = os.path.join(storage.staging_dir(), "upload.part")
+    os.makedirs(os.path.dirname(staged))
+    with open(staged, "wb") as f:
+        f.write(b"w" * 50)
+
+    storage.write_from("big.bin", staged)
+
+    assert not os.path.exists(staged)
+    assert storage.read("big.bin") == b"w" * 50
+    assert storage.metrics()["spilled_files"] == 1
+
+
+def test_close_removes_the_spill_directory(tmp_path):
+    storage = MemoryStorage(str(tmp_path / "project"), spill_threshold=10, spill_dir=str(tmp_path))
+    storage.write("data.bin", b"z" * 50)
+
+    storage.close()
+
+    assert list(tmp_path.glob("crew_spill_*")) == []
+    assert storage.files() == []
+
+
+@pytest.mark.parametrize("fmt", ["zip", "tar.gz"])
+def test_archives_hold_memory_and_spilled_files(tmp_path, fmt):
+    storage = MemoryStorage(str(tmp_path / "shop"), spill_threshold=10, spill_dir=str(tmp_path))
+    storage.write("app.py", b"print(1)\n")
+    storage.write("data/items.csv", b"id,name\n" * 10)
+
+    result = write_archive(storage, str(tmp_path / f"shop.{fmt}"), fmt=fmt)
+
+    assert result["files"] == 2 and result["content_bytes"] == 89
+    if fmt == "zip":
+        with zipfile.ZipFile(result["path"]) as archive:
+            contents = {name: archive.read(name) for name in archive.namelist()}
+    else:
+        with tarfile.open(result["path"]) as archive:
+            contents = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    assert contents == {"shop/app.py": b"print(1)\n", "shop/data/items.csv": b"id,name\n" * 10}
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from storage import MemoryStorage
+from validation import FileValidator, check_content, _requirement_imports
+
+
+@pytest.fixture
+def storage(tmp_path):
+    memory = MemoryStorage(str(tmp_path / "project"))
+    yield memory
+    memory.close()
+
+
+def test_check_content_reports_syntax_errors():
+    assert check_content("python", "app.py", "def f(:\n")["errors"]
+    assert check_content("json", "data.json", "{")["errors"]
+    result = check_content("python", "app.py", "import os\nfrom . import models\n")
+    assert result == {"errors": [], "imports": [("os", 0), ("", 1)]}
+
+
+def test_requirements_are_mapped_to_import_names(storage):
+    assert _requirement_imports(storage) is None
+    storage.write("requirements.txt", b"Pillow>=10\nPyYAML\npython-dotenv==1.0\nstreamlit\n# comment\n")
+
+    names = _requirement_imports(storage)
+
+    assert {"pil", "yaml", "dotenv", "streamlit"} <= names
+
+
+def test_imports_resolve_against_the_project_not_the_host(tmp_path, storage):
+    validator = FileValidator()
+    root = str(tmp_path / "project")
+    validator.reset(root, storage)
+    storage.write("utils/helpers.py", b"x = 1\n")
+    storage.write("requirements.txt", b"Pillow\n")
+    imports = [("os", 0), ("utils.helpers", 0), ("PIL", 0), ("yaml", 0), ("pytest", 0), ("missing", 1)]
+
+    unresolved = validator.unresolved_imports("app.py", imports, root)
+
+    # pytest is installed for crew itself, but the generated project does not require it
+    assert unresolved == [("yaml", 0), ("pytest", 0), ("missing", 1)]
+
+
+def test_third_party_imports_are_not_checked_without_requirements(tmp_path, storage):
+    validator = FileValidator()
+    root = str(tmp_path / "project")
+    validator.reset(root, storage)
+
+    assert validator.unresolved_imports("app.py", [("streamlit", 0)], root) == []
+
+
+def test_workers_are_not_forked_from_a_threaded_process(tmp_path):
+    validator = FileValidator(max_workers=1, timeout=30)
+    # A busy thread like the logging listener must not keep the workers from starting
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        validator.start()
+        assert validator._executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        validator.submit("app.py", "digest", "def f(:\n", root=str(tmp_path))
+        assert validator.report("app.py", str(tmp_path))["status"] == "error"
+    finally:
+        stop.set()
+        thread.join()
+        validator.shutdown()